@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark single-edit tag extraction latency: incremental reparse versus a
+full parse of a generated 5k-line Python file.
+
+Usage:
+    python benchmarks/bench_incremental_parse.py --lines 5000 --edits 50
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.incremental import TreeCache
+from core.tags import parse_file_tags
+
+
+def generate_source(lines: int) -> str:
+    """Build a module of small classes and functions with about `lines` lines."""
+    parts = []
+    i = 0
+    while sum(p.count("\n") for p in parts) < lines:
+        parts.append(
+            f"class Widget{i}:\n"
+            f"    def __init__(self, value):\n"
+            f"        self.value = helper_{i}(value)\n\n"
+            f"    def render(self):\n"
+            f"        return format_widget(self.value, {i})\n\n\n"
+            f"def helper_{i}(value):\n"
+            f"    total = value + {i}\n"
+            f"    return normalize(total)\n\n\n"
+        )
+        i += 1
+    return "".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=5000, help="Size of the generated file")
+    parser.add_argument("--edits", type=int, default=50, help="Number of single-line edits to time")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    current = {"text": generate_source(args.lines)}
+    read = lambda _: current["text"]
+    fname = "bench_module.py"
+    ignore = lambda _: None
+
+    cache = TreeCache(1)
+    parse_file_tags(fname, fname, read, ignore, tree_cache=cache)
+
+    full_times, incremental_times = [], []
+    for _ in range(args.edits):
+        lines = current["text"].splitlines(keepends=True)
+        idx = rng.randrange(len(lines))
+        lines[idx] = lines[idx].replace("value", "amount", 1) if "value" in lines[idx] else "# edited\n"
+        current["text"] = "".join(lines)
+
+        start = time.perf_counter()
+        incremental = parse_file_tags(fname, fname, read, ignore, tree_cache=cache)
+        incremental_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        full = parse_file_tags(fname, fname, read, ignore)
+        full_times.append(time.perf_counter() - start)
+
+        if incremental != full:
+            print(f"MISMATCH after editing line {idx + 1}")
+            sys.exit(1)
+
+    full_ms = statistics.median(full_times) * 1000
+    incremental_ms = statistics.median(incremental_times) * 1000
+    print(f"{current['text'].count(chr(10))} lines, {args.edits} edits, tags identical")
+    print(f"full reparse:        {full_ms:8.2f} ms (median)")
+    print(f"incremental reparse: {incremental_ms:8.2f} ms (median)")
+    print(f"speedup:             {full_ms / incremental_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
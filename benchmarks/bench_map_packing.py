@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark fitting a repository map to a token budget: the MapPacker (cached
+per-file sections, prefix estimates, exact check at the boundary) versus the
+previous binary search that re-rendered and re-counted the whole map at
+every probe.
+
+Ranking runs once up front; only the packing stage is timed. Without
+--tiktoken, tokens are estimated as characters / 4 so no encoder download
+is needed.
+
+Usage:
+    python benchmarks/bench_map_packing.py /path/to/repo --budgets 1024,4096,16384
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.packing import MapPacker
+from core.repomap_class import RepoMap
+from core.utils import count_tokens, find_src_files
+
+
+def binary_search_pack(repo_map: RepoMap, ranked_tags, max_tokens: int):
+    """The previous implementation: a full to_tree + token_count per probe."""
+    probes = 0
+    low, high, best = 0, len(ranked_tags), 0
+    while low <= high:
+        mid = (low + high) // 2
+        probes += 1
+        tree = repo_map.to_tree(ranked_tags[:mid], set()) if mid > 0 else None
+        if (repo_map.token_count(tree) if tree else 0) <= max_tokens:
+            best = mid
+            low = mid + 1
+        else:
+            high = mid - 1
+    tree = repo_map.to_tree(ranked_tags[:best], set()) if best else None
+    return best, tree, probes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Repository to map")
+    parser.add_argument("--budgets", default="1024,4096,16384", help="Comma-separated token budgets")
+    parser.add_argument("--tiktoken", action="store_true", help="Count tokens with tiktoken (gpt-4)")
+    args = parser.parse_args()
+
+    token_counter = count_tokens if args.tiktoken else (lambda text: len(text) // 4)
+    repo_map = RepoMap(root=args.root, token_counter_func=token_counter, verbose=False)
+    files = [os.path.abspath(f) for f in find_src_files(args.root)]
+    ranked_tags, _ = repo_map.get_ranked_tags([], files)
+    print(f"{len(files)} files, {len(ranked_tags)} ranked tags")
+    # Warm the source and TreeContext caches so both sides time rendering only
+    repo_map.to_tree(ranked_tags, set())
+
+    print(f"{'budget':>7} {'tags':>7} {'search s':>9} {'probes':>7} {'packer s':>9} "
+          f"{'renders':>8} {'counts':>7} {'speedup':>8} {'same map':>9}")
+    for budget in (int(b) for b in args.budgets.split(",")):
+        start = time.perf_counter()
+        old_tags, old_tree, probes = binary_search_pack(repo_map, ranked_tags, budget)
+        old_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        packer = MapPacker(ranked_tags, repo_map._render_file_section, repo_map.token_count)
+        new_tags, new_tree = packer.pack(budget)
+        new_s = time.perf_counter() - start
+
+        print(f"{budget:>7} {new_tags:>7} {old_s:>9.3f} {probes:>7} {new_s:>9.3f} "
+              f"{packer.sections_rendered:>8} {packer.maps_counted:>7} {old_s / new_s:>7.1f}x "
+              f"{str(old_tree == new_tree and old_tags == new_tags):>9}")
+
+
+if __name__ == "__main__":
+    main()
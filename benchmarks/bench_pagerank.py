@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark file ranking on synthetic repositories: the sparse-matrix PageRank
+engine versus building an nx.MultiDiGraph and calling nx.pagerank.
+
+Each synthetic file defines a few symbols and references symbols of other
+files, with a skewed popularity so that some names are referenced widely.
+
+Usage:
+    python benchmarks/bench_pagerank.py --files 1000,10000,100000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+import numpy as np
+
+from core.pagerank import build_reference_graph, pagerank
+from core.tagstore import TagTable
+
+
+def synthetic_table(num_files: int, defs_per_file: int, refs_per_file: int, seed: int) -> TagTable:
+    rng = random.Random(seed)
+    num_names = num_files * defs_per_file
+    table = TagTable()
+    for f in range(num_files):
+        packed = [(i, f"sym{f * defs_per_file + i}", "def", i, 0, 0) for i in range(defs_per_file)]
+        for i in range(refs_per_file):
+            # Pareto-distributed targets give a few very popular names
+            target = min(int(rng.paretovariate(1.2)) - 1, num_names - 1)
+            target = (target * 7919 + f * (i % 3)) % num_names
+            packed.append((defs_per_file + i, f"sym{target}", "ref", defs_per_file + i, 0, 0))
+        table.add_packed(f"pkg{f % 100}/mod{f}.py", f"/repo/pkg{f % 100}/mod{f}.py", packed)
+    return table
+
+
+def run_sparse(table: TagTable, personalization):
+    adjacency, _ = build_reference_graph(table)
+    return pagerank(adjacency, personalization).ranks, adjacency.nnz
+
+
+def run_networkx(table: TagTable, personalization):
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(table.files.strings)
+    defines = table.defines()
+    for name_id, ref_files in table.references().items():
+        def_files = defines.get(name_id, ())
+        name = table.names[name_id]
+        for ref in ref_files:
+            for d in def_files:
+                if ref != d:
+                    G.add_edge(table.files[ref], table.files[d], name=name)
+    chat = {table.files[i]: float(w) for i, w in enumerate(personalization) if w} if personalization is not None else None
+    ranks = nx.pagerank(G, personalization=chat, alpha=0.85)
+    return np.array([ranks[n] for n in table.files.strings]), G.number_of_edges()
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", default="1000,10000,100000", help="Comma-separated repository sizes")
+    parser.add_argument("--defs", type=int, default=5, help="Definitions per file")
+    parser.add_argument("--refs", type=int, default=40, help="References per file")
+    parser.add_argument("--networkx-max", type=int, default=10000,
+                        help="Skip networkx above this many files (it needs minutes and GBs)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'edges':>10} {'sparse s':>9} {'networkx s':>11} {'speedup':>8} {'max |diff|':>11}")
+    for num_files in (int(n) for n in args.files.split(",")):
+        table = synthetic_table(num_files, args.defs, args.refs, args.seed)
+        personalization = np.zeros(num_files)
+        personalization[: max(1, num_files // 1000)] = 100.0
+
+        (sparse_ranks, nnz), sparse_s = timed(run_sparse, table, personalization)
+        if num_files <= args.networkx_max:
+            (nx_ranks, _), nx_s = timed(run_networkx, table, personalization)
+            diff = float(np.abs(sparse_ranks - nx_ranks).max())
+            print(f"{num_files:>8} {nnz:>10} {sparse_s:>9.3f} {nx_s:>11.3f} {nx_s / sparse_s:>7.1f}x {diff:>11.2e}")
+        else:
+            print(f"{num_files:>8} {nnz:>10} {sparse_s:>9.3f} {'skipped':>11} {'':>8} {'':>11}")
+
+
+if __name__ == "__main__":
+    main()
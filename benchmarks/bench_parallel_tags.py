@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark cold-cache tag extraction against the number of worker processes.
+
+Usage:
+    python benchmarks/bench_parallel_tags.py /path/to/repo --workers 1,2,4,8
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import RepoMap, find_src_files
+
+
+def extract_all(root: str, files, jobs: int):
+    """Parse every file with an empty in-memory cache and return (seconds, tags)."""
+    repo_map = RepoMap(root=root, jobs=jobs, output_handler_funcs={
+        'info': lambda *_: None, 'warning': lambda *_: None, 'error': lambda *_: None
+    })
+    repo_map.TAGS_CACHE = {}
+    try:
+        start = time.perf_counter()
+        repo_map.prefetch_tags(files)
+        tags = [repo_map.get_tags(f, repo_map.get_rel_fname(f)) for f in files]
+        return time.perf_counter() - start, tags
+    finally:
+        repo_map.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Repository to parse")
+    parser.add_argument("--workers", default="1,2,4,8", help="Comma-separated worker counts")
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    files = sorted(os.path.abspath(f) for f in find_src_files(root))
+    worker_counts = [int(w) for w in args.workers.split(",")]
+
+    print(f"{len(files)} files, {os.cpu_count()} cores")
+    print(f"{'workers':>8} {'seconds':>9} {'speedup':>8} {'identical':>10}")
+
+    baseline_seconds, baseline_tags = extract_all(root, files, 1)
+    print(f"{1:>8} {baseline_seconds:>9.2f} {1.0:>8.2f} {'yes':>10}")
+
+    for workers in worker_counts:
+        if workers == 1:
+            continue
+        seconds, tags = extract_all(root, files, workers)
+        identical = "yes" if tags == baseline_tags else "NO"
+        print(f"{workers:>8} {seconds:>9.2f} {baseline_seconds / seconds:>8.2f} {identical:>10}")
+
+
+if __name__ == "__main__":
+    main()
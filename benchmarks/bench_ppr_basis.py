@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Benchmark chat-file ranking from a precomputed PPR basis against power
+iteration, on the synthetic repositories of bench_pagerank.py.
+
+Reports the one-off basis build time, the per-query time of both methods
+and how many of the exact top-30 files the basis ranks in its own top 30.
+
+Usage:
+    python benchmarks/bench_ppr_basis.py --files 1000,10000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from bench_pagerank import synthetic_table
+from core.pagerank import build_reference_graph, pagerank
+from core.ppr_basis import PPRBasis
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", default="1000,10000", help="Comma-separated repository sizes")
+    parser.add_argument("--top-k", type=int, default=64, help="Entries kept per basis vector")
+    parser.add_argument("--queries", type=int, default=20, help="Random chat sets per size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'files':>8} {'build s':>8} {'entries':>10} {'pagerank ms':>12} {'basis ms':>9} {'top30':>6}")
+    for num_files in (int(n) for n in args.files.split(",")):
+        table = synthetic_table(num_files, 5, 40, args.seed)
+        adjacency, _ = build_reference_graph(table)
+
+        start = time.perf_counter()
+        basis = PPRBasis.build(adjacency, table.files.strings, top_k=args.top_k)
+        build_s = time.perf_counter() - start
+
+        rng = np.random.default_rng(args.seed)
+        exact_s = basis_s = 0.0
+        overlap = 0
+        for _ in range(args.queries):
+            sources = rng.choice(num_files, size=rng.integers(1, 4), replace=False)
+            personalization = np.zeros(num_files)
+            personalization[sources] = 1.0
+
+            start = time.perf_counter()
+            exact = pagerank(adjacency, personalization).ranks
+            exact_s += time.perf_counter() - start
+            start = time.perf_counter()
+            approx = basis.rank(sources)
+            basis_s += time.perf_counter() - start
+            overlap += len(set(np.argsort(-exact)[:30]) & set(np.argsort(-approx)[:30]))
+
+        print(f"{num_files:>8} {build_s:>8.1f} {basis.vectors.nnz:>10} "
+              f"{exact_s * 1000 / args.queries:>12.2f} {basis_s * 1000 / args.queries:>9.2f} "
+              f"{overlap / args.queries:>6.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark agent-loop turns where only the mentioned identifiers change: a
+full get_repo_map call (files re-validated, cached ranks and renders reused)
+versus RepoMap.rerank on the previous turn's ranking, which skips file
+validation and only re-applies the mention boosts and packs the map.
+
+A synthetic repository of --files Python modules is generated under --root
+(reused if it already exists); the first map parses it, which is not timed.
+
+Usage:
+    python benchmarks/bench_rerank.py --root /tmp/rerank_repo --files 20000 --turns 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.repomap_class import RepoMap
+from core.utils import find_src_files
+
+
+def generate_repo(root: str, num_files: int, defs_per_file: int = 8, seed: int = 0):
+    rng = random.Random(seed)
+    for i in range(num_files):
+        package = os.path.join(root, f"pkg{i // 500}")
+        os.makedirs(package, exist_ok=True)
+        lines = []
+        for j in range(defs_per_file):
+            calls = [f"func_{rng.randrange(num_files)}_{rng.randrange(defs_per_file)}" for _ in range(3)]
+            lines.append(f"def func_{i}_{j}(value):")
+            lines.extend(f"    value = {call}(value)" for call in calls)
+            lines.append("    return value\n")
+        with open(os.path.join(package, f"mod{i}.py"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", required=True, help="Directory for the synthetic repository")
+    parser.add_argument("--files", type=int, default=20000, help="Number of modules to generate")
+    parser.add_argument("--turns", type=int, default=20, help="Turns with new mentioned identifiers")
+    parser.add_argument("--map-tokens", type=int, default=4096, help="Map token budget")
+    parser.add_argument("--jobs", type=int, default=0, help="Workers for the initial parse (0 = all cores)")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.root):
+        generate_repo(args.root, args.files)
+    files = [os.path.abspath(f) for f in find_src_files(args.root)]
+
+    repo_map = RepoMap(
+        root=args.root, map_tokens=args.map_tokens, token_counter_func=lambda text: len(text) // 4,
+        jobs=args.jobs, verbose=False
+    )
+    start = time.perf_counter()
+    ranking = repo_map.rank([], files)
+    repo_map.get_repo_map(ranking=ranking)
+    print(f"{len(files)} files, {len(ranking.ranked_tags)} definitions, first map {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(1)
+    full, fast = [], []
+    for _ in range(args.turns):
+        idents = {f"func_{rng.randrange(args.files)}_{rng.randrange(8)}" for _ in range(5)}
+        fnames = {os.path.relpath(rng.choice(files), args.root)}
+
+        start = time.perf_counter()
+        expected, _ = repo_map.get_repo_map([], files, fnames, idents)
+        full.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        content, _ = repo_map.get_repo_map(ranking=repo_map.rerank(ranking, fnames, idents), force_refresh=True)
+        fast.append(time.perf_counter() - start)
+        assert content == expected, "re-ranked map differs"
+
+    print(f"full get_repo_map: median {statistics.median(full) * 1000:7.1f} ms, max {max(full) * 1000:7.1f} ms")
+    print(f"rerank + map:      median {statistics.median(fast) * 1000:7.1f} ms, max {max(fast) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark tags-cache size and peak RSS for span-based tags versus the legacy
+layout that stored each definition's full source text.
+
+Each mode runs in a fresh subprocess so peak RSS is measured independently.
+
+Usage:
+    python benchmarks/bench_tag_memory.py /path/to/python-repo /path/to/ts-repo
+"""
+
+import argparse
+import json
+import os
+import pickle
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.tags import pack_tags, parse_file_tags, tag_content_from_source
+from core.utils import find_src_files, read_bytes
+
+
+def extract(root: str, mode: str) -> dict:
+    """Parse every file under root and build its tags-cache entries in memory."""
+    cache = {}
+    files = 0
+    start = time.perf_counter()
+    for fname in find_src_files(root):
+        rel_fname = os.path.relpath(fname, root)
+        tags = parse_file_tags(fname, rel_fname, read_bytes, lambda _: None)
+        if not tags:
+            continue
+        files += 1
+        if mode == "legacy":
+            # The old PackedTag carried the definition text instead of its span
+            source = read_bytes(fname)
+            cache[rel_fname] = [
+                (t.line, t.name, t.kind, t.end_line, tag_content_from_source(t, source))
+                for t in tags
+            ]
+        else:
+            cache[rel_fname] = pack_tags(tags)
+    elapsed = time.perf_counter() - start
+
+    cache_bytes = sum(len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)) for entry in cache.values())
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform != "darwin":
+        maxrss *= 1024
+    return {"files": files, "cache_bytes": cache_bytes, "peak_rss": maxrss, "seconds": elapsed}
+
+
+def run_child(root: str, mode: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, root],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("roots", nargs="+", help="Repositories to measure")
+    parser.add_argument("--child", choices=["legacy", "spans"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(extract(args.roots[0], args.child)))
+        return
+
+    mib = 1024 * 1024
+    print(f"{'repo':<30} {'mode':<7} {'files':>6} {'cache MiB':>10} {'peak RSS MiB':>13}")
+    for root in args.roots:
+        results = {mode: run_child(root, mode) for mode in ("legacy", "spans")}
+        for mode, r in results.items():
+            print(f"{os.path.basename(os.path.abspath(root)):<30} {mode:<7} {r['files']:>6} "
+                  f"{r['cache_bytes'] / mib:>10.2f} {r['peak_rss'] / mib:>13.1f}")
+        ratio = results["legacy"]["cache_bytes"] / max(results["spans"]["cache_bytes"], 1)
+        print(f"{'':<30} cache size reduced {ratio:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark token counting throughput (tokens/sec) for map-sized texts: the
+previous count_tokens, which resolved the encoder with encoding_for_model on
+every call, versus the TokenCounter service (cached encoder, memoized counts,
+threaded batch encoding).
+
+Texts are the source files of a repository, split into chunks of roughly the
+size of a map section. Each mode counts the same list of chunks.
+
+The real gpt-4 encoder is downloaded by tiktoken on first use. Where that is
+not possible, pass --synthetic to register a stand-in cl100k_base built from
+byte tokens plus frequent words of the corpus; absolute numbers then differ
+from the real encoder, but the before/after comparison is like for like.
+
+Usage:
+    python benchmarks/bench_token_count.py /path/to/repo [--synthetic]
+"""
+
+import argparse
+import collections
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tiktoken
+import tiktoken.registry
+
+from core.tokens import BATCH_THREADS, TokenCounter
+from core.utils import find_src_files, read_text
+
+CL100K_PAT = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+)
+
+
+def register_synthetic_encoding(texts, num_words: int = 20000):
+    """Install a stand-in cl100k_base whose merges cover the corpus' frequent words."""
+    words = collections.Counter()
+    for text in texts:
+        words.update(re.findall(r" ?[A-Za-z_]{2,}", text))
+    ranks = {bytes([i]): i for i in range(256)}
+    for word, _ in words.most_common(num_words):
+        data = word.encode("utf-8")
+        # Every prefix must be a token for BPE to reach the whole word
+        for end in range(2, len(data) + 1):
+            ranks.setdefault(data[:end], len(ranks))
+    encoding = tiktoken.Encoding("cl100k_base", pat_str=CL100K_PAT, mergeable_ranks=ranks, special_tokens={})
+    tiktoken.registry.ENCODINGS["cl100k_base"] = encoding
+
+
+def previous_count_tokens(text: str, model_name: str = "gpt-4") -> int:
+    """count_tokens before the token service."""
+    try:
+        encoding = tiktoken.encoding_for_model(model_name)
+    except KeyError:
+        encoding = tiktoken.get_encoding("cl100k_base")
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def load_chunks(root: str, chunk_lines: int):
+    chunks = []
+    for fname in find_src_files(root):
+        text = read_text(fname, silent=True)
+        if not text:
+            continue
+        lines = text.splitlines(keepends=True)
+        for start in range(0, len(lines), chunk_lines):
+            chunks.append("".join(lines[start:start + chunk_lines]))
+    return chunks
+
+
+def timed(label: str, func, total_tokens: int):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f}s {total_tokens / elapsed / 1e6:8.2f}M tokens/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Repository whose files are counted")
+    parser.add_argument("--chunk-lines", type=int, default=40, help="Lines per counted text")
+    parser.add_argument("--threads", type=int, default=BATCH_THREADS, help="Threads for count_batch")
+    parser.add_argument("--synthetic", action="store_true", help="Use a stand-in encoder (no download)")
+    args = parser.parse_args()
+
+    chunks = load_chunks(args.root, args.chunk_lines)
+    if args.synthetic:
+        register_synthetic_encoding(chunks)
+    print(f"{len(chunks)} texts, {sum(len(c) for c in chunks) / 1e6:.1f}M chars, {args.threads} threads")
+
+    expected = [previous_count_tokens(chunk) for chunk in chunks]
+    total = sum(expected)
+
+    timed("before: count_tokens", lambda: [previous_count_tokens(c) for c in chunks], total)
+
+    counter = TokenCounter("gpt-4")
+    counter.count("warm up the encoder")
+    counter.clear()
+    single = timed("TokenCounter.count (cold)", lambda: [counter.count(c) for c in chunks], total)
+    timed("TokenCounter.count (memo)", lambda: [counter.count(c) for c in chunks], total)
+
+    counter.clear()
+    batch = timed(
+        "TokenCounter.count_batch", lambda: counter.count_batch(chunks, num_threads=args.threads), total
+    )
+
+    assert single == expected and batch == expected, "token counts differ"
+    print(f"{total} tokens, counts identical")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark the calibrated token estimator against line-sample counting when
+fitting a map to token budgets: packing time, and how close the chosen map
+comes to the budget when counted exactly (utilization above 100% is an
+overshoot).
+
+Each mode gets its own RepoMap and token counter so neither benefits from the
+other's memo. Ranking runs once per mode up front; only packing is timed. The
+calibrated estimator learns as it goes, so the first budget includes its
+calibration counts.
+
+Usage:
+    python benchmarks/bench_token_estimator.py /path/to/repo --budgets 1024,4096,16384 [--synthetic]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_token_count import register_synthetic_encoding, load_chunks
+from core.repomap_class import RepoMap
+from core.tokens import TokenCounter
+from core.utils import find_src_files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Repository to map")
+    parser.add_argument("--budgets", default="1024,4096,16384", help="Comma-separated token budgets")
+    parser.add_argument("--margin", type=float, default=0.1, help="Exact-count margin for the calibrated mode")
+    parser.add_argument("--synthetic", action="store_true", help="Use a stand-in encoder (no download)")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        register_synthetic_encoding(load_chunks(args.root, 40))
+    exact = TokenCounter("gpt-4")
+    files = [os.path.abspath(f) for f in find_src_files(args.root)]
+    budgets = [int(b) for b in args.budgets.split(",")]
+
+    results = {}
+    for mode in ("sample", "calibrated"):
+        repo_map = RepoMap(
+            root=args.root, token_counter_func=TokenCounter("gpt-4"), verbose=False,
+            token_estimator=mode, token_margin=args.margin
+        )
+        ranked_tags, _ = repo_map.get_ranked_tags([], files)
+        # Warm the render cache so both modes time counting, not parsing
+        repo_map.to_tree(ranked_tags, set())
+        for budget in budgets:
+            start = time.perf_counter()
+            num_tags, tree = repo_map._pack_map(ranked_tags, budget)
+            elapsed = time.perf_counter() - start
+            results[mode, budget] = (elapsed, num_tags, exact.count(tree) if tree else 0)
+        if repo_map.token_estimator is not None:
+            estimator = repo_map.token_estimator.stats()
+
+    print(f"{len(files)} files, margin {args.margin:.0%}")
+    print(f"{'budget':>7} {'sample s':>9} {'tags':>6} {'util':>6} {'calib s':>9} {'tags':>6} {'util':>6} {'speedup':>8}")
+    for budget in budgets:
+        sample_s, sample_tags, sample_tokens = results["sample", budget]
+        calib_s, calib_tags, calib_tokens = results["calibrated", budget]
+        print(
+            f"{budget:>7} {sample_s:>9.3f} {sample_tags:>6} {sample_tokens / budget:>6.1%} "
+            f"{calib_s:>9.3f} {calib_tags:>6} {calib_tokens / budget:>6.1%} {sample_s / calib_s:>7.1f}x"
+        )
+    print(
+        f"estimator: {estimator.estimates} estimates, {estimator.exact_counts} exact counts, "
+        f"{estimator.mean_error:.2%} mean / {estimator.max_error:.2%} max error over {estimator.verified} "
+        f"verified maps, {estimator.seconds_saved:.3f}s encoding saved"
+    )
+    for language, ratio in sorted(estimator.languages.items()):
+        print(f"  {language}: {ratio:.2f} chars/token")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
 from .repomap_class import RepoMap
+from .tokens import TokenCounter, get_token_counter
 from .utils import find_src_files, count_tokens, get_current_commit_sha, read_text, Tag, find_src_files
+from .discovery import iter_src_files, DiscoveryStats
 from .scm import get_scm_fname
 from .importance import is_important, filter_important_files
+from .languages import get_language_registry, LanguageRegistry
@@ -0,0 +1,294 @@
+"""
+Source file discovery.
+
+In a git work tree, files come from ``git ls-files``, so ignored files are
+never visited. Elsewhere a ``os.scandir`` walk honours ``.gitignore`` files
+and prunes ignored directories before descending into them. Either way,
+hidden and well-known non-source directories are skipped, and files are
+filtered by name to languages that have a tags query before anything is
+stat'ed or read. Paths are yielded as they are found; an optional
+``DiscoveryStats`` counts what was skipped and why.
+"""
+
+import os
+import re
+import subprocess
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterator, List, Optional, Pattern, Tuple
+
+from grep_ast.parsers import PARSERS
+
+from .scm import get_scm_fname
+
+SKIP_DIRS = frozenset({'node_modules', '__pycache__', 'venv', 'env'})
+GIT_TIMEOUT = 30
+READ_CHUNK_SIZE = 1 << 16
+
+SKIP_HIDDEN = "hidden"
+SKIP_DIRECTORY = "excluded directory"
+SKIP_GITIGNORED = "gitignored"
+SKIP_DELETED = "deleted"
+SKIP_UNSUPPORTED = "no tags query for language"
+
+
+@dataclass
+class DiscoveryStats:
+    source: str = ""                # "git", "scandir" or "file"
+    found: int = 0                  # Paths yielded
+    # Skipped paths by reason; a pruned directory counts once, not per file
+    skipped: Dict[str, int] = field(default_factory=dict)
+
+    def skip(self, reason: str):
+        self.skipped[reason] = self.skipped.get(reason, 0) + 1
+
+    def summary(self) -> str:
+        reasons = ", ".join(f"{count} {reason}" for reason, count in sorted(self.skipped.items()))
+        return f"{self.found} files from {self.source or 'nothing'}" + (f"; skipped {reasons}" if reasons else "")
+
+
+@lru_cache(maxsize=1)
+def tag_languages() -> FrozenSet[str]:
+    """Languages with a tags query, i.e. the ones a map can be built from."""
+    return frozenset(lang for lang in set(PARSERS.values()) if get_scm_fname(lang))
+
+
+def is_source_file(fname: str) -> bool:
+    """Whether a file's name maps to a language with a tags query."""
+    # filename_to_lang without the path handling: by full name, then by extension
+    name = os.path.basename(fname)
+    lang = PARSERS.get(name)
+    if lang is None:
+        dot = name.rfind(".")
+        lang = PARSERS.get(name[dot:]) if dot > 0 else None
+    return lang in tag_languages()
+
+
+def find_src_files(directory: str) -> List[str]:
+    """Find source files in a directory."""
+    return list(iter_src_files(directory))
+
+
+def iter_src_files(
+    directory: str,
+    stats: Optional[DiscoveryStats] = None,
+    use_git: bool = True,
+    source_only: bool = True
+) -> Iterator[str]:
+    """Yield the source files under a directory, or the path itself if it is a file.
+
+    ``use_git`` lists files with git when the directory is in a work tree;
+    ``source_only`` drops files whose name maps to no tags query.
+    """
+    if stats is None:
+        stats = DiscoveryStats()
+    if not os.path.isdir(directory):
+        if os.path.isfile(directory):
+            stats.source = "file"
+            stats.found += 1
+            yield directory
+        return
+
+    if use_git:
+        listing = _git_files(directory, stats)
+        if listing is not None:
+            stats.source = "git"
+            yield from _filter(directory, listing, stats, source_only)
+            # A directory ignored by an enclosing repository lists nothing; walk it instead
+            if stats.found or stats.skipped:
+                return
+
+    stats.source = "scandir"
+    yield from _walk(directory, stats, source_only)
+
+
+def _filter(directory: str, rel_fnames: Iterator[str], stats: DiscoveryStats, source_only: bool) -> Iterator[str]:
+    """Apply the directory, hidden-file and language rules to a git listing."""
+    for rel_fname in rel_fnames:
+        parts = rel_fname.split("/")
+        if any(part.startswith('.') for part in parts):
+            stats.skip(SKIP_HIDDEN)
+            continue
+        if any(part in SKIP_DIRS for part in parts[:-1]):
+            stats.skip(SKIP_DIRECTORY)
+            continue
+        if source_only and not is_source_file(parts[-1]):
+            stats.skip(SKIP_UNSUPPORTED)
+            continue
+        stats.found += 1
+        yield os.path.join(directory, *parts)
+
+
+def _git_files(directory: str, stats: DiscoveryStats) -> Optional[Iterator[str]]:
+    """Tracked and untracked, not ignored, files under a directory, or None outside git."""
+    try:
+        deleted = subprocess.run(
+            ["git", "ls-files", "-z", "--deleted"],
+            cwd=directory, capture_output=True, timeout=GIT_TIMEOUT
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if deleted.returncode != 0:
+        return None
+    return _stream_git_files(directory, set(_split_paths(deleted.stdout)), stats)
+
+
+def _stream_git_files(directory: str, deleted: set, stats: DiscoveryStats) -> Iterator[str]:
+    process = subprocess.Popen(
+        ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard"],
+        cwd=directory, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    seen = set()
+    try:
+        pending = b""
+        while True:
+            chunk = process.stdout.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            *paths, pending = (pending + chunk).split(b"\0")
+            for rel_fname in _split_paths(b"\0".join(paths)):
+                # A file with unmerged stages is listed once per stage
+                if rel_fname in seen:
+                    continue
+                seen.add(rel_fname)
+                if rel_fname in deleted:
+                    stats.skip(SKIP_DELETED)
+                    continue
+                yield rel_fname
+    finally:
+        process.stdout.close()
+        process.wait()
+
+
+def _split_paths(output: bytes) -> List[str]:
+    return [os.fsdecode(path) for path in output.split(b"\0") if path]
+
+
+# (regex on the path relative to the .gitignore's directory, negated, directory only)
+IgnoreRule = Tuple[Pattern, bool, bool]
+
+
+def _translate_glob(pattern: str) -> str:
+    regex, i = "", 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                body = pattern[i + 1:end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body}]"
+                i = end
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+def parse_gitignore(text: str) -> List[IgnoreRule]:
+    """Compile the patterns of a .gitignore file."""
+    rules = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if not line or line.startswith("#"):
+            continue
+        negated = line.startswith("!")
+        if negated:
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            continue
+        # A slash anywhere but the end anchors the pattern to the .gitignore's directory
+        anchored = "/" in line
+        regex = _translate_glob(line.lstrip("/"))
+        if not anchored:
+            regex = "(?:.*/)?" + regex
+        try:
+            rules.append((re.compile(regex + r"\Z"), negated, dir_only))
+        except re.error:
+            continue
+    return rules
+
+
+def _is_ignored(rules: Tuple[Tuple[str, List[IgnoreRule]], ...], rel_path: str, is_dir: bool) -> bool:
+    """Whether a path is ignored; the last matching rule, deepest file last, wins."""
+    ignored = False
+    for base, file_rules in rules:
+        sub_path = rel_path[len(base):]
+        for regex, negated, dir_only in file_rules:
+            if (is_dir or not dir_only) and regex.match(sub_path):
+                ignored = not negated
+    return ignored
+
+
+def _walk(directory: str, stats: DiscoveryStats, source_only: bool) -> Iterator[str]:
+    """Files under a directory, honouring .gitignore files and pruning skipped directories."""
+    # (path relative to the directory with a trailing '/', path, rules in effect)
+    stack: List[Tuple[str, str, Tuple[Tuple[str, List[IgnoreRule]], ...]]] = [("", directory, ())]
+    while stack:
+        rel_dir, path, rules = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.name == ".gitignore" and entry.is_file():
+                try:
+                    with open(entry.path, encoding="utf-8", errors="ignore") as f:
+                        file_rules = parse_gitignore(f.read())
+                except OSError:
+                    file_rules = []
+                if file_rules:
+                    rules = rules + ((rel_dir, file_rules),)
+                break
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if name.startswith('.'):
+                stats.skip(SKIP_HIDDEN)
+                continue
+            try:
+                is_dir = entry.is_dir()
+                if is_dir and entry.is_symlink():
+                    # Linked directories are not followed, as with os.walk
+                    continue
+            except OSError:
+                continue
+            if is_dir:
+                if name in SKIP_DIRS:
+                    stats.skip(SKIP_DIRECTORY)
+                elif rules and _is_ignored(rules, rel_dir + name, True):
+                    stats.skip(SKIP_GITIGNORED)
+                else:
+                    subdirs.append((rel_dir + name + "/", entry.path, rules))
+            elif rules and _is_ignored(rules, rel_dir + name, False):
+                stats.skip(SKIP_GITIGNORED)
+            elif source_only and not is_source_file(name):
+                stats.skip(SKIP_UNSUPPORTED)
+            else:
+                stats.found += 1
+                yield entry.path
+        # Depth-first, in name order
+        stack.extend(reversed(subdirs))
@@ -0,0 +1,104 @@
+"""
+Per-run table of the files a map is built from.
+
+Every stage of a run needs a file's resolved path, its path relative to the
+root and whether it exists, and used to derive them again with pathlib and
+``os.stat``. ``FileTable`` does this once per input path: the file's
+directory is resolved once per run, the file itself gets a single ``lstat``
+(a regular file's ``lstat`` is its ``stat``), and the relative path is cut
+from the resolved one as a string. Entries are interned by input and
+resolved path and numbered in order of first use.
+"""
+
+import os
+import stat
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+
+@dataclass
+class FileEntry:
+    file_id: int
+    fname: str                      # Resolved absolute path
+    rel_fname: str                  # Relative to the root, or fname if outside it
+    stat: Optional[os.stat_result]  # None if the file does not exist
+
+
+class FileTable:
+    """Resolves, stats and relativizes each path of one run exactly once."""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._root_prefix = os.path.join(root, "")
+        self._cwd: Optional[str] = None
+        self._real_dirs: Dict[str, str] = {}
+        self._entries: Dict[str, FileEntry] = {}
+        self.entries: List[FileEntry] = []
+        self.stat_calls = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, path: str) -> FileEntry:
+        """The entry for a path, as given or already resolved."""
+        entry = self._entries.get(path)
+        if entry is None:
+            entry = self._add(path)
+            self._entries[path] = entry
+        return entry
+
+    def resolve(self, path: str) -> str:
+        return self.get(path).fname
+
+    def rel_fname(self, path: str) -> str:
+        return self.get(path).rel_fname
+
+    def _add(self, path: str) -> FileEntry:
+        fname, st = self._resolve(path)
+        entry = self._entries.get(fname)
+        if entry is None:
+            entry = FileEntry(len(self.entries), fname, self._relative(fname), st)
+            self.entries.append(entry)
+            self._entries[fname] = entry
+        return entry
+
+    def _resolve(self, path: str):
+        """Resolved path (as ``Path.resolve``) and stat of a file, or None if missing."""
+        if not os.path.isabs(path):
+            if self._cwd is None:
+                self._cwd = os.getcwd()
+            path = os.path.join(self._cwd, path)
+        dirname, basename = os.path.split(path)
+        if basename in ("", ".", ".."):
+            return self._stat_real(os.path.realpath(path))
+
+        real_dir = self._real_dirs.get(dirname)
+        if real_dir is None:
+            real_dir = self._real_dirs[dirname] = os.path.realpath(dirname)
+        fname = os.path.join(real_dir, basename)
+        self.stat_calls += 1
+        try:
+            st = os.lstat(fname)
+        except (FileNotFoundError, NotADirectoryError):
+            return fname, None
+        if stat.S_ISLNK(st.st_mode):
+            return self._stat_real(os.path.realpath(fname))
+        return fname, st
+
+    def _stat_real(self, fname: str):
+        self.stat_calls += 1
+        try:
+            return fname, os.stat(fname)
+        except (FileNotFoundError, NotADirectoryError):
+            return fname, None
+
+    def _relative(self, fname: str) -> str:
+        if fname.startswith(self._root_prefix):
+            return fname[len(self._root_prefix):]
+        if fname == self.root:
+            return "."
+        try:
+            return str(Path(fname).relative_to(self.root))
+        except ValueError:
+            return fname
@@ -0,0 +1,149 @@
+"""
+Content fingerprints for cache validation.
+
+A file is identified by a hash of its content, so cached data survives fresh
+clones, branch switches and moved checkouts. Hashing is skipped whenever the
+file's size and mtime still match the last recorded fingerprint.
+
+While a file is hashed, a few facts about its content are noted as well
+(binary data, a generated-code marker in its leading comment, the longest
+line), so pre-parse guards can use them on every run without reading the
+file again.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, fields
+from typing import Dict, MutableMapping, Optional, Tuple
+
+STAT_KEY_PREFIX = "stat:"
+SCAN_VERSION = 2                # Stored with each record; bumped when a content fact changes meaning
+HASH_CHUNK_SIZE = 1 << 20
+BINARY_SNIFF_BYTES = 8192       # A NUL byte in this prefix marks a file as binary
+HEADER_LINES = 10               # Lines searched for a generated-code marker
+GENERATED_MARKERS = (
+    b"@generated", b"DO NOT EDIT", b"Code generated by", b"Generated by the protocol buffer compiler",
+    b"autogenerated", b"auto-generated", b"Autogenerated", b"Auto-generated",
+)
+COMMENT_PREFIXES = (b"#", b"//", b"/*", b"*", b"--", b";", b"%", b"<!--")
+
+
+@dataclass(frozen=True)
+class FileFingerprint:
+    size: int
+    mtime_ns: int
+    digest: str                     # blake2b hex digest of the file content
+    binary: bool = False            # NUL byte within the first BINARY_SNIFF_BYTES
+    generated: bool = False         # Generated-code marker in the leading comment (first HEADER_LINES)
+    max_line_length: int = 0        # Longest line, in bytes
+
+
+FIELDS = tuple(field.name for field in fields(FileFingerprint))
+
+
+def hash_file(fname: str) -> Optional[str]:
+    """Return a fast content hash of a file, or None if it cannot be read."""
+    hasher = hashlib.blake2b(digest_size=16)
+    try:
+        with open(fname, "rb") as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+    except OSError:
+        return None
+    return hasher.hexdigest()
+
+
+def has_generated_marker(head: bytes) -> bool:
+    """Whether the comment lines opening a file carry a generated-code marker.
+
+    Only the leading comment block counts: the scan stops at the first line
+    that is neither blank nor a comment, so a marker mentioned in code or a
+    docstring does not mark the file.
+    """
+    for line in head.split(b"\n", HEADER_LINES)[:HEADER_LINES]:
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith(COMMENT_PREFIXES):
+            return False
+        if any(marker in line for marker in GENERATED_MARKERS):
+            return True
+    return False
+
+
+def scan_file(fname: str) -> Optional[Tuple[str, bool, bool, int]]:
+    """Hash a file like ``hash_file`` and note its content facts.
+
+    Returns (digest, binary, generated, max_line_length), or None if the
+    file cannot be read.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    head = b""
+    longest = current = 0
+    try:
+        with open(fname, "rb") as f:
+            while True:
+                chunk = f.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                hasher.update(chunk)
+                if len(head) < BINARY_SNIFF_BYTES:
+                    head += chunk[:BINARY_SNIFF_BYTES - len(head)]
+                # Line lengths, carrying the last line over to the next chunk
+                lines = chunk.split(b"\n")
+                current += len(lines[0])
+                if len(lines) > 1:
+                    longest = max(longest, current, max(map(len, lines[1:-1]), default=0))
+                    current = len(lines[-1])
+    except OSError:
+        return None
+    return hasher.hexdigest(), b"\0" in head, has_generated_marker(head), max(longest, current)
+
+
+class Fingerprinter:
+    """Computes file fingerprints, persisting them by relative path."""
+
+    def __init__(self, store: MutableMapping):
+        self.store = store
+        self.memo: Dict[str, FileFingerprint] = {}
+        self.stat_hits = 0
+        self.hashed = 0
+
+    def fingerprint(
+        self, fname: str, rel_fname: str, st: Optional[os.stat_result] = None
+    ) -> Optional[FileFingerprint]:
+        """Return the fingerprint of a file, or None if it does not exist.
+
+        ``st`` is the file's stat if the caller already has it. Errors
+        raised by the backing store propagate to the caller.
+        """
+        if st is None:
+            try:
+                st = os.stat(fname)
+            except (FileNotFoundError, NotADirectoryError):
+                return None
+
+        previous = self.memo.get(rel_fname)
+        if previous is None:
+            stored = self.store.get(STAT_KEY_PREFIX + rel_fname)
+            # Records written by an older scanner, or before content facts were kept, are rehashed
+            if stored and len(stored) == len(FIELDS) + 1 and stored[0] == SCAN_VERSION:
+                previous = FileFingerprint(*stored[1:])
+
+        if previous and previous.size == st.st_size and previous.mtime_ns == st.st_mtime_ns:
+            self.stat_hits += 1
+            self.memo[rel_fname] = previous
+            return previous
+
+        scanned = scan_file(fname)
+        if scanned is None:
+            return None
+        self.hashed += 1
+
+        current = FileFingerprint(st.st_size, st.st_mtime_ns, *scanned)
+        self.memo[rel_fname] = current
+        self.store[STAT_KEY_PREFIX + rel_fname] = (SCAN_VERSION,) + tuple(getattr(current, name) for name in FIELDS)
+        return current
@@ -0,0 +1,66 @@
+"""
+Pre-parse guards against files that are not worth mapping.
+
+Minified bundles, vendored code, generated sources and binary blobs can take
+seconds to parse and add nothing a model can use. ``FileGuards`` rejects
+them before they are parsed: by path (vendored and build directories under
+the root, minified and generated file names), by size, and by the content facts the
+fingerprinter notes while hashing (binary data, a generated-code header,
+the longest line). None of the checks reads the file.
+"""
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+from .fingerprint import FileFingerprint
+
+DEFAULT_MAX_FILE_BYTES = 1024 * 1024
+DEFAULT_MAX_LINE_LENGTH = 2000
+
+VENDORED_DIRS = frozenset({'vendor', 'vendored', 'third_party', 'thirdparty'})
+# Build output directories, matched only at the top of the repository: nested
+# directories of the same name are often real source (e.g. a "dist" module)
+BUILD_DIRS = frozenset({'dist'})
+GENERATED_SUFFIXES = (
+    '.min.js', '.min.mjs', '.min.css', '-min.js', '.bundle.js',
+    '_pb2.py', '_pb2_grpc.py', '.pb.go', '.pb.cc', '.pb.h', '.g.dart', '.designer.cs',
+)
+
+
+@dataclass(frozen=True)
+class FileGuards:
+    max_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES          # None disables the size limit
+    max_line_length: Optional[int] = DEFAULT_MAX_LINE_LENGTH   # None disables the line limit
+    skip_binary: bool = True
+    skip_generated: bool = True     # Generated, minified and vendored files
+
+    def check_path(self, rel_fname: str, size: int) -> Optional[str]:
+        """Reason to skip a file by its path and size, or None.
+
+        A file outside the root has an absolute ``rel_fname``; only its name
+        is checked, since the directories above it are not the repository's.
+        """
+        if self.skip_generated:
+            parts = rel_fname.replace(os.sep, "/").split("/")
+            if not os.path.isabs(rel_fname):
+                vendored = next((part for part in parts[:-1] if part in VENDORED_DIRS), None)
+                if vendored is not None:
+                    return f"Vendored directory: {vendored}/"
+                if len(parts) > 1 and parts[0] in BUILD_DIRS:
+                    return f"Build directory: {parts[0]}/"
+            if parts[-1].endswith(GENERATED_SUFFIXES):
+                return "Generated or minified file name"
+        if self.max_bytes is not None and size > self.max_bytes:
+            return f"File too large: {size} bytes (max {self.max_bytes})"
+        return None
+
+    def check_content(self, fingerprint: FileFingerprint) -> Optional[str]:
+        """Reason to skip a file by the content facts of its fingerprint, or None."""
+        if self.skip_binary and fingerprint.binary:
+            return "Binary file"
+        if self.skip_generated and fingerprint.generated:
+            return "Generated file (marker in leading comment)"
+        if self.max_line_length is not None and fingerprint.max_line_length > self.max_line_length:
+            return f"Line too long: {fingerprint.max_line_length} bytes (max {self.max_line_length})"
+        return None
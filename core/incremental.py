@@ -0,0 +1,223 @@
+"""
+Incremental Tree-sitter reparsing for long-lived RepoMap instances.
+
+The last syntax tree of each file is kept in a bounded cache. When the file
+changes, the edit is applied to the old tree, the parser reuses its unchanged
+subtrees, and the tags query is only re-run over the top-level nodes that the
+edit touched.
+"""
+
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .tags import ParsedTag
+
+# A tag plus the start byte of its captured name node, kept in source order
+PositionedTag = Tuple[int, str, "ParsedTag"]
+
+
+@dataclass
+class TreeState:
+    lang: str
+    source: bytes
+    tree: Any
+    tags: List[PositionedTag]
+
+
+@dataclass
+class SourceEdit:
+    start_byte: int
+    old_end_byte: int
+    new_end_byte: int
+    start_point: Tuple[int, int]
+    old_end_point: Tuple[int, int]
+    new_end_point: Tuple[int, int]
+
+
+class TreeCache:
+    """LRU cache of the last parsed tree per file."""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, TreeState]" = OrderedDict()
+        self.incremental_parses = 0
+        self.full_parses = 0
+
+    def get(self, fname: str) -> Optional[TreeState]:
+        state = self._entries.get(fname)
+        if state is not None:
+            self._entries.move_to_end(fname)
+        return state
+
+    def put(self, fname: str, state: TreeState):
+        if self.max_size <= 0:
+            return
+        self._entries[fname] = state
+        self._entries.move_to_end(fname)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def discard(self, fname: str):
+        self._entries.pop(fname, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def _common_prefix_len(a: bytes, b: bytes) -> int:
+    """Length of the common prefix, found by bisecting with C-level slice compares."""
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _common_suffix_len(a: bytes, b: bytes, limit: int) -> int:
+    lo, hi = 0, limit
+    len_a, len_b = len(a), len(b)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len_a - mid:len_a - lo] == b[len_b - mid:len_b - lo]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _point_at(source: bytes, offset: int) -> Tuple[int, int]:
+    row = source.count(b"\n", 0, offset)
+    line_start = source.rfind(b"\n", 0, offset) + 1
+    return row, offset - line_start
+
+
+def compute_edit(old: bytes, new: bytes) -> Optional[SourceEdit]:
+    """Describe the single contiguous edit that turns old into new, or None if equal."""
+    if old == new:
+        return None
+
+    prefix = _common_prefix_len(old, new)
+    suffix = _common_suffix_len(old, new, min(len(old), len(new)) - prefix)
+
+    start = prefix
+    old_end = len(old) - suffix
+    new_end = len(new) - suffix
+    return SourceEdit(
+        start_byte=start,
+        old_end_byte=old_end,
+        new_end_byte=new_end,
+        start_point=_point_at(old, start),
+        old_end_point=_point_at(old, old_end),
+        new_end_point=_point_at(new, new_end)
+    )
+
+
+def _affected_spans(root: Any, source_len: int, ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Byte spans that must be re-queried after an edit.
+
+    The source is partitioned into one segment per top-level node, each
+    running up to the start of the next one, so every byte (including text
+    the parser could not attach to any node) belongs to exactly one segment.
+    Segments that touch a changed range are returned, merged when adjacent.
+    """
+    children = root.children
+    bounds = [0] + [child.start_byte for child in children[1:]] + [source_len + 1]
+
+    spans: List[Tuple[int, int]] = []
+    for start, end in zip(bounds, bounds[1:]):
+        if start >= end:
+            continue
+        for range_start, range_end in ranges:
+            # Touching counts: an insertion at a node boundary may extend it
+            if start <= range_end and range_start <= end:
+                if spans and spans[-1][1] == start:
+                    spans[-1] = (spans[-1][0], end)
+                else:
+                    spans.append((start, end))
+                break
+    return spans
+
+
+def _in_spans(offset: int, spans: List[Tuple[int, int]], starts: List[int]) -> bool:
+    idx = bisect_right(starts, offset) - 1
+    return idx >= 0 and offset < spans[idx][1]
+
+
+def _shift_tag(tag: "ParsedTag", line_delta: int, byte_delta: int) -> "ParsedTag":
+    shifted = object.__new__(type(tag))
+    shifted.__dict__.update(tag.__dict__)
+    shifted.line += line_delta
+    shifted.end_line += line_delta
+    shifted.start_byte += byte_delta
+    shifted.end_byte += byte_delta
+    return shifted
+
+
+def reparse_tags(
+    state: TreeState,
+    new_source: bytes,
+    parser: Any,
+    collect: Any
+) -> Tuple[Any, List[PositionedTag]]:
+    """Reparse a changed file against its previous tree.
+
+    ``collect(tree, spans)`` must return positioned tags for the
+    captures that start inside the given byte spans (or the whole tree when
+    spans is None). Returns the new tree and the complete, source-ordered tag
+    list.
+    """
+    edit = compute_edit(state.source, new_source)
+    if edit is None:
+        return state.tree, state.tags
+
+    old_tree = state.tree
+    old_tree.edit(
+        start_byte=edit.start_byte,
+        old_end_byte=edit.old_end_byte,
+        new_end_byte=edit.new_end_byte,
+        start_point=edit.start_point,
+        old_end_point=edit.old_end_point,
+        new_end_point=edit.new_end_point
+    )
+    new_tree = parser.parse(new_source, old_tree)
+
+    # Error recovery can settle differently when reusing subtrees, so a tree
+    # with syntax errors is rebuilt from scratch to match a cold parse exactly
+    if new_tree.root_node.has_error:
+        new_tree = parser.parse(new_source)
+        return new_tree, collect(new_tree, None)
+
+    changed = [(r.start_byte, r.end_byte) for r in old_tree.changed_ranges(new_tree)]
+    changed.append((edit.start_byte, edit.new_end_byte))
+    spans = _affected_spans(new_tree.root_node, len(new_source), changed)
+
+    byte_delta = edit.new_end_byte - edit.old_end_byte
+    line_delta = edit.new_end_point[0] - edit.old_end_point[0]
+
+    span_starts = [start for start, _ in spans]
+    retained: List[PositionedTag] = []
+    for start_byte, kind, tag in state.tags:
+        if start_byte < edit.start_byte:
+            if not _in_spans(start_byte, spans, span_starts):
+                retained.append((start_byte, kind, tag))
+        elif start_byte >= edit.old_end_byte:
+            new_start = start_byte + byte_delta
+            if not _in_spans(new_start, spans, span_starts):
+                if line_delta or byte_delta:
+                    tag = _shift_tag(tag, line_delta, byte_delta)
+                retained.append((new_start, kind, tag))
+
+    fresh = collect(new_tree, spans) if spans else []
+
+    tags = retained + fresh
+    tags.sort(key=lambda item: (item[0], item[1]))
+    return new_tree, tags
@@ -0,0 +1,133 @@
+"""
+Process-wide registry of Tree-sitter languages, parsers and tag queries.
+
+Loading a grammar and compiling its tags query is far more expensive than
+parsing a typical source file, so both are done once per language and shared
+by every RepoMap instance in the process.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from .scm import get_scm_fname
+from .utils import read_text
+
+
+@dataclass
+class LanguageBundle:
+    lang: str
+    language: Any
+    query: Any
+    setup_seconds: float            # Time spent loading the grammar and compiling the query
+
+
+@dataclass
+class RegistryStats:
+    languages_loaded: int           # Bundles built so far
+    hits: int                       # Lookups served from the registry
+    setup_seconds: float            # Total time spent building bundles
+    saved_seconds: float            # Setup time avoided by reusing bundles
+
+
+class LanguageRegistry:
+    """Thread-safe cache of language bundles and per-thread parsers."""
+
+    def __init__(self):
+        self._bundles: Dict[str, Optional[LanguageBundle]] = {}
+        self._errors: Dict[str, Exception] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._hits = 0
+        self._setup_seconds = 0.0
+        self._saved_seconds = 0.0
+
+    def get(self, lang: str) -> Optional[LanguageBundle]:
+        """Return the bundle for a language, or None if it has no tags query.
+
+        Errors raised while loading the grammar are cached and re-raised on
+        every lookup so unsupported languages are not retried per file.
+        """
+        with self._lock:
+            if lang in self._bundles:
+                bundle = self._bundles[lang]
+                self._hits += 1
+                if bundle is not None:
+                    self._saved_seconds += bundle.setup_seconds
+                return bundle
+            if lang in self._errors:
+                self._hits += 1
+                raise self._errors[lang]
+
+            try:
+                bundle = self._load(lang)
+            except Exception as err:
+                self._errors[lang] = err
+                raise
+            self._bundles[lang] = bundle
+            if bundle is not None:
+                self._setup_seconds += bundle.setup_seconds
+            return bundle
+
+    def get_parser(self, bundle: LanguageBundle) -> Any:
+        """Return a parser for a bundle's language, reused within the calling thread."""
+        parsers = getattr(self._local, "parsers", None)
+        if parsers is None:
+            parsers = self._local.parsers = {}
+
+        parser = parsers.get(bundle.lang)
+        if parser is None:
+            from tree_sitter import Parser
+            parser = parsers[bundle.lang] = Parser(bundle.language)
+        return parser
+
+    def stats(self) -> RegistryStats:
+        """Return a snapshot of registry usage."""
+        with self._lock:
+            return RegistryStats(
+                languages_loaded=sum(1 for b in self._bundles.values() if b is not None),
+                hits=self._hits,
+                setup_seconds=self._setup_seconds,
+                saved_seconds=self._saved_seconds
+            )
+
+    def clear(self):
+        """Drop all cached bundles and parsers."""
+        with self._lock:
+            self._bundles.clear()
+            self._errors.clear()
+            self._hits = 0
+            self._setup_seconds = 0.0
+            self._saved_seconds = 0.0
+            self._local = threading.local()
+
+    def _load(self, lang: str) -> Optional[LanguageBundle]:
+        from grep_ast.tsl import get_language
+
+        start = time.perf_counter()
+        language = get_language(lang)
+
+        scm_fname = get_scm_fname(lang)
+        if not scm_fname:
+            return None
+
+        query_text = read_text(scm_fname, silent=True)
+        if not query_text:
+            return None
+
+        query = language.query(query_text)
+        return LanguageBundle(
+            lang=lang,
+            language=language,
+            query=query,
+            setup_seconds=time.perf_counter() - start
+        )
+
+
+_REGISTRY = LanguageRegistry()
+
+
+def get_language_registry() -> LanguageRegistry:
+    """Return the process-wide language registry."""
+    return _REGISTRY
@@ -0,0 +1,85 @@
+"""
+Persistent cache of rendered maps.
+
+A map only depends on the content of its files, which of them are in the
+chat, the mentions, the token budget, the token counter's model and the
+ranking and rendering settings. Maps are stored in the tags cache under a
+digest of all of these, so they are shared by CLI runs and server instances
+for the same root, and an edited, added or removed file changes the key
+instead of serving a stale map.
+
+The file set is digested in O(n) without sorting the paths: each file's
+(role, path, content digest) is hashed and the hashes are summed.
+"""
+
+import hashlib
+from collections import OrderedDict
+from typing import Any, MutableMapping, Optional, Tuple
+
+MAP_KEY_PREFIX = "map:"
+MAP_CACHE_FORMAT = 1
+_DIGEST_MODULUS = 1 << 128
+
+
+class FileSetDigest:
+    """Order-independent digest of (role, rel_fname, content digest) entries."""
+
+    def __init__(self):
+        self._sum = 0
+        self.count = 0
+
+    def add(self, role: str, rel_fname: str, digest: Optional[str]):
+        entry = hashlib.blake2b(f"{role}\0{rel_fname}\0{digest}".encode("utf-8", "surrogatepass"), digest_size=16)
+        self._sum = (self._sum + int.from_bytes(entry.digest(), "big")) % _DIGEST_MODULUS
+        self.count += 1
+
+    def hexdigest(self) -> str:
+        return f"{self._sum:032x}-{self.count}"
+
+
+def map_cache_key(files: FileSetDigest, settings: Tuple) -> str:
+    """Cache key for the map of a file set under the given settings (a repr-able tuple)."""
+    hasher = hashlib.blake2b(digest_size=20)
+    hasher.update(repr((MAP_CACHE_FORMAT, files.hexdigest(), settings)).encode("utf-8", "surrogatepass"))
+    return MAP_KEY_PREFIX + hasher.hexdigest()
+
+
+class MapCache:
+    """Rendered maps by key: a small in-memory LRU in front of the persistent store.
+
+    Errors raised by the backing store propagate to the caller.
+    """
+
+    def __init__(self, store: MutableMapping, memory_entries: int = 16):
+        self.store = store
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, persistent: bool = True) -> Optional[Any]:
+        value = self._memory.get(key)
+        if value is None and persistent:
+            value = self.store.get(key)
+            if value is not None:
+                self._remember(key, value)
+        if value is None:
+            self.misses += 1
+            return None
+        self._memory.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: str, value: Any, persistent: bool = True):
+        self._remember(key, value)
+        if persistent:
+            self.store[key] = value
+
+    def _remember(self, key: str, value: Any):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        self._memory.clear()
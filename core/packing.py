@@ -0,0 +1,231 @@
+"""
+Token-budget packing of ranked tags into a repository map.
+
+A map for the top ``k`` ranked tags is one section per file, joined by blank
+lines, where a file's section only depends on which of its tags fall in the
+top ``k``. ``MapPacker`` renders and token-counts each distinct section once
+and estimates the size of any prefix as the sum of its sections' counts, so
+searching for the largest prefix that fits re-renders at most the one or two
+files cut at the boundary. Whole maps are only assembled and counted at the
+final boundary, where the estimate is checked exactly.
+
+With a ``margin``, section counts may be cheap estimates and the search works
+on them directly: only prefixes whose estimate falls within ``margin`` (a
+fraction of the budget) of the budget are assembled and counted exactly.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .tags import ParsedTag
+
+SECTION_SEPARATOR = "\n\n"
+
+# (rel_fname, lines of interest, max rank) -> rendered section, or "" to skip the file
+SectionRenderer = Callable[[str, List[int], float], str]
+
+# (rel_fnames, section texts) -> token count or estimate per section
+SectionCounter = Callable[[List[str], List[str]], List[int]]
+
+
+class MapPacker:
+    """Finds the largest prefix of ranked tags whose map fits a token budget."""
+
+    def __init__(
+        self,
+        ranked_tags: Sequence[Tuple[float, ParsedTag]],
+        render_section: SectionRenderer,
+        token_count: Callable[[str], int],
+        token_count_batch: Optional[Callable[[List[str]], List[int]]] = None,
+        count_sections: Optional[SectionCounter] = None,
+        margin: Optional[float] = None
+    ):
+        self.render_section = render_section
+        self.token_count = token_count
+        if count_sections is None:
+            count_batch = token_count_batch or (lambda texts: [token_count(t) for t in texts])
+            count_sections = lambda rel_fnames, texts: count_batch(texts)
+        self.count_sections = count_sections
+        self.margin = margin
+        self.ranked_tags = ranked_tags
+        self.num_tags = len(ranked_tags)
+
+        # Per file, in order of first appearance: its lines of interest and
+        # the running max rank, in prefix order. Filled in as far as the
+        # search has looked, so tags far below the budget are never touched
+        self._files: List[str] = []
+        self._lois: List[List[int]] = []
+        self._max_ranks: List[List[float]] = []
+        # Per tag position: index of the file it belongs to
+        self._file_of_tag: List[int] = []
+        self._index_of_file: Dict[str, int] = {}
+
+        self._sections: Dict[Tuple[int, int], Tuple[str, int]] = {}
+        self._separator_tokens = token_count(SECTION_SEPARATOR)
+        self.sections_rendered = 0
+        self.maps_counted = 0
+        self.verified: List[Tuple[int, int]] = []   # (estimate, exact) per exactly counted prefix
+
+    def _render_missing(self, keys: List[Tuple[int, int]]):
+        """Render sections (file index, tag count) not seen yet and count them in one batch."""
+        missing = [key for key in keys if key not in self._sections]
+        if not missing:
+            return
+        texts = [
+            self.render_section(self._files[idx], self._lois[idx][:count], self._max_ranks[idx][count - 1])
+            for idx, count in missing
+        ]
+        rel_fnames = [self._files[idx] for idx, _ in missing]
+        for key, text, tokens in zip(missing, texts, self.count_sections(rel_fnames, texts)):
+            self._sections[key] = (text, tokens if text else 0)
+        self.sections_rendered += len(missing)
+
+    def _extend(self, num_tags: int):
+        """Index tags up to ``num_tags`` by file."""
+        index_of_file = self._index_of_file
+        for rank, tag in self.ranked_tags[len(self._file_of_tag):num_tags]:
+            idx = index_of_file.get(tag.rel_fname)
+            if idx is None:
+                idx = index_of_file[tag.rel_fname] = len(self._files)
+                self._files.append(tag.rel_fname)
+                self._lois.append([])
+                self._max_ranks.append([])
+            self._lois[idx].append(tag.line)
+            previous = self._max_ranks[idx]
+            previous.append(max(rank, previous[-1]) if previous else rank)
+            self._file_of_tag.append(idx)
+
+    def _prefix_sections(self, num_tags: int) -> List[Tuple[str, int]]:
+        """Non-empty sections of the map for the first ``num_tags`` tags, in map order."""
+        if num_tags > len(self._file_of_tag):
+            self._extend(num_tags)
+        counts: Dict[int, int] = {}
+        for idx in self._file_of_tag[:num_tags]:
+            counts[idx] = counts.get(idx, 0) + 1
+        # Files are ordered by their max rank, ties by first appearance (as to_tree does)
+        order = sorted(counts, key=lambda idx: self._max_ranks[idx][counts[idx] - 1], reverse=True)
+        keys = [(idx, counts[idx]) for idx in order]
+        self._render_missing(keys)
+        return [section for section in (self._sections[key] for key in keys) if section[0]]
+
+    def estimate(self, num_tags: int) -> int:
+        """Token estimate for a prefix: section counts plus separators."""
+        sections = self._prefix_sections(num_tags)
+        if not sections:
+            return 0
+        return sum(tokens for _, tokens in sections) + self._separator_tokens * (len(sections) - 1)
+
+    def render(self, num_tags: int) -> str:
+        """The map for the first ``num_tags`` tags, from cached sections."""
+        return SECTION_SEPARATOR.join(text for text, _ in self._prefix_sections(num_tags))
+
+    def _count(self, num_tags: int) -> int:
+        self.maps_counted += 1
+        return self.token_count(self.render(num_tags)) if num_tags > 0 else 0
+
+    def pack(self, max_tokens: int, start: int = 0) -> Tuple[int, Optional[str]]:
+        """Largest number of tags whose map fits ``max_tokens``, and that map.
+
+        The prefix is found by exponential then binary search on the
+        estimate, starting from the top of the ranking (or from ``start``
+        tags, known to fit) so that only files near the budget get rendered.
+        The whole map is then counted exactly around that point, galloping
+        outwards until the boundary between fitting and not fitting is
+        bracketed.
+        """
+        if self.margin is not None:
+            return self._pack_within_margin(max_tokens, start)
+
+        best, step = start, 1
+        high = self.num_tags + 1
+        while best + step <= self.num_tags:
+            if self.estimate(best + step) <= max_tokens:
+                best += step
+                step *= 2
+            else:
+                high = best + step
+                break
+        while high - best > 1:
+            mid = (best + high) // 2
+            if self.estimate(mid) <= max_tokens:
+                best = mid
+            else:
+                high = mid
+
+        # Exact check at the boundary: bracket it as fits <= boundary < too_big
+        if self._count(best) <= max_tokens:
+            fits, step = best, 1
+            too_big = self.num_tags + 1
+            while fits + step <= self.num_tags:
+                if self._count(fits + step) <= max_tokens:
+                    fits += step
+                    step *= 2
+                else:
+                    too_big = fits + step
+                    break
+        else:
+            too_big, step = best, 1
+            fits = 0
+            while too_big - step > 0:
+                if self._count(too_big - step) <= max_tokens:
+                    fits = too_big - step
+                    break
+                too_big -= step
+                step *= 2
+        while too_big - fits > 1:
+            mid = (fits + too_big) // 2
+            if self._count(mid) <= max_tokens:
+                fits = mid
+            else:
+                too_big = mid
+
+        if fits == 0:
+            return 0, None
+        return fits, self.render(fits)
+
+    def _fits(self, num_tags: int, max_tokens: int) -> bool:
+        """Whether a prefix fits, counting exactly only near the budget."""
+        if num_tags == 0:
+            return True
+        estimate = self.estimate(num_tags)
+        if estimate <= max_tokens * (1 - self.margin):
+            return True
+        if estimate > max_tokens * (1 + self.margin):
+            return False
+        exact = self._count(num_tags)
+        self.verified.append((estimate, exact))
+        return exact <= max_tokens
+
+    def _pack_within_margin(self, max_tokens: int, start: int) -> Tuple[int, Optional[str]]:
+        """``pack`` on estimates, with exact counts only inside the margin."""
+        best, step = start, 1
+        high = self.num_tags + 1
+        while best + step <= self.num_tags:
+            if self._fits(best + step, max_tokens):
+                best += step
+                step *= 2
+            else:
+                high = best + step
+                break
+        while high - best > 1:
+            mid = (best + high) // 2
+            if self._fits(mid, max_tokens):
+                best = mid
+            else:
+                high = mid
+
+        if best == 0:
+            return 0, None
+        return best, self.render(best)
+
+    def pack_many(self, budgets: Sequence[int]) -> Dict[int, Tuple[int, Optional[str]]]:
+        """``pack`` for several budgets in one sweep over the ranking.
+
+        Budgets are packed smallest first, each search starting from the
+        previous cut point, and all of them share the rendered sections.
+        """
+        results: Dict[int, Tuple[int, Optional[str]]] = {}
+        start = 0
+        for budget in sorted(set(budgets)):
+            results[budget] = self.pack(budget, start)
+            start = results[budget][0]
+        return results
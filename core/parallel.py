@@ -0,0 +1,71 @@
+"""
+Parallel tag extraction for cold-cache runs.
+
+Cache misses are fanned out to a pool of worker processes. Each worker keeps
+its own language registry, so grammars and queries stay warm for the life of
+the pool.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+from .tags import ParsedTag, parse_file_tags
+from .utils import read_text
+
+# Below this many cache misses the pool start-up cost outweighs the gain
+MIN_PARALLEL_FILES = 16
+
+_worker_read_func: Callable[[str], Optional[str]] = read_text
+
+
+def resolve_jobs(jobs: Optional[int]) -> int:
+    """Translate a jobs setting into a worker count (0 or None means all cores)."""
+    if not jobs or jobs < 0:
+        return os.cpu_count() or 1
+    return jobs
+
+
+def _init_worker(read_func: Callable[[str], Optional[str]]):
+    global _worker_read_func
+    _worker_read_func = read_func
+
+
+def _extract_one(item: Tuple[str, str]) -> Tuple[str, List[ParsedTag], List[str]]:
+    fname, rel_fname = item
+    errors: List[str] = []
+    tags = parse_file_tags(fname, rel_fname, _worker_read_func, errors.append)
+    return fname, tags, errors
+
+
+class TagExtractionPool:
+    """A lazily started process pool that parses files into tags."""
+
+    def __init__(self, jobs: int, read_func: Callable[[str], Optional[str]] = read_text):
+        self.jobs = jobs
+        self.read_func = read_func
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def extract(
+        self,
+        items: List[Tuple[str, str]]
+    ) -> List[Tuple[str, List[ParsedTag], List[str]]]:
+        """Parse (fname, rel_fname) pairs, returning (fname, tags, errors) in input order."""
+        if not items:
+            return []
+
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.jobs,
+                initializer=_init_worker,
+                initargs=(self.read_func,)
+            )
+
+        chunksize = max(1, len(items) // (self.jobs * 4))
+        return list(self._executor.map(_extract_one, items, chunksize=chunksize))
+
+    def close(self):
+        """Shut the worker processes down."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,186 @@
+"""
+Precomputed personalized PageRank basis.
+
+Personalized PageRank is linear in the personalization vector up to a final
+normalization: with dangling mass redistributed along the personalization
+(as ``pagerank`` does), the ranks for a set of chat files are the normalized
+sum of the per-file vectors ``(1 - alpha) * (I - alpha * T)^-1 e_s``. A
+``PPRBasis`` stores an approximation of that vector for every file, computed
+by forward push and truncated to its ``top_k`` largest entries, so ranking
+for any chat set is a sum of a few sparse columns instead of a power
+iteration over the whole graph. The ranks are approximate: the top of the
+ranking matches, the long tail only roughly.
+
+Bases are persisted as ``.npz`` files named after a digest of the graph, so
+a fresh process finds the basis built for the same graph.
+"""
+
+import hashlib
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sparse
+
+from .pagerank import pagerank, transition_matrix
+
+BASIS_FORMAT = 1
+
+
+def graph_digest(adjacency: sparse.csr_array, nodes: Sequence[str], alpha: float) -> str:
+    """Content digest of a reference graph and its node names."""
+    adjacency = sparse.csr_array(adjacency)
+    adjacency.sort_indices()
+    digest = hashlib.sha1()
+    digest.update(f"{BASIS_FORMAT}:{alpha}:{adjacency.shape[0]}".encode())
+    digest.update("\0".join(nodes).encode("utf-8", "surrogateescape"))
+    digest.update(adjacency.indptr.astype(np.int64).tobytes())
+    digest.update(adjacency.indices.astype(np.int64).tobytes())
+    digest.update(adjacency.data.astype(np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def forward_push(
+    adjacency: sparse.csr_array,
+    sources: Sequence[int],
+    alpha: float = 0.85,
+    epsilon: float = 1.0e-4,
+    max_rounds: int = 200
+) -> Tuple[sparse.csc_array, sparse.csc_array]:
+    """Approximate PPR vectors (as columns) for the given source nodes.
+
+    Every round pushes, at once, each residual of at least ``epsilon``
+    times its node's out-degree: a ``1 - alpha`` share settles on the node
+    and the rest moves along its out-edges. Scaling the threshold by degree
+    bounds the work per source independently of the graph size. Residuals
+    left below the threshold are returned alongside the estimates.
+    """
+    transition, _ = transition_matrix(adjacency)
+    return _push(transition, _push_thresholds(adjacency, epsilon), sources, alpha, max_rounds)
+
+
+def _push_thresholds(adjacency: sparse.csr_array, epsilon: float) -> np.ndarray:
+    return epsilon * np.maximum(np.diff(sparse.csr_array(adjacency).indptr), 1)
+
+
+def _push(
+    transition: sparse.csr_array,
+    thresholds: np.ndarray,
+    sources: Sequence[int],
+    alpha: float,
+    max_rounds: int
+) -> Tuple[sparse.csc_array, sparse.csc_array]:
+    n = transition.shape[0]
+    k = len(sources)
+    residual = sparse.csc_array(
+        (np.ones(k), (np.asarray(sources, dtype=np.int64), np.arange(k))), shape=(n, k)
+    )
+    estimate = sparse.csc_array((n, k))
+    for _ in range(max_rounds):
+        push = residual.copy()
+        push.data[push.data < thresholds[push.indices]] = 0
+        push.eliminate_zeros()
+        if not push.nnz:
+            break
+        estimate = estimate + (1 - alpha) * push
+        residual = residual - push + alpha * (transition @ push)
+        residual.eliminate_zeros()
+    return estimate.tocsc(), residual.tocsc()
+
+
+def _top_k_columns(matrix: sparse.csc_array, top_k: int) -> sparse.csc_array:
+    """Keep the ``top_k`` largest entries of every column."""
+    matrix = sparse.csc_array(matrix)
+    indptr = matrix.indptr
+    keep = np.ones(matrix.nnz, dtype=bool)
+    for col in np.flatnonzero(np.diff(indptr) > top_k):
+        start, end = indptr[col], indptr[col + 1]
+        smallest = np.argpartition(matrix.data[start:end], end - start - top_k)[: end - start - top_k]
+        keep[start + smallest] = False
+    rows = matrix.indices[keep]
+    cols = np.repeat(np.arange(matrix.shape[1]), np.diff(indptr))[keep]
+    return sparse.csc_array((matrix.data[keep], (rows, cols)), shape=matrix.shape)
+
+
+class PPRBasis:
+    """Truncated per-node PPR vectors for one graph.
+
+    Column j of ``vectors`` approximates node j's PPR vector. The mass that
+    forward push left unpushed or truncation dropped is kept per node in
+    ``leftover`` and spread along the global PageRank vector when ranking,
+    which is where a long random walk ends up anyway.
+    """
+
+    def __init__(self, vectors: sparse.csc_array, leftover: np.ndarray, global_ranks: np.ndarray, digest: str):
+        self.vectors = sparse.csc_array(vectors)
+        self.leftover = leftover
+        self.global_ranks = global_ranks
+        self.digest = digest
+
+    @property
+    def num_nodes(self) -> int:
+        return self.vectors.shape[0]
+
+    @classmethod
+    def build(
+        cls,
+        adjacency: sparse.csr_array,
+        nodes: Sequence[str],
+        alpha: float = 0.85,
+        top_k: int = 64,
+        epsilon: float = 1.0e-4,
+        block_size: int = 256
+    ) -> "PPRBasis":
+        """Run forward push from every node, ``block_size`` sources at a time."""
+        n = adjacency.shape[0]
+        transition, _ = transition_matrix(adjacency)
+        thresholds = _push_thresholds(adjacency, epsilon)
+        blocks: List[sparse.csc_array] = []
+        leftover = np.zeros(n)
+        for start in range(0, n, block_size):
+            sources = range(start, min(start + block_size, n))
+            estimate, residual = _push(transition, thresholds, sources, alpha, max_rounds=200)
+            kept = _top_k_columns(estimate, top_k)
+            leftover[start:start + len(sources)] = (
+                residual.sum(axis=0) + estimate.sum(axis=0) - kept.sum(axis=0)
+            )
+            blocks.append(kept)
+        vectors = sparse.hstack(blocks, format="csc") if blocks else sparse.csc_array((0, 0))
+        global_ranks = pagerank(adjacency, alpha=alpha).ranks
+        return cls(vectors, leftover, global_ranks, graph_digest(adjacency, nodes, alpha))
+
+    def rank(self, sources: Sequence[int]) -> np.ndarray:
+        """Normalized ranks for a personalization spread evenly over ``sources``."""
+        sources = list(sources)
+        ranks = np.asarray(self.vectors[:, sources].sum(axis=1)).ravel()
+        ranks += self.leftover[sources].sum() * self.global_ranks
+        total = ranks.sum()
+        if total == 0:
+            raise ZeroDivisionError("basis vectors sum to zero")
+        return ranks / total
+
+    def save(self, directory: Path):
+        """Write the basis to ``<directory>/<digest>.npz``, atomically."""
+        directory.mkdir(parents=True, exist_ok=True)
+        vectors = self.vectors
+        tmp_path = directory / f"{self.digest}.tmp.npz"
+        np.savez(
+            tmp_path, format=BASIS_FORMAT, shape=np.array(vectors.shape),
+            data=vectors.data, indices=vectors.indices, indptr=vectors.indptr,
+            leftover=self.leftover, global_ranks=self.global_ranks
+        )
+        tmp_path.replace(directory / f"{self.digest}.npz")
+
+    @classmethod
+    def load(cls, directory: Path, digest: str) -> Optional["PPRBasis"]:
+        """Basis saved for the graph digest, or None if there is none."""
+        path = directory / f"{digest}.npz"
+        if not path.exists():
+            return None
+        with np.load(path) as saved:
+            if int(saved["format"]) != BASIS_FORMAT:
+                return None
+            vectors = sparse.csc_array(
+                (saved["data"], saved["indices"], saved["indptr"]), shape=tuple(saved["shape"])
+            )
+            return cls(vectors, saved["leftover"], saved["global_ranks"], digest)
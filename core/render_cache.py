@@ -0,0 +1,97 @@
+"""
+Render cache for map sections.
+
+Rendering a file for the map needs its source lines and a ``TreeContext``,
+which parses the file and is far larger than the source itself. The cache
+keeps both per file, keyed by the file's content digest so that an edited
+file is re-read and re-parsed instead of rendering stale code, and evicts
+least recently used files once the estimated memory use exceeds a cap.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, List, Optional
+
+# Rough TreeContext footprint per character of source, measured on CPython 3.11
+CONTEXT_BYTES_PER_CHAR = 64
+
+
+@dataclass
+class RenderEntry:
+    digest: str
+    context: Any                # TreeContext, or None if it could not be built
+    lines: List[str]            # Source lines, for the plain-text fallback
+    size: int                   # Estimated bytes held by this entry
+
+
+@dataclass
+class RenderCacheStats:
+    hits: int
+    misses: int
+    invalidations: int          # Misses caused by a changed file
+    evictions: int
+    entries: int
+    total_bytes: int
+
+
+class RenderCache:
+    """Memory-bounded LRU of render state per file, invalidated by content digest."""
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, RenderEntry]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get(self, rel_fname: str, digest: str) -> Optional[RenderEntry]:
+        entry = self._entries.get(rel_fname)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.digest != digest:
+            self.discard(rel_fname)
+            self.misses += 1
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(rel_fname)
+        self.hits += 1
+        return entry
+
+    def put(self, rel_fname: str, digest: str, context: Any, code: str) -> RenderEntry:
+        """Store a file's render state and return it, even if too large to keep."""
+        entry = RenderEntry(digest, context, code.splitlines(), len(code) * CONTEXT_BYTES_PER_CHAR)
+        self.discard(rel_fname)
+        if entry.size > self.max_bytes:
+            return entry
+        self._entries[rel_fname] = entry
+        self.total_bytes += entry.size
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= evicted.size
+            self.evictions += 1
+        return entry
+
+    def discard(self, rel_fname: str):
+        entry = self._entries.pop(rel_fname, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def stats(self) -> RenderCacheStats:
+        return RenderCacheStats(
+            hits=self.hits,
+            misses=self.misses,
+            invalidations=self.invalidations,
+            evictions=self.evictions,
+            entries=len(self._entries),
+            total_bytes=self.total_bytes
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
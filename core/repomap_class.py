@@ -3,20 +3,35 @@ RepoMap class for generating repository maps.
 """
 
 import os
-import sys
 from pathlib import Path
-from collections import namedtuple, defaultdict
-from typing import List, Dict, Set, Optional, Tuple, Callable, Any, Union
+from collections import namedtuple, defaultdict, OrderedDict
+from typing import List, Dict, Set, Optional, Sequence, Tuple, Callable, Any, Union
 import shutil
+from functools import partial
 import sqlite3
+import dataclasses
 from dataclasses import dataclass
 import diskcache
-import networkx as nx
-from grep_ast import TreeContext
+import numpy as np
+from grep_ast import TreeContext, filename_to_lang
 
-from .utils import Tag, count_tokens, read_text
-from .scm import get_scm_fname
-from .importance import filter_important_files
+from .utils import Tag, count_tokens, read_text, read_bytes, decode_source, SourceBuffers
+from .languages import get_language_registry
+from .tags import ParsedTag, PackedTag, parse_file_tags, tag_content_from_source, tags_cache_key, pack_tags, unpack_tags
+from .tagstore import TagTable, KIND_DEF, KIND_REF
+from .symbol_index import SymbolIndex
+from .pagerank import EdgeLimits, GraphStats, PageRankConvergenceError, WarmStartCache, build_reference_graph, pagerank_many
+from .ppr_basis import PPRBasis, graph_digest
+from .fingerprint import FileFingerprint, Fingerprinter
+from .incremental import TreeCache
+from .parallel import TagExtractionPool, MIN_PARALLEL_FILES, resolve_jobs
+from .packing import MapPacker, SECTION_SEPARATOR
+from .render_cache import RenderCache
+from .tokens import TokenEstimator
+from .map_cache import FileSetDigest, MapCache, map_cache_key
+from .file_table import FileTable
+from .guards import FileGuards, DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_LINE_LENGTH
+from .tag_ranking import TagRanker
 
 @dataclass
 class SemanticBlock:
@@ -29,14 +44,16 @@ class SemanticBlock:
     rank_score: float
 
 @dataclass
-class ParsedTag:
-    rel_fname: str
-    fname: str
-    line: int
-    name: str
-    kind: str
-    end_line: int
-    content: str
+class RankGraph:
+    """Tags and reference graph for one set of files, shared by ranking passes."""
+    table: TagTable
+    file_ids: List[int]             # Table IDs of the loaded files, in node order
+    included: List[str]             # Loaded files, in node order
+    excluded: Dict[str, str]        # Skipped files -> reason
+    nodes: List[str]                # rel_fnames: loaded files, then skipped ones
+    adjacency: Any                  # Sparse adjacency, or None if it could not be built
+    graph_stats: Optional["GraphStats"]
+    key: Tuple                      # Identifies the graph for memoized ranks
 
 @dataclass
 class FileReport:
@@ -44,13 +61,44 @@ class FileReport:
     definition_matches: int         # Total definition tags
     reference_matches: int          # Total reference tags
     total_files_considered: int     # Total files provided as input
+    graph_stats: Optional[GraphStats] = None  # Edge aggregation and pruning counts
+    pagerank_iterations: int = 0    # Power iterations used for ranking
+    pagerank_warm_start: bool = False  # Whether ranking started from a previous run's ranks
+    pagerank_memo_hit: bool = False    # Whether ranks were reused from an earlier ranking of the same graph
+    pagerank_basis: bool = False    # Whether ranks were assembled from the precomputed PPR basis
+
+@dataclass
+class RankingResult:
+    """One ranking pass, shared by map rendering, semantic blocks and search.
+    
+    The table is the instance's live symbol index, so rows should only be
+    read until the instance ranks files again; ``ranked_tags`` keeps its own
+    copy of the tags and stays valid.
+    """
+    chat_fnames: List[str]
+    other_fnames: List[str]
+    mentioned_fnames: Optional[Set[str]]
+    mentioned_idents: Optional[Set[str]]
+    ranks: Dict[str, float]         # rel_fname -> PageRank
+    report: FileReport
+    included: List[str]             # Files whose tags were loaded
+    table: TagTable
+    file_ids: List[int]             # Table IDs of the included files
+    ranked_tags: Sequence[Tuple[float, ParsedTag]]  # Definitions by boosted rank, descending (lazy)
+    map_files: Optional[Tuple[FileSetDigest, bool]] = None  # Map cache file digest, once computed
+    
+    def search(self, query: str, kinds: Optional[Set[int]] = None) -> List[ParsedTag]:
+        """Tags of the ranked files whose name contains the query."""
+        return self.table.tags(self.table.search(query, kinds, self.file_ids))
 
 
 
 # Constants
-CACHE_VERSION = 1
+CACHE_VERSION = 3
 
 TAGS_CACHE_DIR = f".repomap.tags.cache.v{CACHE_VERSION}"
+RANK_MEMO_SIZE = 64
+PPR_BASIS_DIR = "ppr"               # Inside TAGS_CACHE_DIR
 SQLITE_ERRORS = (sqlite3.OperationalError, sqlite3.DatabaseError)
 
 # Tag namedtuple for storing parsed code definitions and references
@@ -72,7 +120,23 @@ class RepoMap:
         max_context_window: Optional[int] = None,
         map_mul_no_files: int = 8,
         refresh: str = "auto",
-        exclude_unranked: bool = False
+        exclude_unranked: bool = False,
+        jobs: int = 1,
+        tree_cache_size: int = 128,
+        mmap_threshold: Optional[int] = None,
+        max_ident_defs: Optional[int] = None,
+        max_ident_refs: Optional[int] = None,
+        common_ident_defs: Optional[int] = None,
+        common_ident_weight: float = 0.1,
+        ppr_basis: bool = False,
+        ppr_top_k: int = 64,
+        render_cache_bytes: int = 128 * 1024 * 1024,
+        token_estimator: str = "sample",
+        token_margin: float = 0.1,
+        max_file_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES,
+        max_line_length: Optional[int] = DEFAULT_MAX_LINE_LENGTH,
+        skip_binary: bool = True,
+        skip_generated: bool = True
     ):
         """Initialize RepoMap instance."""
         self.map_tokens = map_tokens
@@ -86,6 +150,28 @@ class RepoMap:
         self.map_mul_no_files = map_mul_no_files
         self.refresh = refresh
         self.exclude_unranked = exclude_unranked
+        self.jobs = resolve_jobs(jobs)
+        self.mmap_threshold = mmap_threshold
+        self._extraction_pool: Optional[TagExtractionPool] = None
+        self.edge_limits = EdgeLimits(
+            max_defs=max_ident_defs,
+            max_refs=max_ident_refs,
+            common_defs=common_ident_defs,
+            common_weight=common_ident_weight
+        )
+        self.ppr_basis = ppr_basis
+        self.ppr_top_k = ppr_top_k
+        
+        # "sample" counts a line sample of every text; "calibrated" estimates
+        # from learned per-language ratios and only encodes near the budget
+        self.token_estimator_mode = token_estimator
+        self.token_estimator = None
+        if token_estimator == "calibrated":
+            self.token_estimator = TokenEstimator(token_counter_func)
+        self.token_margin = token_margin
+        
+        # Files rejected before parsing are reported in FileReport.excluded
+        self.file_guards = FileGuards(max_file_bytes, max_line_length, skip_binary, skip_generated)
         
         # Set up output handlers
         if output_handler_funcs is None:
@@ -97,9 +183,15 @@ class RepoMap:
         self.output_handlers = output_handler_funcs
         
         # Initialize caches
-        self.tree_cache = {}
-        self.tree_context_cache = {}
-        self.map_cache = {}
+        self.tree_cache = TreeCache(tree_cache_size)
+        self.source_buffers = SourceBuffers()
+        self.render_cache = RenderCache(render_cache_bytes)
+        self.symbol_index = SymbolIndex()
+        self.warm_starts = WarmStartCache()
+        self._graph_cache: Optional[Tuple[Tuple, Any, Optional[GraphStats]]] = None
+        self._rank_memo: "OrderedDict[Tuple, Dict[str, float]]" = OrderedDict()
+        self._basis_cache: Optional[Tuple[Tuple, Optional[PPRBasis]]] = None
+        self._tag_ranker: Optional[TagRanker] = None
         
         # Load persistent tags cache
         self.load_tags_cache()
@@ -112,6 +204,8 @@ class RepoMap:
         except Exception as e:
             self.output_handlers['warning'](f"Failed to load tags cache: {e}")
             self.TAGS_CACHE = {}
+        self.fingerprinter = Fingerprinter(self.TAGS_CACHE)
+        self.map_cache = MapCache(self.TAGS_CACHE)
     
     def save_tags_cache(self):
         """Save the tags cache (no-op as diskcache handles persistence)."""
@@ -127,15 +221,13 @@ class RepoMap:
         except Exception:
             self.output_handlers['warning']("Failed to recreate tags cache, using in-memory cache")
             self.TAGS_CACHE = {}
+            self.fingerprinter = Fingerprinter(self.TAGS_CACHE)
+            self.map_cache = MapCache(self.TAGS_CACHE)
     
-    def token_count(self, text: str) -> int:
-        """Count tokens in text with sampling optimization for long texts."""
-        if not text:
-            return 0
-        
-        len_text = len(text)
-        if len_text < 200:
-            return self.token_count_func_internal(text)
+    def _token_sample(self, text: str) -> Optional[str]:
+        """Line sample to count for a long text, or None to count the text itself."""
+        if len(text) < 200:
+            return None
         
         # Sample for longer texts
         lines = text.splitlines(keepends=True)
@@ -145,16 +237,71 @@ class RepoMap:
         sampled_lines = lines[::step]
         sample_text = "".join(sampled_lines)
         
-        if not sample_text:
+        return sample_text or None
+    
+    def token_count(self, text: str) -> int:
+        """Count tokens in text with sampling optimization for long texts."""
+        if not text:
+            return 0
+        
+        sample_text = self._token_sample(text)
+        if sample_text is None:
             return self.token_count_func_internal(text)
         
         sample_tokens = self.token_count_func_internal(sample_text)
+        est_tokens = (sample_tokens / len(sample_text)) * len(text)
+        return int(est_tokens)
+    
+    def token_count_batch(self, texts: List[str]) -> List[int]:
+        """``token_count`` for many texts, batched when the counter supports it."""
+        samples = [self._token_sample(text) if text else None for text in texts]
+        to_count = [text if sample is None else sample for text, sample in zip(texts, samples)]
+        count_batch = getattr(self.token_count_func_internal, "count_batch", None)
+        if count_batch is not None:
+            sample_counts = count_batch(to_count)
+        else:
+            sample_counts = [self.token_count_func_internal(t) if t else 0 for t in to_count]
         
-        if len(sample_text) == 0:
-            return self.token_count_func_internal(text)
+        counts = []
+        for text, sample_text, sample_tokens in zip(texts, samples, sample_counts):
+            if sample_text is None:
+                counts.append(sample_tokens)
+            else:
+                counts.append(int((sample_tokens / len(sample_text)) * len(text)))
+        return counts
+    
+    def read_source(self, fname: str) -> Optional[Union[bytes, Any]]:
+        """Read a file's raw bytes, sharing the buffer with later renders in this run."""
+        source = self.source_buffers.get(fname)
+        if source is not None:
+            return source
         
-        est_tokens = (sample_tokens / len(sample_text)) * len_text
-        return int(est_tokens)
+        if self.read_text_func_internal is read_text:
+            source = read_bytes(fname, mmap_threshold=self.mmap_threshold)
+        else:
+            # Custom readers return text
+            code = self.read_text_func_internal(fname)
+            source = code.encode("utf-8", errors="ignore") if code is not None else None
+        
+        if source is not None:
+            self.source_buffers.put(fname, source)
+        return source
+    
+    def read_source_text(self, fname: str) -> Optional[str]:
+        """Read a file as text through the shared source buffers."""
+        source = self.read_source(fname)
+        if source is None:
+            return None
+        return decode_source(source)
+    
+    def get_tag_content(self, tag: ParsedTag) -> str:
+        """Materialize a tag's source text from its byte span."""
+        if tag.content is not None:
+            return tag.content
+        source = self.read_source(tag.fname)
+        if source is None:
+            return ""
+        return tag_content_from_source(tag, source)
     
     def get_rel_fname(self, fname: str) -> str:
         """Get relative filename from absolute path."""
@@ -163,134 +310,163 @@ class RepoMap:
         except ValueError:
             return fname
     
-    def get_mtime(self, fname: str) -> Optional[float]:
-        """Get file modification time."""
+    def get_fingerprint(
+        self, fname: str, rel_fname: str, st: Optional[os.stat_result] = None
+    ) -> Optional[FileFingerprint]:
+        """Get the content fingerprint of a file, from its stat if already known."""
+        # The stat table lives in TAGS_CACHE, which may be swapped out at runtime
+        if self.fingerprinter.store is not self.TAGS_CACHE:
+            self.fingerprinter = Fingerprinter(self.TAGS_CACHE)
         try:
-            return os.path.getmtime(fname)
-        except FileNotFoundError:
+            fingerprint = self.fingerprinter.fingerprint(fname, rel_fname, st)
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
+            fingerprint = self.fingerprinter.fingerprint(fname, rel_fname, st)
+        if fingerprint is None:
             self.output_handlers['warning'](f"File not found: {fname}")
-            return None
+        return fingerprint
     
     def get_tags(self, fname: str, rel_fname: str) -> List[ParsedTag]:
         """Get tags for a file, using cache when possible."""
-        file_mtime = self.get_mtime(fname)
-        if file_mtime is None:
+        return unpack_tags(self.get_packed_tags(fname, rel_fname), fname, rel_fname)
+    
+    def get_packed_tags(self, fname: str, rel_fname: str) -> List[PackedTag]:
+        """Get a file's tags in their compact cached form, parsing on a miss."""
+        fingerprint = self.get_fingerprint(fname, rel_fname)
+        if fingerprint is None:
             return []
+        return self._load_packed_tags(fname, rel_fname, fingerprint)
+    
+    def _load_packed_tags(self, fname: str, rel_fname: str, fingerprint: FileFingerprint) -> List[PackedTag]:
+        packed = self._get_cached_tags(fname, fingerprint)
+        if packed is not None:
+            return packed
         
+        # Cache miss or file changed
+        packed = pack_tags(self.get_tags_raw(fname, rel_fname))
+        self._store_tags(fname, fingerprint, packed)
+        return packed
+    
+    def _get_cached_tags(self, fname: str, fingerprint: FileFingerprint) -> Optional[List[PackedTag]]:
+        """Return cached tags for the file's current content, if any."""
         try:
-            # Handle both diskcache Cache and in-memory dict
-            if isinstance(self.TAGS_CACHE, dict):
-                cached_entry = self.TAGS_CACHE.get(fname)
-            else:
-                cached_entry = self.TAGS_CACHE.get(fname)
-                
-            if cached_entry and cached_entry.get("mtime") == file_mtime:
-                return cached_entry["data"]
+            return self.TAGS_CACHE.get(tags_cache_key(fname, fingerprint.digest))
         except SQLITE_ERRORS:
             self.tags_cache_error()
-        
-        # Cache miss or file changed
-        tags = self.get_tags_raw(fname, rel_fname)
-        
+        return None
+    
+    def _store_tags(self, fname: str, fingerprint: FileFingerprint, packed: List[PackedTag]):
+        """Write tags for the file's current content to the cache."""
         try:
-            self.TAGS_CACHE[fname] = {"mtime": file_mtime, "data": tags}
+            self.TAGS_CACHE[tags_cache_key(fname, fingerprint.digest)] = packed
         except SQLITE_ERRORS:
             self.tags_cache_error()
+    
+    def build_tag_table(
+        self, fnames: List[str], files: Optional[FileTable] = None
+    ) -> Tuple[TagTable, List[int], List[str], Dict[str, str]]:
+        """Bring the symbol index up to date for many files.
         
-        return tags
+        Only files whose content changed since the previous call are
+        reloaded. Returns the index's table, the table file IDs of the files
+        that were loaded, those files, and the files that were skipped with
+        their reasons. The table may also hold files from earlier calls, so
+        callers should restrict themselves to the returned IDs. ``files`` is
+        the run's file table, if the paths were already looked up in it.
+        """
+        if files is None:
+            files = self.new_file_table()
+        index = self.symbol_index
+        file_ids: List[int] = []
+        included: List[str] = []
+        excluded: Dict[str, str] = {}
+        
+        for fname in fnames:
+            entry = files.get(fname)
+            rel_fname = entry.rel_fname
+            if entry.stat is None:
+                index.remove(rel_fname)
+                excluded[fname] = "File not found"
+                continue
+            
+            reason = self.file_guards.check_path(rel_fname, entry.stat.st_size)
+            fingerprint = None
+            if reason is None:
+                fingerprint = self.get_fingerprint(fname, rel_fname, entry.stat)
+                if fingerprint is not None:
+                    reason = self.file_guards.check_content(fingerprint)
+            if reason is not None:
+                index.remove(rel_fname)
+                excluded[fname] = reason
+                continue
+            
+            included.append(fname)
+            if fingerprint is None:
+                file_ids.append(index.update(rel_fname, fname, "", list))
+                continue
+            file_ids.append(index.update(
+                rel_fname, fname, fingerprint.digest,
+                partial(self._load_packed_tags, fname, rel_fname, fingerprint)
+            ))
+        
+        return index.table, file_ids, included, excluded
     
     def get_tags_raw(self, fname: str, rel_fname: str) -> List[ParsedTag]:
         """Parse file to extract tags using Tree-sitter."""
-        try:
-            from grep_ast import filename_to_lang
-            from grep_ast.tsl import get_language, get_parser
-            from tree_sitter import QueryCursor
-        except ImportError:
-            print("Error: grep-ast is required. Install with: pip install grep-ast")
-            sys.exit(1)
-            
-        lang = filename_to_lang(fname)
-        if not lang:
-            return []
+        # Always parse what is on disk now, never a buffer from an earlier read
+        self.source_buffers.discard(fname)
+        return parse_file_tags(
+            fname, rel_fname, self.read_source, self.output_handlers['error'],
+            tree_cache=self.tree_cache
+        )
+    
+    def prefetch_tags(self, fnames: List[str], files: Optional[FileTable] = None):
+        """Parse cache misses in parallel and merge the results into the tags cache."""
+        if self.jobs <= 1 or len(fnames) < MIN_PARALLEL_FILES:
+            return
         
-        try:
-            language = get_language(lang)
-            parser = get_parser(lang)
-        except Exception as err:
-            self.output_handlers['error'](f"Skipping file {fname}: {err}")
-            return []
+        if files is None:
+            files = self.new_file_table()
+        misses = []
+        for fname in fnames:
+            entry = files.get(fname)
+            rel_fname = entry.rel_fname
+            if entry.stat is not None and self.file_guards.check_path(rel_fname, entry.stat.st_size):
+                continue
+            fingerprint = self.get_fingerprint(fname, rel_fname, entry.stat)
+            if fingerprint is None or self.file_guards.check_content(fingerprint):
+                continue
+            if self._get_cached_tags(fname, fingerprint) is None:
+                misses.append((fname, rel_fname, fingerprint))
         
-        scm_fname = get_scm_fname(lang)
-        if not scm_fname:
-            return []
+        if len(misses) < MIN_PARALLEL_FILES:
+            return
         
-        code = self.read_text_func_internal(fname)
-        if not code:
-            return []
+        if self._extraction_pool is None:
+            if self.read_text_func_internal is read_text:
+                read_func = partial(read_bytes, mmap_threshold=self.mmap_threshold)
+            else:
+                read_func = self.read_text_func_internal
+            self._extraction_pool = TagExtractionPool(self.jobs, read_func)
         
         try:
-            tree = parser.parse(bytes(code, "utf-8"))
-            
-            # Load query from SCM file
-            query_text = read_text(scm_fname, silent=True)
-            if not query_text:
-                return []
-            
-            query = language.query(query_text)
-            cursor = QueryCursor(query)
-            captures = cursor.captures(tree.root_node)
-            
-            tags = []
-            # Process captures as a dictionary
-            for capture_name, nodes in captures.items():
-                for node in nodes:
-                    if "name.definition" in capture_name:
-                        kind = "def"
-                    elif "name.reference" in capture_name:
-                        kind = "ref"
-                    else:
-                        # Skip other capture types like 'reference.call' if not needed for tagging
-                        continue 
-                    
-                    line_num = node.start_point[0] + 1
-                    end_line = node.end_point[0] + 1
-                    # Handle potential None value
-                    name = node.text.decode('utf-8') if node.text else ""
-                    
-                    # For definitions, we want the full content of the definition node
-                    # But 'node' here is often just the identifier (name) node because of how captures work
-                    # We need to find the parent definition node to get the full content
-                    content = ""
-                    if kind == "def":
-                        # Traverse up to find the definition node
-                        curr = node
-                        while curr:
-                            if curr.type in ("function_definition", "class_definition", "method_definition"):
-                                content = curr.text.decode('utf-8') if curr.text else ""
-                                line_num = curr.start_point[0] + 1
-                                end_line = curr.end_point[0] + 1
-                                break
-                            curr = curr.parent
-                        
-                        # If we couldn't find a specific definition node, fallback to the capture node
-                        if not content:
-                             content = node.text.decode('utf-8') if node.text else ""
-
-                    tags.append(ParsedTag(
-                        rel_fname=rel_fname,
-                        fname=fname,
-                        line=line_num,
-                        name=name,
-                        kind=kind,
-                        end_line=end_line,
-                        content=content
-                    ))
-            
-            return tags
-            
+            results = self._extraction_pool.extract([(f, rel) for f, rel, _ in misses])
         except Exception as e:
-            self.output_handlers['error'](f"Error parsing {fname}: {e}")
-            return []
+            # Fall back to serial parsing in get_tags
+            self.output_handlers['warning'](f"Parallel tag extraction failed: {e}")
+            self.close()
+            return
+        
+        for (fname, _, fingerprint), (_, tags, errors) in zip(misses, results):
+            for error in errors:
+                self.output_handlers['error'](error)
+            self._store_tags(fname, fingerprint, pack_tags(tags))
+    
+    def close(self):
+        """Release worker processes held by this instance."""
+        if self._extraction_pool is not None:
+            self._extraction_pool.close()
+            self._extraction_pool = None
     
     def _calculate_file_ranks(
         self,
@@ -300,118 +476,263 @@ class RepoMap:
         mentioned_idents: Optional[Set[str]] = None
     ) -> Tuple[Dict[str, float], FileReport, List[str]]:
         """Calculate PageRank for files."""
+        ranks, file_report, included, _, _ = self._rank_files(
+            chat_fnames, other_fnames, mentioned_fnames, mentioned_idents
+        )
+        return ranks, file_report, included
+    
+    def _rank_files(
+        self,
+        chat_fnames: List[str],
+        other_fnames: List[str],
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None,
+        files: Optional[FileTable] = None
+    ) -> Tuple[Dict[str, float], FileReport, List[str], TagTable, List[int]]:
+        """Calculate PageRank for files, also returning the tag table and the IDs of the ranked files."""
         # Return empty list and empty report if no files
         if not chat_fnames and not other_fnames:
-            return {}, FileReport({}, 0, 0, 0), []
-            
-        # Initialize file report early
-        included: List[str] = []
-        excluded: Dict[str, str] = {}
-        total_definitions = 0
-        total_references = 0
-        if mentioned_fnames is None:
-            mentioned_fnames = set()
-        if mentioned_idents is None:
-            mentioned_idents = set()
-        
-        # Normalize paths to absolute
-        def normalize_path(path):
-            return str(Path(path).resolve())
-        
-        chat_fnames = [normalize_path(f) for f in chat_fnames]
-        other_fnames = [normalize_path(f) for f in other_fnames]
-        
-        # Initialize file report
-        included: List[str] = []
-        excluded: Dict[str, str] = {}
-        input_files: Dict[str, Dict] = {}
-        total_definitions = 0
-        total_references = 0
+            return {}, FileReport({}, 0, 0, 0), [], TagTable(), []
         
-        # Collect all tags
-        defines = defaultdict(set)
-        references = defaultdict(set)
-        definitions = defaultdict(set)
+        # Buffers are shared between parsing and rendering within a single run
+        self.source_buffers.clear()
         
-        personalization = {}
-        chat_rel_fnames = set(self.get_rel_fname(f) for f in chat_fnames)
+        if files is None:
+            files = self.new_file_table()
+        chat_fnames = [files.resolve(f) for f in chat_fnames]
+        other_fnames = [files.resolve(f) for f in other_fnames]
         
         all_fnames = sorted(list(set(chat_fnames + other_fnames)))
+        graph = self._load_rank_graph(all_fnames, files)
+        table, file_ids, included, excluded = graph.table, graph.file_ids, graph.included, graph.excluded
+        total_definitions = table.count(KIND_DEF, file_ids)
+        total_references = table.count(KIND_REF, file_ids)
         
-        for fname in all_fnames:
-            rel_fname = self.get_rel_fname(fname)
-            
-            if not os.path.exists(fname):
-                reason = "File not found"
-                excluded[fname] = reason
-                continue
-                
-            included.append(fname)
-            
-            tags = self.get_tags(fname, rel_fname)
-            
-            for tag in tags:
-                if tag.kind == "def":
-                    defines[tag.name].add(rel_fname)
-                    definitions[rel_fname].add(tag.name)
-                    total_definitions += 1
-                elif tag.kind == "ref":
-                    references[tag.name].add(rel_fname)
-                    total_references += 1
-            
-            # Set personalization for chat files
-            if fname in chat_fnames:
-                personalization[rel_fname] = 100.0
-        
-        # Build graph
-        G = nx.MultiDiGraph()
-        
-        # Add nodes
-        for fname in all_fnames:
-            rel_fname = self.get_rel_fname(fname)
-            G.add_node(rel_fname)
-        
-        # Add edges based on references
-        for name, ref_fnames in references.items():
-            def_fnames = defines.get(name, set())
-            for ref_fname in ref_fnames:
-                for def_fname in def_fnames:
-                    if ref_fname != def_fname:
-                        G.add_edge(ref_fname, def_fname, name=name)
-        
-        if not G.nodes():
-            return {}, FileReport(excluded, total_definitions, total_references, len(all_fnames)), included
-
-        # Run PageRank
-        try:
-            if personalization:
-                ranks = nx.pagerank(G, personalization=personalization, alpha=0.85)
-            else:
-                # Run PageRank without personalization (global importance)
-                # print(f"Running PageRank on graph with {len(G.nodes())} nodes and {len(G.edges())} edges")
-                ranks = nx.pagerank(G, alpha=0.85)
-                # print(f"PageRank successful. Top rank: {max(ranks.values())}")
-        except Exception as e:
-            self.output_handlers['warning'](f"PageRank failed: {e}")
-            # Fallback to uniform ranking
-            ranks = {node: 1.0 for node in G.nodes()}
+        if not graph.nodes:
+            return {}, FileReport(excluded, total_definitions, total_references, len(all_fnames)), included, table, file_ids
+        
+        ranks, iterations, warm_start, from_basis, memo_hit = self._rank_graph(graph, [chat_fnames])[0]
         
         # Update excluded dictionary with status information
+        included_set = set(included)
         for fname in set(chat_fnames + other_fnames):
             if fname in excluded:
                 # Add status prefix to existing exclusion reason
                 excluded[fname] = f"[EXCLUDED] {excluded[fname]}"
-            elif fname not in included:
+            elif fname not in included_set:
                 excluded[fname] = "[NOT PROCESSED] File not included in final processing"
         # Create file report
         file_report = FileReport(
             excluded=excluded,
             definition_matches=total_definitions,
             reference_matches=total_references,
-            total_files_considered=len(all_fnames)
+            total_files_considered=len(all_fnames),
+            graph_stats=graph.graph_stats,
+            pagerank_iterations=iterations,
+            pagerank_warm_start=warm_start,
+            pagerank_basis=from_basis,
+            pagerank_memo_hit=memo_hit
         )
         
-        return ranks, file_report, included
+        return ranks, file_report, included, table, file_ids
+    
+    def rank_many(
+        self,
+        chat_fname_sets: List[List[str]],
+        other_fnames: List[str]
+    ) -> List[Dict[str, float]]:
+        """Rank files for many chat file sets at once.
+        
+        Chat sets that produce the same graph are ranked together in one
+        batched power iteration. The results are also kept for later
+        get_repo_map calls with the same files, which then skip ranking.
+        Returns one rel_fname -> rank dict per chat set, in order.
+        """
+        self.source_buffers.clear()
+        files = self.new_file_table()
+        other_fnames = [files.resolve(f) for f in other_fnames]
+        
+        # Chat files join the graph, so sets are grouped by the file list they produce
+        groups: Dict[Tuple[str, ...], List[int]] = defaultdict(list)
+        normalized = []
+        for i, chat_fnames in enumerate(chat_fname_sets):
+            chat_fnames = [files.resolve(f) for f in chat_fnames]
+            normalized.append(chat_fnames)
+            groups[tuple(sorted(set(chat_fnames + other_fnames)))].append(i)
+        
+        results: List[Dict[str, float]] = [{} for _ in chat_fname_sets]
+        for all_fnames, members in groups.items():
+            graph = self._load_rank_graph(list(all_fnames), files)
+            if not graph.nodes:
+                continue
+            ranked = self._rank_graph(graph, [normalized[i] for i in members])
+            for i, (ranks, *_) in zip(members, ranked):
+                results[i] = ranks
+        return results
+    
+    def new_file_table(self) -> FileTable:
+        """An empty file table for one run over this root."""
+        return FileTable(str(self.root))
+    
+    def _load_rank_graph(self, all_fnames: List[str], files: Optional[FileTable] = None) -> RankGraph:
+        """Load tags for the files and build (or reuse) their reference graph."""
+        if files is None:
+            files = self.new_file_table()
+        self.prefetch_tags(all_fnames, files)
+        
+        # Collect all tags
+        table, file_ids, included, excluded = self.build_tag_table(all_fnames, files)
+        
+        # Graph nodes are the loaded files followed by any files that were skipped
+        nodes = [table.files[file_id] for file_id in file_ids]
+        node_set = set(nodes)
+        for fname in excluded:
+            rel_fname = files.rel_fname(fname)
+            if rel_fname not in node_set:
+                node_set.add(rel_fname)
+                nodes.append(rel_fname)
+        
+        limits = self.edge_limits
+        key = (
+            table.version, tuple(file_ids), len(nodes),
+            (limits.max_defs, limits.max_refs, limits.common_defs, limits.common_weight)
+        )
+        adjacency, graph_stats = None, None
+        if self._graph_cache is not None and self._graph_cache[0] == key:
+            _, adjacency, graph_stats = self._graph_cache
+        elif nodes:
+            try:
+                adjacency, graph_stats = build_reference_graph(table, len(nodes), limits, file_ids)
+                self._graph_cache = (key, adjacency, graph_stats)
+            except Exception as e:
+                self.output_handlers['warning'](f"PageRank failed: {e}")
+        
+        return RankGraph(table, file_ids, included, excluded, nodes, adjacency, graph_stats, key)
+    
+    def build_ppr_basis(self, fnames: List[str]) -> Optional[PPRBasis]:
+        """Precompute and persist the personalized PageRank basis for these files.
+        
+        Later runs over the same files and reference graph, in this or a new
+        process, assemble chat-file ranks from the basis when ``ppr_basis``
+        is enabled instead of running a power iteration.
+        """
+        files = self.new_file_table()
+        fnames = sorted(set(files.resolve(f) for f in fnames))
+        graph = self._load_rank_graph(fnames, files)
+        if not graph.nodes:
+            return None
+        return self._get_ppr_basis(graph, build=True)
+    
+    def _get_ppr_basis(self, graph: RankGraph, build: bool) -> Optional[PPRBasis]:
+        """PPR basis of the graph from memory or disk, building it if asked to."""
+        if graph.adjacency is None:
+            return None
+        if self._basis_cache is not None and self._basis_cache[0] == graph.key:
+            basis = self._basis_cache[1]
+            if basis is not None or not build:
+                return basis
+        
+        basis_dir = self.root / TAGS_CACHE_DIR / PPR_BASIS_DIR
+        digest = graph_digest(graph.adjacency, graph.nodes, 0.85)
+        try:
+            basis = PPRBasis.load(basis_dir, digest)
+        except Exception as e:
+            self.output_handlers['warning'](f"Failed to load PPR basis: {e}")
+            basis = None
+        if basis is None and build:
+            basis = PPRBasis.build(graph.adjacency, graph.nodes, alpha=0.85, top_k=self.ppr_top_k)
+            try:
+                basis.save(basis_dir)
+            except OSError as e:
+                self.output_handlers['warning'](f"Failed to save PPR basis: {e}")
+        self._basis_cache = (graph.key, basis)
+        return basis
+    
+    def _rank_graph(
+        self, graph: RankGraph, chat_fname_sets: List[List[str]]
+    ) -> List[Tuple[Dict[str, float], int, bool, bool, bool]]:
+        """Rank a graph for several chat sets.
+        
+        Returns (ranks, iterations, warm_start, from_basis, memo_hit) per set.
+        
+        Results are memoized per graph and chat signature. With ``ppr_basis``
+        enabled and a basis built for the graph, chat sets are ranked from
+        it. The rest are computed in one batched power iteration, each
+        warm-started from the previous ranks when available.
+        """
+        nodes = graph.nodes
+        node_of_fname = {fname: node for node, fname in enumerate(graph.included)}
+        
+        results: List[Optional[Tuple[Dict[str, float], int, bool, bool, bool]]] = []
+        pending: Dict[Tuple[str, ...], List[int]] = {}
+        for i, chat_fnames in enumerate(chat_fname_sets):
+            signature = tuple(sorted({nodes[node_of_fname[f]] for f in chat_fnames if f in node_of_fname}))
+            memo = self._rank_memo.get((graph.key, signature))
+            if memo is not None:
+                self._rank_memo.move_to_end((graph.key, signature))
+                results.append((memo, 0, False, False, True))
+                continue
+            results.append(None)
+            pending.setdefault(signature, []).append(i)
+        
+        if not pending:
+            return results
+        
+        node_of_rel = {rel_fname: node for node, rel_fname in enumerate(nodes)}
+        basis = None
+        if self.ppr_basis and any(pending):
+            basis = self._get_ppr_basis(graph, build=False)
+        if basis is not None:
+            for signature in [signature for signature in pending if signature]:
+                ranks = dict(zip(nodes, basis.rank([node_of_rel[f] for f in signature]).tolist()))
+                self._remember_ranks(graph.key, signature, ranks)
+                for i in pending.pop(signature):
+                    results[i] = (ranks, 0, False, True, False)
+            if not pending:
+                return results
+        
+        signatures = list(pending)
+        personalizations = []
+        for signature in signatures:
+            personalization = None
+            if signature:
+                # Set personalization for chat files
+                personalization = np.zeros(len(nodes))
+                for rel_fname in signature:
+                    personalization[node_of_rel[rel_fname]] = 100.0
+            personalizations.append(personalization)
+        nstarts = [self.warm_starts.get(signature, nodes) for signature in signatures]
+        
+        try:
+            if graph.adjacency is None:
+                raise ValueError("reference graph unavailable")
+            try:
+                ranked = pagerank_many(graph.adjacency, personalizations, alpha=0.85, nstarts=nstarts)
+            except PageRankConvergenceError as e:
+                # The last iterate is still far closer than uniform ranks
+                self.output_handlers['warning'](f"{e}; using the last iterate")
+                ranked = e.results
+            computed = []
+            for signature, nstart, result in zip(signatures, nstarts, ranked):
+                ranks = dict(zip(nodes, result.ranks.tolist()))
+                self.warm_starts.put(signature, ranks)
+                self._remember_ranks(graph.key, signature, ranks)
+                computed.append((ranks, result.iterations, nstart is not None, False, False))
+        except Exception as e:
+            self.output_handlers['warning'](f"PageRank failed: {e}")
+            # Fallback to uniform ranking
+            uniform = {node: 1.0 for node in nodes}
+            computed = [(uniform, 0, False, False, False) for _ in signatures]
+        
+        for signature, outcome in zip(signatures, computed):
+            for i in pending[signature]:
+                results[i] = outcome
+        return results
+    
+    def _remember_ranks(self, graph_key: Tuple, signature: Tuple[str, ...], ranks: Dict[str, float]):
+        self._rank_memo[(graph_key, signature)] = ranks
+        while len(self._rank_memo) > RANK_MEMO_SIZE:
+            self._rank_memo.popitem(last=False)
 
     def get_ranked_tags(
         self,
@@ -421,72 +742,114 @@ class RepoMap:
         mentioned_idents: Optional[Set[str]] = None
     ) -> Tuple[List[Tuple[float, ParsedTag]], FileReport]:
         """Get ranked tags using PageRank algorithm with file report."""
-        ranks, file_report, included = self._calculate_file_ranks(
-            chat_fnames, other_fnames, mentioned_fnames, mentioned_idents
+        ranking = self.rank(chat_fnames, other_fnames, mentioned_fnames, mentioned_idents)
+        return ranking.ranked_tags, ranking.report
+    
+    def rank(
+        self,
+        chat_fnames: List[str],
+        other_fnames: List[str],
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None,
+        files: Optional[FileTable] = None
+    ) -> RankingResult:
+        """Rank files and their definitions once, for reuse by maps, blocks and search.
+        
+        ``files`` is a file table already used in this run, so that its
+        paths are not resolved and stat'ed again.
+        """
+        ranks, file_report, included, table, file_ids = self._rank_files(
+            chat_fnames, other_fnames, mentioned_fnames, mentioned_idents, files
+        )
+        ranked_tags = self._rank_tags(ranks, table, file_ids, chat_fnames, mentioned_fnames, mentioned_idents)
+        return RankingResult(
+            chat_fnames=chat_fnames,
+            other_fnames=other_fnames,
+            mentioned_fnames=mentioned_fnames,
+            mentioned_idents=mentioned_idents,
+            ranks=ranks,
+            report=file_report,
+            included=included,
+            table=table,
+            file_ids=file_ids,
+            ranked_tags=ranked_tags
         )
+    
+    def rerank(
+        self,
+        ranking: RankingResult,
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None
+    ) -> RankingResult:
+        """A ranking's files under new mentions, for agent turns over unchanged files.
         
+        File ranks, tags and per-file renders are reused as they are and
+        nothing is checked on disk: only the mention boosts are applied
+        again. Use ``rank`` when files may have changed.
+        """
+        ranked_tags = self._rank_tags(
+            ranking.ranks, ranking.table, ranking.file_ids, ranking.chat_fnames,
+            mentioned_fnames, mentioned_idents
+        )
+        return dataclasses.replace(
+            ranking,
+            mentioned_fnames=mentioned_fnames,
+            mentioned_idents=mentioned_idents,
+            ranked_tags=ranked_tags
+        )
+    
+    def _rank_tags(
+        self,
+        ranks: Dict[str, float],
+        table: TagTable,
+        file_ids: List[int],
+        chat_fnames: List[str],
+        mentioned_fnames: Optional[Set[str]],
+        mentioned_idents: Optional[Set[str]]
+    ) -> List[Tuple[float, ParsedTag]]:
         if not ranks:
-            return [], file_report
-            
-        # Helper sets for boosting
-        if mentioned_fnames is None:
-            mentioned_fnames = set()
-        if mentioned_idents is None:
-            mentioned_idents = set()
-            
-        chat_rel_fnames = set(self.get_rel_fname(f) for f in chat_fnames)
-        
-        # Collect and rank tags
-        ranked_tags = []
-        
-        for fname in included:
-            rel_fname = self.get_rel_fname(fname)
-            file_rank = ranks.get(rel_fname, 0.0)
-
-            # Exclude files with low Page Rank if exclude_unranked is True
-            if self.exclude_unranked and file_rank <= 0.0001:  # Use a small threshold to exclude near-zero ranks
-                continue
-            
-            tags = self.get_tags(fname, rel_fname)
-            for tag in tags:
-                if tag.kind == "def":
-                    # Boost for mentioned identifiers
-                    boost = 1.0
-                    if tag.name in mentioned_idents:
-                        boost *= 10.0
-                    if rel_fname in mentioned_fnames:
-                        boost *= 5.0
-                    if rel_fname in chat_rel_fnames:
-                        boost *= 20.0
-                    
-                    final_rank = file_rank * boost
-                    ranked_tags.append((final_rank, tag))
-        
-        # Sort by rank (descending)
-        ranked_tags.sort(key=lambda x: x[0], reverse=True)
+            return []
         
-        return ranked_tags, file_report
+        # Definitions, file ranks and chat boosts are gathered once per
+        # ranking; only the mention boosts are applied again
+        chat_rel_fnames = set(self.get_rel_fname(f) for f in chat_fnames)
+        ranker = self._tag_ranker
+        if ranker is None or not ranker.matches(table, file_ids, ranks, chat_rel_fnames, self.exclude_unranked):
+            ranker = self._tag_ranker = TagRanker(table, file_ids, ranks, chat_rel_fnames, self.exclude_unranked)
+        return ranker.ranked_tags(mentioned_fnames, mentioned_idents)
     
-    def render_tree(self, abs_fname: str, rel_fname: str, lois: List[int]) -> str:
-        """Render a code snippet with specific lines of interest."""
-        code = self.read_text_func_internal(abs_fname)
-        if not code:
+    def render_tree(
+        self, abs_fname: str, rel_fname: str, lois: List[int], st: Optional[os.stat_result] = None
+    ) -> str:
+        """Render a code snippet with specific lines of interest, from the file's stat if already known."""
+        fingerprint = self.get_fingerprint(abs_fname, rel_fname, st)
+        if fingerprint is None:
             return ""
         
-        # Use TreeContext for rendering
-        try:
-            if rel_fname not in self.tree_context_cache:
-                self.tree_context_cache[rel_fname] = TreeContext(
+        # The file is only read and parsed when its content changed since it was last rendered
+        entry = self.render_cache.get(rel_fname, fingerprint.digest)
+        if entry is None:
+            code = self.read_source_text(abs_fname)
+            if not code:
+                return ""
+            try:
+                tree_context = TreeContext(
                     rel_fname,
                     code,
                     color=False
                 )
-            
-            tree_context = self.tree_context_cache[rel_fname]
-            return tree_context.format(lois)
+            except Exception:
+                tree_context = None
+            entry = self.render_cache.put(rel_fname, fingerprint.digest, tree_context, code)
+        
+        # Use TreeContext for rendering
+        try:
+            if entry.context is None:
+                raise ValueError(f"No syntax tree for {rel_fname}")
+            return entry.context.format(lois)
         except Exception:
             # Fallback to simple line extraction
-            lines = code.splitlines()
+            lines = entry.lines
             result_lines = [f"{rel_fname}:"]
             
             for loi in sorted(set(lois)):
@@ -513,32 +876,49 @@ class RepoMap:
         )
         
         tree_parts = []
+        files = self.new_file_table()
         
         for rel_fname, file_tag_list in sorted_files:
             # Get lines of interest
             lois = [tag.line for rank, tag in file_tag_list]
             
-            # Find absolute filename
-            abs_fname = str(self.root / rel_fname)
-            
             # Get the max rank for the file
             max_rank = max(rank for rank, tag in file_tag_list)
             
-            # Render the tree for this file
-            rendered = self.render_tree(abs_fname, rel_fname, lois)
-            if rendered:
-                # Add rank value to the output
-                rendered_lines = rendered.splitlines()
-                first_line = rendered_lines[0]
-                code_lines = rendered_lines[1:]
-                
-                tree_parts.append(
-                    f"{first_line}\n"
-                    f"(Rank value: {max_rank:.4f})\n\n" # Added an extra newline here
-                    + "\n".join(code_lines)
-                )
+            section = self._render_file_section(rel_fname, lois, max_rank, files)
+            if section:
+                tree_parts.append(section)
         
-        return "\n\n".join(tree_parts)
+        return SECTION_SEPARATOR.join(tree_parts)
+    
+    def _render_file_section(
+        self, rel_fname: str, lois: List[int], max_rank: float, files: Optional[FileTable] = None
+    ) -> str:
+        """One file's part of the map, or "" if the file cannot be rendered.
+        
+        ``files`` is the run's file table, whose entry for the file was
+        already resolved and stat'ed when the file was ranked.
+        """
+        if files is None:
+            files = self.new_file_table()
+        # A file outside the root is named by its absolute path, which join keeps as is
+        entry = files.get(os.path.join(files.root, rel_fname))
+        
+        # Render the tree for this file
+        rendered = self.render_tree(entry.fname, rel_fname, lois, entry.stat)
+        if not rendered:
+            return ""
+        
+        # Add rank value to the output
+        rendered_lines = rendered.splitlines()
+        first_line = rendered_lines[0]
+        code_lines = rendered_lines[1:]
+        
+        return (
+            f"{first_line}\n"
+            f"(Rank value: {max_rank:.4f})\n\n" # Added an extra newline here
+            + "\n".join(code_lines)
+        )
     
     def get_ranked_tags_map(
         self,
@@ -547,27 +927,117 @@ class RepoMap:
         max_map_tokens: int,
         mentioned_fnames: Optional[Set[str]] = None,
         mentioned_idents: Optional[Set[str]] = None,
-        force_refresh: bool = False
-    ) -> Optional[str]:
-        """Get the ranked tags map with caching."""
-        cache_key = (
-            tuple(sorted(chat_fnames)),
-            tuple(sorted(other_fnames)),
-            max_map_tokens,
-            tuple(sorted(mentioned_fnames or [])),
-            tuple(sorted(mentioned_idents or [])),
-        )
+        force_refresh: bool = False,
+        ranking: Optional[RankingResult] = None
+    ) -> Tuple[Optional[str], FileReport]:
+        """Get the ranked tags map, reusing a cached map while its files are unchanged."""
+        return self.get_ranked_tags_maps(
+            chat_fnames, other_fnames, [max_map_tokens],
+            mentioned_fnames, mentioned_idents, force_refresh, ranking
+        )[max_map_tokens]
+    
+    def get_ranked_tags_maps(
+        self,
+        chat_fnames: List[str],
+        other_fnames: List[str],
+        budgets: List[int],
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None,
+        force_refresh: bool = False,
+        ranking: Optional[RankingResult] = None
+    ) -> Dict[int, Tuple[Optional[str], FileReport]]:
+        """Ranked tags maps for several token budgets, keyed by budget.
+        
+        Cached maps are looked up per budget; the rest are cut from one
+        ranking in a single packing sweep and cached.
+        """
+        results: Dict[int, Tuple[Optional[str], FileReport]] = {}
+        cache_keys: Dict[int, str] = {}
+        persistent = False
+        # Paths are looked up once for the cache key and the ranking
+        file_table = self.new_file_table()
+        try:
+            # A ranking's files are the ones it was ranked from, so their digest is kept with it
+            if ranking is not None and ranking.map_files is not None:
+                files, persistent = ranking.map_files
+            else:
+                files, persistent = self._map_file_digest(chat_fnames, other_fnames, file_table)
+                if ranking is not None:
+                    ranking.map_files = (files, persistent)
+            for budget in budgets:
+                cache_keys[budget] = self._map_cache_key(files, budget, mentioned_fnames, mentioned_idents)
+                if not force_refresh:
+                    result = self.map_cache.get(cache_keys[budget], persistent)
+                    if result is not None:
+                        results[budget] = result
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
+            cache_keys = {}
         
-        if not force_refresh and cache_key in self.map_cache:
-            return self.map_cache[cache_key]
+        missing = [budget for budget in budgets if budget not in results]
+        if not missing:
+            return results
         
-        result = self.get_ranked_tags_map_uncached(
-            chat_fnames, other_fnames, max_map_tokens,
-            mentioned_fnames, mentioned_idents
-        )
+        results.update(self.get_ranked_tags_maps_uncached(
+            chat_fnames, other_fnames, missing,
+            mentioned_fnames, mentioned_idents, ranking, file_table
+        ))
         
-        self.map_cache[cache_key] = result
-        return result
+        try:
+            for budget in missing:
+                if budget in cache_keys:
+                    self.map_cache.put(cache_keys[budget], results[budget], persistent)
+        except SQLITE_ERRORS:
+            self.tags_cache_error()
+        return results
+    
+    def _map_file_digest(
+        self, chat_fnames: List[str], other_fnames: List[str], file_table: Optional[FileTable] = None
+    ) -> Tuple[FileSetDigest, bool]:
+        """Digest of the files' content, and whether their maps may be stored on disk.
+        
+        Files the path guards skip are never parsed, so they enter the digest
+        by size and mtime instead of being read and hashed.
+        """
+        # The stores live in TAGS_CACHE, which may be swapped out at runtime
+        if self.fingerprinter.store is not self.TAGS_CACHE:
+            self.fingerprinter = Fingerprinter(self.TAGS_CACHE)
+        if self.map_cache.store is not self.TAGS_CACHE:
+            self.map_cache = MapCache(self.TAGS_CACHE)
+        
+        if file_table is None:
+            file_table = self.new_file_table()
+        files = FileSetDigest()
+        for role, fnames in (("chat", chat_fnames), ("other", other_fnames)):
+            for fname in fnames:
+                entry = file_table.get(fname)
+                if entry.stat is None:
+                    files.add(role, entry.rel_fname, None)
+                elif self.file_guards.check_path(entry.rel_fname, entry.stat.st_size) is not None:
+                    files.add(role, entry.rel_fname, f"stat:{entry.stat.st_size}:{entry.stat.st_mtime_ns}")
+                else:
+                    fingerprint = self.fingerprinter.fingerprint(entry.fname, entry.rel_fname, entry.stat)
+                    files.add(role, entry.rel_fname, fingerprint.digest if fingerprint else None)
+        
+        # Only a named model identifies the token counter in other processes
+        return files, getattr(self.token_count_func_internal, "model_name", None) is not None
+    
+    def _map_cache_key(
+        self,
+        files: FileSetDigest,
+        max_map_tokens: int,
+        mentioned_fnames: Optional[Set[str]],
+        mentioned_idents: Optional[Set[str]]
+    ) -> str:
+        """Digest of everything else a map depends on, for the given files."""
+        model = getattr(self.token_count_func_internal, "model_name", None)
+        settings = (
+            CACHE_VERSION, model or id(self.token_count_func_internal), max_map_tokens,
+            sorted(mentioned_fnames or []), sorted(mentioned_idents or []),
+            self.exclude_unranked, self.edge_limits, self.ppr_basis, self.ppr_top_k,
+            self.token_estimator_mode, self.token_margin, self.file_guards
+        )
+        return map_cache_key(files, settings)
     
     def get_ranked_tags_map_uncached(
         self,
@@ -575,31 +1045,44 @@ class RepoMap:
         other_fnames: List[str],
         max_map_tokens: int,
         mentioned_fnames: Optional[Set[str]] = None,
-        mentioned_idents: Optional[Set[str]] = None
+        mentioned_idents: Optional[Set[str]] = None,
+        ranking: Optional[RankingResult] = None
     ) -> Tuple[Optional[str], FileReport]:
-        """Generate the ranked tags map without caching."""
-        ranked_tags, file_report = self.get_ranked_tags(
-            chat_fnames, other_fnames, mentioned_fnames, mentioned_idents
-        )
+        """Generate the ranked tags map without caching.
         
-        if not ranked_tags:
-            return None, file_report
-        
-        # Filter important files
-        important_files = filter_important_files(
-            [self.get_rel_fname(f) for f in other_fnames]
-        )
-        
-        # Binary search to find the right number of tags
-        chat_rel_fnames = set(self.get_rel_fname(f) for f in chat_fnames)
+        A ``ranking`` computed for the same files is used instead of ranking again.
+        """
+        return self.get_ranked_tags_maps_uncached(
+            chat_fnames, other_fnames, [max_map_tokens],
+            mentioned_fnames, mentioned_idents, ranking
+        )[max_map_tokens]
+    
+    def get_ranked_tags_maps_uncached(
+        self,
+        chat_fnames: List[str],
+        other_fnames: List[str],
+        budgets: List[int],
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None,
+        ranking: Optional[RankingResult] = None,
+        files: Optional[FileTable] = None
+    ) -> Dict[int, Tuple[Optional[str], FileReport]]:
+        """Generate ranked tags maps for several budgets from one ranking, without caching."""
+        if files is None:
+            files = self.new_file_table()
+        if ranking is None:
+            ranking = self.rank(chat_fnames, other_fnames, mentioned_fnames, mentioned_idents, files)
+        ranked_tags, file_report = ranking.ranked_tags, ranking.report
         
-        num_tags = self._find_max_tags_for_token_limit(ranked_tags, chat_rel_fnames, max_map_tokens)
+        if not ranked_tags:
+            return {budget: (None, file_report) for budget in budgets}
         
-        if num_tags == 0:
-            return None, file_report
-            
-        selected_tags = ranked_tags[:num_tags]
-        return self.to_tree(selected_tags, chat_rel_fnames), file_report
+        # Find the largest prefix of tags that fits each token budget
+        packed = self._pack_maps(ranked_tags, budgets, files)
+        return {
+            budget: (tree if num_tags else None, file_report)
+            for budget, (num_tags, tree) in packed.items()
+        }
 
     def _find_max_tags_for_token_limit(
         self,
@@ -607,31 +1090,44 @@ class RepoMap:
         chat_rel_fnames: Set[str],
         max_map_tokens: int
     ) -> int:
-        """Binary search to find the max number of tags that fit in the token limit."""
-        def try_tags(num_tags: int) -> Tuple[Optional[str], int]:
-            if num_tags <= 0:
-                return None, 0
-            
-            selected_tags = ranked_tags[:num_tags]
-            tree_output = self.to_tree(selected_tags, chat_rel_fnames)
-            return tree_output, self.token_count(tree_output)
-        
-        # Binary search
-        low = 0
-        high = len(ranked_tags)
-        best_num = 0
-        
-        while low <= high:
-            mid = (low + high) // 2
-            _, tokens = try_tags(mid)
-            
-            if tokens <= max_map_tokens:
-                best_num = mid
-                low = mid + 1
-            else:
-                high = mid - 1
-                
-        return best_num
+        """Find the max number of tags that fit in the token limit."""
+        return self._pack_map(ranked_tags, max_map_tokens)[0]
+    
+    def _pack_map(
+        self,
+        ranked_tags: List[Tuple[float, ParsedTag]],
+        max_map_tokens: int
+    ) -> Tuple[int, Optional[str]]:
+        """Largest prefix of ranked tags whose map fits the token limit, and that map."""
+        return self._pack_maps(ranked_tags, [max_map_tokens])[max_map_tokens]
+    
+    def _pack_maps(
+        self,
+        ranked_tags: List[Tuple[float, ParsedTag]],
+        budgets: List[int],
+        files: Optional[FileTable] = None
+    ) -> Dict[int, Tuple[int, Optional[str]]]:
+        """``_pack_map`` for several token limits, sharing rendered sections."""
+        if files is None:
+            files = self.new_file_table()
+        render_section = partial(self._render_file_section, files=files)
+        if self.token_estimator is None:
+            packer = MapPacker(ranked_tags, render_section, self.token_count, self.token_count_batch)
+            return packer.pack_many(budgets)
+        
+        packer = MapPacker(
+            ranked_tags, render_section, self.token_estimator.count,
+            count_sections=self._estimate_sections, margin=self.token_margin
+        )
+        results = packer.pack_many(budgets)
+        for estimate, exact in packer.verified:
+            self.token_estimator.record_error(estimate, exact)
+        return results
+    
+    def _estimate_sections(self, rel_fnames: List[str], texts: List[str]) -> List[int]:
+        """Calibrated token estimates for map sections, by the language of their file."""
+        languages = [filename_to_lang(rel_fname) or os.path.splitext(rel_fname)[1] for rel_fname in rel_fnames]
+        return self.token_estimator.count_batch(texts, languages)
 
     def get_repo_map(
         self,
@@ -639,9 +1135,40 @@ class RepoMap:
         other_files: List[str] = None,
         mentioned_fnames: Optional[Set[str]] = None,
         mentioned_idents: Optional[Set[str]] = None,
-        force_refresh: bool = False
+        force_refresh: bool = False,
+        ranking: Optional[RankingResult] = None
     ) -> Tuple[Optional[str], FileReport]:
-        """Generate the repository map with file report."""
+        """Generate the repository map with file report.
+        
+        When ``ranking`` is given (see ``rank``), its files and mentions are
+        used and no ranking pass is run.
+        """
+        if self.max_map_tokens <= 0:
+            return None, FileReport({}, 0, 0, 0)
+        return self.get_repo_maps(
+            [self.max_map_tokens], chat_files, other_files,
+            mentioned_fnames, mentioned_idents, force_refresh, ranking
+        )[self.max_map_tokens]
+    
+    def get_repo_maps(
+        self,
+        map_tokens: List[int],
+        chat_files: List[str] = None,
+        other_files: List[str] = None,
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None,
+        force_refresh: bool = False,
+        ranking: Optional[RankingResult] = None
+    ) -> Dict[int, Tuple[Optional[str], FileReport]]:
+        """Generate repository maps for a ladder of token budgets, keyed by budget.
+        
+        The files are ranked once and the cut points for all budgets are
+        found in one sweep; every map is cached, so a later request for any
+        of these budgets over unchanged files is a lookup.
+        """
+        if ranking is not None:
+            chat_files, other_files = ranking.chat_fnames, ranking.other_fnames
+            mentioned_fnames, mentioned_idents = ranking.mentioned_fnames, ranking.mentioned_idents
         if chat_files is None:
             chat_files = []
         if other_files is None:
@@ -649,38 +1176,38 @@ class RepoMap:
             
         # Create empty report for error cases
         empty_report = FileReport({}, 0, 0, 0)
+        results = {budget: (None, empty_report) for budget in map_tokens}
         
-        if self.max_map_tokens <= 0 or not other_files:
-            return None, empty_report
+        if not other_files:
+            return results
         
         # Adjust max_map_tokens if no chat files
-        max_map_tokens = self.max_map_tokens
-        if not chat_files and self.max_context_window:
-            padding = 1024
-            available = self.max_context_window - padding
-            max_map_tokens = min(
-                max_map_tokens * self.map_mul_no_files,
-                available
-            )
+        budgets = {}
+        for budget in map_tokens:
+            if budget <= 0:
+                continue
+            max_map_tokens = budget
+            if not chat_files and self.max_context_window:
+                padding = 1024
+                available = self.max_context_window - padding
+                max_map_tokens = min(
+                    max_map_tokens * self.map_mul_no_files,
+                    available
+                )
+            budgets[budget] = max_map_tokens
+        if not budgets:
+            return results
         
         try:
-            # get_ranked_tags_map returns (map_string, file_report)
-            map_string, file_report = self.get_ranked_tags_map(
-                chat_files, other_files, max_map_tokens,
-                mentioned_fnames, mentioned_idents, force_refresh
+            # get_ranked_tags_maps returns (map_string, file_report) per budget
+            maps = self.get_ranked_tags_maps(
+                chat_files, other_files, sorted(set(budgets.values())),
+                mentioned_fnames, mentioned_idents, force_refresh, ranking
             )
         except RecursionError:
             self.output_handlers['error']("Disabling repo map, git repo too large?")
             self.max_map_tokens = 0
-            return None, FileReport({}, 0, 0, 0)  # Ensure consistent return type
-        
-        if map_string is None:
-            print("map_string is None")
-            return None, file_report
-        
-        if self.verbose:
-            tokens = self.token_count(map_string)
-            self.output_handlers['info'](f"Repo-map: {tokens / 1024:.1f} k-tokens")
+            return results
         
         # Format final output
         other = "other " if chat_files else ""
@@ -690,9 +1217,55 @@ class RepoMap:
         else:
             repo_content = ""
         
-        repo_content += map_string
+        file_report = None
+        for budget, max_map_tokens in budgets.items():
+            map_string, file_report = maps[max_map_tokens]
+            if map_string is None:
+                print("map_string is None")
+                results[budget] = (None, file_report)
+                continue
+            if self.verbose:
+                tokens = self.token_count(map_string)
+                self.output_handlers['info'](f"Repo-map: {tokens / 1024:.1f} k-tokens")
+            results[budget] = (repo_content + map_string, file_report)
         
-        return repo_content, file_report
+        if self.verbose and any(content for content, _ in results.values()):
+            stats = get_language_registry().stats()
+            self.output_handlers['info'](
+                f"Language registry: {stats.languages_loaded} languages loaded, "
+                f"{stats.hits} reuses, {stats.saved_seconds:.2f}s setup saved"
+            )
+            render = self.render_cache.stats()
+            self.output_handlers['info'](
+                f"Render cache: {render.hits} hits, {render.misses} misses "
+                f"({render.invalidations} changed files), {render.evictions} evictions, "
+                f"{render.entries} files / {render.total_bytes / 2**20:.1f} MiB held"
+            )
+            graph = file_report.graph_stats
+            if graph is not None:
+                self.output_handlers['info'](
+                    f"Reference graph: {graph.edges} edges from {graph.name_edges} identifier links "
+                    f"({graph.collapsed_edges} collapsed, {graph.pruned_edges} pruned across "
+                    f"{graph.pruned_names} identifiers, {graph.downweighted_names} down-weighted)"
+                )
+            if file_report.pagerank_basis:
+                self.output_handlers['info']("PageRank: assembled from the precomputed PPR basis")
+            elif file_report.pagerank_memo_hit:
+                self.output_handlers['info']("PageRank: reused the ranks of an earlier run on the same graph")
+            else:
+                start = "warm" if file_report.pagerank_warm_start else "cold"
+                self.output_handlers['info'](
+                    f"PageRank: {file_report.pagerank_iterations} iterations ({start} start)"
+                )
+            if self.token_estimator is not None:
+                estimator = self.token_estimator.stats()
+                self.output_handlers['info'](
+                    f"Token estimator: {estimator.estimates} estimates, {estimator.exact_counts} exact counts, "
+                    f"{estimator.mean_error:.1%} mean / {estimator.max_error:.1%} max error over "
+                    f"{estimator.verified} verified maps, {estimator.seconds_saved:.2f}s encoding saved"
+                )
+        
+        return results
 
     def get_semantic_blocks(
         self,
@@ -700,25 +1273,22 @@ class RepoMap:
         other_fnames: List[str] = None,
         mentioned_fnames: Optional[Set[str]] = None,
         mentioned_idents: Optional[Set[str]] = None,
-        token_limit: Optional[int] = None
+        token_limit: Optional[int] = None,
+        ranking: Optional[RankingResult] = None
     ) -> List[SemanticBlock]:
-        """Get semantic blocks, optionally filtered by token limit (same as Repo Map)."""
-        if chat_fnames is None:
-            chat_fnames = []
-        if other_fnames is None:
-            other_fnames = []
-            
-        # Calculate ranks
-        ranks, _, included = self._calculate_file_ranks(
-            chat_fnames, other_fnames, mentioned_fnames, mentioned_idents
-        )
+        """Get semantic blocks, optionally filtered by token limit (same as Repo Map).
+        
+        When ``ranking`` is given (see ``rank``), its files and mentions are
+        used and no ranking pass is run.
+        """
+        if ranking is None:
+            ranking = self.rank(chat_fnames or [], other_fnames or [], mentioned_fnames, mentioned_idents)
+        chat_fnames = ranking.chat_fnames
+        ranks, table, file_ids = ranking.ranks, ranking.table, ranking.file_ids
         
         # If token_limit is provided, we need to perform the same filtering as get_ranked_tags_map
         if token_limit:
-            # Get all ranked tags first
-            ranked_tags, _ = self.get_ranked_tags(
-                chat_fnames, other_fnames, mentioned_fnames, mentioned_idents
-            )
+            ranked_tags = ranking.ranked_tags
             
             chat_rel_fnames = set(self.get_rel_fname(f) for f in chat_fnames)
             
@@ -732,10 +1302,11 @@ class RepoMap:
             all_blocks = []
             for tag in target_tags:
                 if tag.kind == "def":
+                    content = self.get_tag_content(tag)
                     block_type = "definition"
-                    if "class " in tag.content.split("\n")[0]:
+                    if "class " in content.split("\n")[0]:
                          block_type = "class_definition"
-                    elif "def " in tag.content.split("\n")[0]:
+                    elif "def " in content.split("\n")[0]:
                          block_type = "function_definition"
                     
                     # Get rank from the ranks dictionary (file rank)
@@ -755,7 +1326,7 @@ class RepoMap:
                         name=tag.name,
                         start_line=tag.line,
                         end_line=tag.end_line,
-                        content=tag.content,
+                        content=content,
                         rank_score=file_rank
                     ))
             return all_blocks
@@ -763,35 +1334,32 @@ class RepoMap:
         # Original logic (without token limit)
         all_blocks = []
         
-        for fname in included:
-            rel_fname = self.get_rel_fname(fname)
+        for file_id in file_ids:
+            rel_fname = table.files[file_id]
             file_rank = ranks.get(rel_fname, 0.0)
             
             # Exclude files with low Page Rank if exclude_unranked is True
             if self.exclude_unranked and file_rank <= 0.0001:
                 continue
-                
-            # Use cached tags instead of re-parsing
-            tags = self.get_tags(fname, rel_fname)
             
-            for tag in tags:
-                # Only include definitions
-                if tag.kind == "def":
-                    block_type = "definition"
-                    if "class " in tag.content.split("\n")[0]:
-                         block_type = "class_definition"
-                    elif "def " in tag.content.split("\n")[0]:
-                         block_type = "function_definition"
+            # Only include definitions
+            for tag in table.tags(table.rows(KIND_DEF, [file_id])):
+                content = self.get_tag_content(tag)
+                block_type = "definition"
+                if "class " in content.split("\n")[0]:
+                     block_type = "class_definition"
+                elif "def " in content.split("\n")[0]:
+                     block_type = "function_definition"
+
+                all_blocks.append(SemanticBlock(
+                    file_path=rel_fname,
+                    type=block_type,
+                    name=tag.name,
+                    start_line=tag.line,
+                    end_line=tag.end_line,
+                    content=content,
+                    rank_score=file_rank
+                ))
 
-                    all_blocks.append(SemanticBlock(
-                        file_path=rel_fname,
-                        type=block_type,
-                        name=tag.name,
-                        start_line=tag.line,
-                        end_line=tag.end_line,
-                        content=tag.content,
-                        rank_score=file_rank
-                    ))
-                
         return all_blocks
 
@@ -0,0 +1,62 @@
+"""
+Persistent symbol index for long-lived RepoMap instances.
+
+The index owns a ``TagTable`` and remembers the content digest each file's
+rows were loaded from. On every run, files whose digest is unchanged are
+skipped; a changed file has its old rows (and their contributions to the
+defines/references views) removed and its new tags appended. A one-file edit
+therefore costs work proportional to that file's tags, not to the repository.
+"""
+
+from typing import Callable, Dict, List, Optional
+
+from .tags import PackedTag
+from .tagstore import TagTable
+
+
+class SymbolIndex:
+    """Tag table kept in sync with file content digests across runs."""
+
+    def __init__(self):
+        self.table = TagTable()
+        self._digests: Dict[int, str] = {}
+        self.files_loaded = 0
+        self.files_reused = 0
+
+    def update(
+        self,
+        rel_fname: str,
+        fname: str,
+        digest: str,
+        load: Callable[[], List[PackedTag]]
+    ) -> int:
+        """Make sure the index holds the tags of the file's current content.
+
+        ``load`` is only called when the digest differs from the indexed one.
+        Returns the file's ID in the table.
+        """
+        file_id = self.table.files.lookup(rel_fname)
+        if file_id is not None and self._digests.get(file_id) == digest:
+            self.table.abs_fnames[file_id] = fname
+            self.files_reused += 1
+            return file_id
+
+        file_id = self.table.replace_packed(rel_fname, fname, load())
+        self._digests[file_id] = digest
+        self.files_loaded += 1
+        return file_id
+
+    def remove(self, rel_fname: str):
+        """Forget a file, e.g. because it no longer exists."""
+        file_id = self.table.files.lookup(rel_fname)
+        if file_id is not None:
+            self.table.remove_file(rel_fname)
+            self._digests.pop(file_id, None)
+
+    def digest(self, rel_fname: str) -> Optional[str]:
+        file_id = self.table.files.lookup(rel_fname)
+        return self._digests.get(file_id) if file_id is not None else None
+
+    def clear(self):
+        self.table = TagTable()
+        self._digests.clear()
@@ -0,0 +1,209 @@
+"""
+Definition ranking from file ranks and boosts.
+
+A definition's rank is its file's PageRank times a boost for chat files,
+mentioned files and mentioned identifiers. Only the mentions change from one
+agent turn to the next, so ``TagRanker`` gathers the definitions of a ranking
+once, with their file ranks and chat boosts, into arrays, and applies the
+mention boosts as a vectorized step. The result is a lazy sequence: it
+selects the top of the ranking with a partial sort, widening it as a reader
+(usually the budget packer) gets further down, and builds ``ParsedTag``
+objects only for the rows that are read. A map that fits a few hundred tags
+never sorts or materializes the long tail of a million definitions.
+"""
+
+from collections.abc import Sequence as SequenceABC
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+import numpy as np
+
+from .tags import ParsedTag
+from .tagstore import TagTable, KIND_DEF
+
+CHAT_FILE_BOOST = 20.0
+MENTIONED_FILE_BOOST = 5.0
+MENTIONED_IDENT_BOOST = 10.0
+UNRANKED_THRESHOLD = 0.0001     # Files at or below this rank are dropped with exclude_unranked
+TOP_K_INITIAL = 1024            # Tags selected by the first partial sort
+
+
+class RankedTags(SequenceABC):
+    """(rank, tag) pairs by descending rank, ties in row order, built on access.
+
+    Only a top-k prefix of the order is kept; reading past it selects a
+    prefix twice as long, and the whole order is sorted once k reaches half
+    the rows.
+    """
+
+    def __init__(self, scores: np.ndarray, tag: Callable[[int], ParsedTag]):
+        self._scores = scores
+        self._tag = tag
+        self._order = np.empty(0, dtype=np.int64)
+        self.selections = 0     # Partial or full sorts done so far
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def _select(self, num_tags: int):
+        """Make sure the order is known for at least the first ``num_tags`` positions."""
+        total = len(self._scores)
+        num_tags = min(num_tags, total)
+        if num_tags <= len(self._order):
+            return
+        k = max(num_tags, 2 * len(self._order), TOP_K_INITIAL)
+        self.selections += 1
+        if 2 * k >= total:
+            self._order = np.argsort(-self._scores, kind="stable")
+            return
+        # Everything at or above the k-th largest score, tied rows included,
+        # is a prefix of the full stable order
+        threshold = np.partition(self._scores, total - k)[total - k]
+        candidates = np.flatnonzero(self._scores >= threshold)
+        self._order = candidates[np.argsort(-self._scores[candidates], kind="stable")]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            self._select(len(self) if step < 0 else max(start, stop))
+            rows = self._order[start:stop:step]
+            return list(zip(self._scores[rows].tolist(), map(self._tag, rows.tolist())))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("ranked tag index out of range")
+        self._select(index + 1)
+        row = int(self._order[index])
+        return float(self._scores[row]), self._tag(row)
+
+    def __iter__(self):
+        chunk = 4096
+        for start in range(0, len(self), chunk):
+            yield from self[start:start + chunk]
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, (list, RankedTags)) and list(self) == list(other)
+
+
+class TagRanker:
+    """The definitions of one ranking, ready to be re-boosted for new mentions.
+
+    The ranker copies the table columns it needs when it is built, so it
+    stays valid after the table changes; ``matches`` tells whether it was
+    built from the given inputs.
+    """
+
+    def __init__(
+        self,
+        table: TagTable,
+        file_ids: Sequence[int],
+        ranks: Dict[str, float],
+        chat_rel_fnames: Set[str],
+        exclude_unranked: bool = False
+    ):
+        self.table_version = table.version
+        self.file_ids = tuple(file_ids)
+        self.ranks = ranks
+        self.chat_rel_fnames = frozenset(chat_rel_fnames)
+        self.exclude_unranked = exclude_unranked
+
+        row_ranges: List[np.ndarray] = []
+        row_files: List[np.ndarray] = []
+        self.rel_fnames: List[str] = []
+        self.abs_fnames: List[str] = []
+        file_ranks: List[float] = []
+        chat_boosts: List[float] = []
+        for file_id in file_ids:
+            rel_fname = table.files[file_id]
+            file_rank = ranks.get(rel_fname, 0.0)
+            # Exclude files with low Page Rank if exclude_unranked is True
+            if exclude_unranked and file_rank <= UNRANKED_THRESHOLD:
+                continue
+            file_rows = table.file_rows(file_id)
+            if not file_rows:
+                continue
+            row_ranges.append(np.arange(file_rows.start, file_rows.stop, dtype=np.int64))
+            row_files.append(np.full(len(file_rows), len(self.rel_fnames), dtype=np.int64))
+            self.rel_fnames.append(rel_fname)
+            self.abs_fnames.append(table.abs_fnames[file_id])
+            file_ranks.append(file_rank)
+            chat_boosts.append(CHAT_FILE_BOOST if rel_fname in chat_rel_fnames else 1.0)
+        self._index_of_file = {rel_fname: i for i, rel_fname in enumerate(self.rel_fnames)}
+
+        rows = np.concatenate(row_ranges) if row_ranges else np.empty(0, dtype=np.int64)
+        row_files = np.concatenate(row_files) if row_files else np.empty(0, dtype=np.int64)
+        is_def = np.frombuffer(table.kinds, dtype=np.uint8)[rows] == KIND_DEF
+        rows = rows[is_def]
+        self.row_files = row_files[is_def]
+        self.file_ranks = np.array(file_ranks, dtype=np.float64)
+        self.chat_boosts = np.array(chat_boosts, dtype=np.float64)
+
+        # Copies of the columns a ParsedTag needs; names are interned for good
+        self.name_ids = np.frombuffer(table.name_ids, dtype=np.int32)[rows]
+        self.lines = np.frombuffer(table.lines, dtype=np.int32)[rows]
+        self.end_lines = np.frombuffer(table.end_lines, dtype=np.int32)[rows]
+        self.start_bytes = np.frombuffer(table.start_bytes, dtype=np.int64)[rows]
+        self.end_bytes = np.frombuffer(table.end_bytes, dtype=np.int64)[rows]
+        self._names = table.names
+        self._name_id = table.names.lookup
+
+    def __len__(self) -> int:
+        return len(self.row_files)
+
+    def tag(self, idx: int) -> ParsedTag:
+        """The ``idx``-th definition, in table order."""
+        file_idx = self.row_files[idx]
+        return ParsedTag(
+            rel_fname=self.rel_fnames[file_idx],
+            fname=self.abs_fnames[file_idx],
+            line=int(self.lines[idx]),
+            name=self._names[self.name_ids[idx]],
+            kind="def",
+            end_line=int(self.end_lines[idx]),
+            start_byte=int(self.start_bytes[idx]),
+            end_byte=int(self.end_bytes[idx])
+        )
+
+    def matches(
+        self,
+        table: TagTable,
+        file_ids: Sequence[int],
+        ranks: Dict[str, float],
+        chat_rel_fnames: Set[str],
+        exclude_unranked: bool
+    ) -> bool:
+        return (
+            self.table_version == table.version
+            and self.ranks is ranks
+            and self.exclude_unranked == exclude_unranked
+            and self.chat_rel_fnames == chat_rel_fnames
+            and self.file_ids == tuple(file_ids)
+        )
+
+    def scores(
+        self,
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None
+    ) -> np.ndarray:
+        """Rank of every definition, in table order, under the given mentions."""
+        # Boosts are exact small products, so file rank x boost rounds exactly
+        # as the per-tag multiplication does
+        file_boosts = self.chat_boosts.copy()
+        for rel_fname in mentioned_fnames or ():
+            idx = self._index_of_file.get(rel_fname)
+            if idx is not None:
+                file_boosts[idx] = MENTIONED_FILE_BOOST * self.chat_boosts[idx]
+        boosts = file_boosts[self.row_files]
+        if mentioned_idents:
+            ident_ids = [self._name_id(ident) for ident in mentioned_idents]
+            ident_ids = [idx for idx in ident_ids if idx is not None]
+            if ident_ids:
+                boosts[np.isin(self.name_ids, ident_ids)] *= MENTIONED_IDENT_BOOST
+        return self.file_ranks[self.row_files] * boosts
+
+    def ranked_tags(
+        self,
+        mentioned_fnames: Optional[Set[str]] = None,
+        mentioned_idents: Optional[Set[str]] = None
+    ) -> RankedTags:
+        """Definitions by descending rank; ties keep table order."""
+        return RankedTags(self.scores(mentioned_fnames, mentioned_idents), self.tag)
@@ -0,0 +1,212 @@
+"""
+Tree-sitter tag extraction for RepoMap.
+
+Kept free of RepoMap state so it can run in worker processes.
+"""
+
+import mmap
+import sys
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, Tuple, Union
+
+from .languages import get_language_registry
+from .incremental import PositionedTag, TreeCache, TreeState, reparse_tags
+
+
+@dataclass
+class ParsedTag:
+    rel_fname: str
+    fname: str
+    line: int
+    name: str
+    kind: str
+    end_line: int
+    content: Optional[str] = None   # Set only when materialized; see RepoMap.get_tag_content
+    start_byte: int = -1            # Byte span of the definition (or name) node
+    end_byte: int = -1
+
+
+# Cached form of a tag: (line, name, kind, end_line, start_byte, end_byte), without paths
+PackedTag = Tuple[int, str, str, int, int, int]
+
+
+def tags_cache_key(fname: str, digest: str) -> str:
+    """Return the tags cache key for a file's content.
+
+    The language is part of the key because the same bytes parse differently
+    depending on the file extension.
+    """
+    from grep_ast import filename_to_lang
+    return f"tags:{filename_to_lang(fname)}:{digest}"
+
+
+def pack_tags(tags: List[ParsedTag]) -> List[PackedTag]:
+    """Strip paths from tags so identical content can share a cache entry."""
+    return [(t.line, t.name, t.kind, t.end_line, t.start_byte, t.end_byte) for t in tags]
+
+
+def unpack_tags(packed: List[PackedTag], fname: str, rel_fname: str) -> List[ParsedTag]:
+    """Rebuild tags for a specific file from their cached form."""
+    return [
+        ParsedTag(rel_fname, fname, line, name, kind, end_line, None, start_byte, end_byte)
+        for line, name, kind, end_line, start_byte, end_byte in packed
+    ]
+
+
+def tag_content_from_source(tag: ParsedTag, source: Union[bytes, mmap.mmap]) -> str:
+    """Slice a tag's source text out of its file's bytes.
+
+    References carry no content; definitions span their whole definition node.
+    Newlines are translated as reading the file as text would.
+    """
+    if tag.kind != "def" or tag.start_byte < 0:
+        return ""
+    content = source[tag.start_byte:tag.end_byte].decode('utf-8', errors='ignore')
+    return content.replace("\r\n", "\n").replace("\r", "\n")
+
+
+def parse_file_tags(
+    fname: str,
+    rel_fname: str,
+    read_func: Callable[[str], Optional[Union[bytes, mmap.mmap, str]]],
+    error_func: Callable[[str], None],
+    tree_cache: Optional[TreeCache] = None
+) -> List[ParsedTag]:
+    """Parse a file and extract its definition and reference tags.
+
+    read_func may return raw bytes (preferred, handed to the parser as-is),
+    a memory map, or decoded text. With a tree cache, a file parsed before is
+    reparsed incrementally.
+    """
+    try:
+        from grep_ast import filename_to_lang
+    except ImportError:
+        print("Error: grep-ast is required. Install with: pip install grep-ast")
+        sys.exit(1)
+
+    lang = filename_to_lang(fname)
+    if not lang:
+        return []
+
+    registry = get_language_registry()
+    try:
+        bundle = registry.get(lang)
+        if not bundle:
+            return []
+        parser = registry.get_parser(bundle)
+    except Exception as err:
+        error_func(f"Skipping file {fname}: {err}")
+        return []
+
+    source = read_func(fname)
+    if not source:
+        return []
+    if isinstance(source, str):
+        source = source.encode("utf-8")
+
+    # Memory-mapped files are too large to be worth retaining a tree for
+    if tree_cache is not None and not isinstance(source, bytes):
+        tree_cache.discard(fname)
+        tree_cache = None
+
+    try:
+        previous = tree_cache.get(fname) if tree_cache is not None else None
+
+        def collect(tree, spans=None):
+            return collect_tags(tree, source, bundle.query, fname, rel_fname, spans)
+
+        if previous is not None and previous.lang == lang:
+            tree, positioned = reparse_tags(previous, source, parser, collect)
+            tree_cache.incremental_parses += 1
+        else:
+            tree = parser.parse(source)
+            positioned = collect(tree)
+            if tree_cache is not None:
+                tree_cache.full_parses += 1
+
+        if tree_cache is not None:
+            tree_cache.put(fname, TreeState(lang, source, tree, positioned))
+
+        return [tag for _, _, tag in positioned]
+
+    except Exception as e:
+        if tree_cache is not None:
+            tree_cache.discard(fname)
+        error_func(f"Error parsing {fname}: {e}")
+        return []
+
+
+def collect_tags(
+    tree: Any,
+    source: Union[bytes, mmap.mmap],
+    query: Any,
+    fname: str,
+    rel_fname: str,
+    spans: Optional[List[Tuple[int, int]]] = None
+) -> List[PositionedTag]:
+    """Run the tags query over a tree, optionally restricted to byte spans.
+
+    Returns (start_byte, kind, tag) records sorted by source position.
+    """
+    from tree_sitter import QueryCursor
+
+    if spans is None:
+        capture_sets = [(QueryCursor(query).captures(tree.root_node), None)]
+    else:
+        capture_sets = []
+        for start, end in spans:
+            cursor = QueryCursor(query)
+            # Widen by a byte so zero-width (missing) nodes on the boundary are seen
+            cursor.set_byte_range(max(0, start - 1), end + 1)
+            capture_sets.append((cursor.captures(tree.root_node), (start, end)))
+
+    positioned = []
+    for captures, span in capture_sets:
+        # Process captures as a dictionary
+        for capture_name, nodes in captures.items():
+            for node in nodes:
+                if "name.definition" in capture_name:
+                    kind = "def"
+                elif "name.reference" in capture_name:
+                    kind = "ref"
+                else:
+                    # Skip other capture types like 'reference.call' if not needed for tagging
+                    continue
+
+                # Matches may spill over the requested range; keep only those that start inside
+                if span is not None and not (span[0] <= node.start_byte < span[1]):
+                    continue
+
+                line_num = node.start_point[0] + 1
+                end_line = node.end_point[0] + 1
+                name = source[node.start_byte:node.end_byte].decode('utf-8', errors='ignore')
+                start_byte, end_byte = node.start_byte, node.end_byte
+
+                # For definitions, we want the span of the full definition node
+                # But 'node' here is often just the identifier (name) node because of how captures work
+                # We need to find the parent definition node; the text itself is sliced lazily
+                if kind == "def":
+                    # Traverse up to find the definition node
+                    curr = node
+                    while curr:
+                        if curr.type in ("function_definition", "class_definition", "method_definition"):
+                            start_byte, end_byte = curr.start_byte, curr.end_byte
+                            line_num = curr.start_point[0] + 1
+                            end_line = curr.end_point[0] + 1
+                            break
+                        curr = curr.parent
+
+                positioned.append((node.start_byte, kind, ParsedTag(
+                    rel_fname=rel_fname,
+                    fname=fname,
+                    line=line_num,
+                    name=name,
+                    kind=kind,
+                    end_line=end_line,
+                    start_byte=start_byte,
+                    end_byte=end_byte
+                )))
+
+    # Capture order is not stable across runs, so emit tags in source order
+    positioned.sort(key=lambda item: (item[0], item[1]))
+    return positioned
@@ -0,0 +1,295 @@
+"""
+Columnar, interned storage for the tags of a whole repository.
+
+A list of ``ParsedTag`` objects costs a dataclass, two path strings and an
+un-interned name per tag. ``TagTable`` keeps one row per tag in typed arrays
+instead: file and symbol names are interned once and referenced by integer
+IDs, kinds are stored as bytes, and lines and byte offsets as fixed-width
+integers. ``ParsedTag`` objects are only built for the rows a caller asks for.
+"""
+
+import itertools
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .tags import PackedTag, ParsedTag
+
+KIND_DEF = 0
+KIND_REF = 1
+KIND_DEAD = 255     # Tombstone for rows of a file that was replaced or removed
+KIND_IDS = {"def": KIND_DEF, "ref": KIND_REF}
+KIND_NAMES = {KIND_DEF: "def", KIND_REF: "ref"}
+
+# Table versions are unique across all tables, so a version identifies one table state
+_versions = itertools.count(1)
+
+
+class StringInterner:
+    """Bidirectional mapping between strings and dense integer IDs."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.strings: List[str] = []
+
+    def intern(self, value: str) -> int:
+        idx = self._ids.get(value)
+        if idx is None:
+            idx = len(self.strings)
+            self._ids[value] = idx
+            self.strings.append(value)
+        return idx
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self._ids.get(value)
+
+    def __getitem__(self, idx: int) -> str:
+        return self.strings[idx]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+
+class TagTable:
+    """Repository-level tag table backed by typed arrays.
+
+    Rows are appended one file at a time, so each file's tags occupy a
+    contiguous row range in their original source order. Replacing a file
+    tombstones its old rows and appends the new ones, keeping the name
+    indices up to date; dead rows are compacted away once they outnumber
+    live ones.
+    """
+
+    COMPACT_MIN_DEAD_ROWS = 4096
+
+    def __init__(self):
+        self.files = StringInterner()       # rel_fname per file ID
+        self.abs_fnames: List[str] = []     # fname per file ID
+        self.names = StringInterner()       # symbol name per name ID
+
+        self.file_ids = array("i")
+        self.name_ids = array("i")
+        self.kinds = array("B")
+        self.lines = array("i")
+        self.end_lines = array("i")
+        self.start_bytes = array("q")
+        self.end_bytes = array("q")
+
+        self._file_rows: List[Tuple[int, int]] = []
+        self.dead_rows = 0
+        self.version = next(_versions)      # Changes whenever the table's content does
+        self._by_name: Optional[Dict[int, array]] = None
+        self._defines: Optional[Dict[int, Set[int]]] = None
+        self._references: Optional[Dict[int, Set[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    @property
+    def num_files(self) -> int:
+        return len(self.files)
+
+    def add_file(self, rel_fname: str, fname: str) -> int:
+        """Register a file with no tags yet and return its ID."""
+        file_id = self.files.lookup(rel_fname)
+        if file_id is not None:
+            return file_id
+        file_id = self.files.intern(rel_fname)
+        self.abs_fnames.append(fname)
+        start = len(self.kinds)
+        self._file_rows.append((start, start))
+        return file_id
+
+    def add_packed(self, rel_fname: str, fname: str, packed: Iterable[PackedTag]) -> int:
+        """Append a file's tags in their cached (packed) form."""
+        file_id = self.add_file(rel_fname, fname)
+        start, end = self._file_rows[file_id]
+        if end != start:
+            raise ValueError(f"Tags for {rel_fname} were already added")
+        self._append_rows(file_id, packed)
+        return file_id
+
+    def replace_packed(self, rel_fname: str, fname: str, packed: Iterable[PackedTag]) -> int:
+        """Replace a file's tags, keeping its file ID."""
+        file_id = self.add_file(rel_fname, fname)
+        self.abs_fnames[file_id] = fname
+        self._drop_rows(file_id)
+        self._append_rows(file_id, packed)
+        self._maybe_compact()
+        return file_id
+
+    def remove_file(self, rel_fname: str):
+        """Drop a file's tags. Its ID stays reserved and maps to no rows."""
+        file_id = self.files.lookup(rel_fname)
+        if file_id is not None:
+            self._drop_rows(file_id)
+            self._maybe_compact()
+
+    def _append_rows(self, file_id: int, packed: Iterable[PackedTag]):
+        start = len(self.kinds)
+        intern = self.names.intern
+        for line, name, kind, end_line, start_byte, end_byte in packed:
+            self.file_ids.append(file_id)
+            self.name_ids.append(intern(name))
+            self.kinds.append(KIND_IDS[kind])
+            self.lines.append(line)
+            self.end_lines.append(end_line)
+            self.start_bytes.append(start_byte)
+            self.end_bytes.append(end_byte)
+
+        self._file_rows[file_id] = (start, len(self.kinds))
+        self._by_name = None
+        self._update_file_sets(file_id, add=True)
+        self.version = next(_versions)
+
+    def _drop_rows(self, file_id: int):
+        start, end = self._file_rows[file_id]
+        if start == end:
+            return
+        self._update_file_sets(file_id, add=False)
+        kinds = self.kinds
+        for row in range(start, end):
+            kinds[row] = KIND_DEAD
+        self.dead_rows += end - start
+        self._file_rows[file_id] = (end, end)
+        self._by_name = None
+        self.version = next(_versions)
+
+    def _update_file_sets(self, file_id: int, add: bool):
+        """Add or remove one file's contribution to the defines/references views."""
+        if self._defines is None:
+            return
+        for row in self.file_rows(file_id):
+            kind = self.kinds[row]
+            target = self._defines if kind == KIND_DEF else self._references
+            name_id = self.name_ids[row]
+            if add:
+                target.setdefault(name_id, set()).add(file_id)
+            else:
+                files = target.get(name_id)
+                if files is not None:
+                    files.discard(file_id)
+                    if not files:
+                        del target[name_id]
+
+    def _maybe_compact(self):
+        if self.dead_rows < self.COMPACT_MIN_DEAD_ROWS or self.dead_rows * 2 < len(self.kinds):
+            return
+        columns = (self.file_ids, self.name_ids, self.kinds, self.lines,
+                   self.end_lines, self.start_bytes, self.end_bytes)
+        compacted = [array(column.typecode) for column in columns]
+        for file_id, (start, end) in enumerate(self._file_rows):
+            new_start = len(compacted[0])
+            for column, new_column in zip(columns, compacted):
+                new_column.extend(column[start:end])
+            self._file_rows[file_id] = (new_start, len(compacted[0]))
+        (self.file_ids, self.name_ids, self.kinds, self.lines,
+         self.end_lines, self.start_bytes, self.end_bytes) = compacted
+        self.dead_rows = 0
+        self._by_name = None
+
+    def add_tags(self, rel_fname: str, fname: str, tags: Iterable[ParsedTag]) -> int:
+        """Append a file's tags from ParsedTag objects."""
+        return self.add_packed(rel_fname, fname, (
+            (t.line, t.name, t.kind, t.end_line, t.start_byte, t.end_byte) for t in tags
+        ))
+
+    def tag(self, row: int) -> ParsedTag:
+        """Materialize a single row as a ParsedTag."""
+        file_id = self.file_ids[row]
+        return ParsedTag(
+            rel_fname=self.files[file_id],
+            fname=self.abs_fnames[file_id],
+            line=self.lines[row],
+            name=self.names[self.name_ids[row]],
+            kind=KIND_NAMES[self.kinds[row]],
+            end_line=self.end_lines[row],
+            start_byte=self.start_bytes[row],
+            end_byte=self.end_bytes[row]
+        )
+
+    def tags(self, rows: Iterable[int]) -> List[ParsedTag]:
+        return [self.tag(row) for row in rows]
+
+    def file_rows(self, file_id: int) -> range:
+        """Row range holding a file's tags, in source order."""
+        start, end = self._file_rows[file_id]
+        return range(start, end)
+
+    def rows(self, kind: Optional[int] = None, file_ids: Optional[Sequence[int]] = None) -> Iterator[int]:
+        """Iterate rows, optionally restricted to a kind and to files in the given order."""
+        kinds = self.kinds
+        ranges = (self.file_rows(f) for f in file_ids) if file_ids is not None else (range(len(kinds)),)
+        for row_range in ranges:
+            for row in row_range:
+                if kinds[row] == kind if kind is not None else kinds[row] != KIND_DEAD:
+                    yield row
+
+    def count(self, kind: int, file_ids: Optional[Sequence[int]] = None) -> int:
+        if file_ids is None:
+            return self.kinds.count(kind)
+        total = 0
+        for file_id in file_ids:
+            start, end = self._file_rows[file_id]
+            total += self.kinds[start:end].count(kind)
+        return total
+
+    def by_name(self) -> Dict[int, array]:
+        """Group-by-name view: name ID -> rows carrying that name."""
+        if self._by_name is None:
+            groups: Dict[int, array] = defaultdict(lambda: array("i"))
+            kinds = self.kinds
+            for row, name_id in enumerate(self.name_ids):
+                if kinds[row] != KIND_DEAD:
+                    groups[name_id].append(row)
+            self._by_name = dict(groups)
+        return self._by_name
+
+    def _build_file_sets(self):
+        defines: Dict[int, Set[int]] = defaultdict(set)
+        references: Dict[int, Set[int]] = defaultdict(set)
+        file_ids, kinds = self.file_ids, self.kinds
+        for row, name_id in enumerate(self.name_ids):
+            kind = kinds[row]
+            if kind == KIND_DEAD:
+                continue
+            target = defines if kind == KIND_DEF else references
+            target[name_id].add(file_ids[row])
+        self._defines, self._references = dict(defines), dict(references)
+
+    def defines(self) -> Dict[int, Set[int]]:
+        """Name ID -> IDs of the files defining it."""
+        if self._defines is None:
+            self._build_file_sets()
+        return self._defines
+
+    def references(self) -> Dict[int, Set[int]]:
+        """Name ID -> IDs of the files referencing it."""
+        if self._references is None:
+            self._build_file_sets()
+        return self._references
+
+    def search(
+        self,
+        query: str,
+        kinds: Optional[Set[int]] = None,
+        file_ids: Optional[Iterable[int]] = None
+    ) -> List[int]:
+        """Rows whose name contains the query, case-insensitively, in table order.
+
+        Matching is done once per distinct name rather than once per tag.
+        """
+        query = query.lower()
+        by_name = self.by_name()
+        rows: List[int] = []
+        for name_id, name in enumerate(self.names.strings):
+            if query in name.lower():
+                rows.extend(by_name.get(name_id, ()))
+        if kinds is None:
+            kinds = {KIND_DEF, KIND_REF}
+        rows = [row for row in rows if self.kinds[row] in kinds]
+        if file_ids is not None:
+            wanted = set(file_ids)
+            rows = [row for row in rows if self.file_ids[row] in wanted]
+        rows.sort()
+        return rows
@@ -0,0 +1,273 @@
+"""
+Token counting service.
+
+Encoders are resolved once per model name and shared. ``TokenCounter`` counts
+with ``encode_ordinary`` (special-token markup in source code is counted as
+text rather than rejected), memoizes counts by content, and counts batches of
+texts with tiktoken's threaded ``encode_ordinary_batch``.
+
+``TokenEstimator`` answers in O(1) from characters-per-token ratios learned
+per language from exact counts, for callers that only need exact counts near
+a budget.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+import tiktoken
+
+DEFAULT_ENCODING = "cl100k_base"
+MEMO_MAX_ENTRIES = 65536
+MEMO_HASH_MIN_CHARS = 256       # Longer texts are memoized by digest instead of by value
+BATCH_MIN_TEXTS = 8             # Smaller batches are not worth a thread pool
+BATCH_THREADS = min(8, os.cpu_count() or 1)
+CALIBRATION_CHARS = 20000       # Exact counts per language before its ratio is trusted
+DEFAULT_CHARS_PER_TOKEN = 4.0   # Prior for a language with no observations yet
+
+_lock = threading.Lock()
+_encodings: Dict[str, "tiktoken.Encoding"] = {}
+_counters: Dict[str, "TokenCounter"] = {}
+
+
+def get_encoding(model_name: str) -> "tiktoken.Encoding":
+    """The tiktoken encoding for a model, resolved once per model name."""
+    encoding = _encodings.get(model_name)
+    if encoding is None:
+        try:
+            encoding = tiktoken.encoding_for_model(model_name)
+        except KeyError:
+            # Fallback for unknown models
+            encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+        with _lock:
+            encoding = _encodings.setdefault(model_name, encoding)
+    return encoding
+
+
+def get_token_counter(model_name: str = "gpt-4") -> "TokenCounter":
+    """The shared counter for a model, so all users share one memo."""
+    counter = _counters.get(model_name)
+    if counter is None:
+        with _lock:
+            counter = _counters.setdefault(model_name, TokenCounter(model_name))
+    return counter
+
+
+def _memo_key(text: str):
+    if len(text) < MEMO_HASH_MIN_CHARS:
+        return text
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+
+class TokenCounter:
+    """Counts tokens for one model, memoizing counts by content.
+
+    Instances are callable, so they can be passed wherever a
+    ``Callable[[str], int]`` token counter is expected; callers that know
+    about ``count_batch`` can count many texts at once.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "gpt-4",
+        encoding: Optional["tiktoken.Encoding"] = None,
+        max_memo_entries: int = MEMO_MAX_ENTRIES
+    ):
+        self.model_name = model_name
+        self._encoding = encoding
+        self.max_memo_entries = max_memo_entries
+        self._memo: Dict[object, int] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def encoding(self) -> "tiktoken.Encoding":
+        if self._encoding is None:
+            self._encoding = get_encoding(self.model_name)
+        return self._encoding
+
+    def _remember(self, key, count: int):
+        if len(self._memo) >= self.max_memo_entries:
+            # Dropping everything is cheaper than LRU bookkeeping on every hit
+            self._memo.clear()
+        self._memo[key] = count
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        key = _memo_key(text)
+        count = self._memo.get(key)
+        if count is not None:
+            self.hits += 1
+            return count
+        self.misses += 1
+        count = len(self.encoding.encode_ordinary(text))
+        self._remember(key, count)
+        return count
+
+    __call__ = count
+
+    def count_batch(self, texts: Sequence[str], num_threads: int = BATCH_THREADS) -> List[int]:
+        """Counts for many texts; memo misses are encoded together across threads."""
+        counts = [0] * len(texts)
+        missing: Dict[object, List[int]] = {}
+        missing_texts: List[str] = []
+        for i, text in enumerate(texts):
+            if not text:
+                continue
+            key = _memo_key(text)
+            count = self._memo.get(key)
+            if count is not None:
+                self.hits += 1
+                counts[i] = count
+            elif key in missing:
+                missing[key].append(i)
+            else:
+                missing[key] = [i]
+                missing_texts.append(text)
+
+        if missing_texts:
+            self.misses += len(missing_texts)
+            if len(missing_texts) >= BATCH_MIN_TEXTS and num_threads > 1:
+                encoded = self.encoding.encode_ordinary_batch(missing_texts, num_threads=num_threads)
+                lengths = [len(tokens) for tokens in encoded]
+            else:
+                lengths = [len(self.encoding.encode_ordinary(text)) for text in missing_texts]
+            for (key, positions), length in zip(missing.items(), lengths):
+                self._remember(key, length)
+                for i in positions:
+                    counts[i] = length
+        return counts
+
+    def clear(self):
+        self._memo.clear()
+
+
+@dataclass
+class EstimatorStats:
+    languages: Dict[str, float]     # Language -> learned characters per token
+    estimates: int                  # Texts answered from a ratio
+    estimated_chars: int
+    exact_counts: int               # Texts encoded exactly (calibration and verification)
+    exact_chars: int
+    exact_seconds: float
+    verified: int                   # Estimates later checked against an exact count
+    mean_error: float               # Mean |estimate - exact| / exact over verified estimates
+    max_error: float
+    seconds_saved: float            # Encoding time avoided by estimating, at the measured rate
+
+
+class TokenEstimator:
+    """Estimates token counts from characters-per-token ratios learned per language.
+
+    Until a language has ``calibration_chars`` of exact counts behind it, its
+    texts are counted exactly (in a batch when the counter supports it) and
+    observed; after that they are estimated without encoding. Estimates that
+    are later counted exactly are recorded to measure the estimator's error.
+    """
+
+    def __init__(
+        self,
+        count_exact: Callable[[str], int],
+        calibration_chars: int = CALIBRATION_CHARS,
+        default_chars_per_token: float = DEFAULT_CHARS_PER_TOKEN
+    ):
+        self.count_exact = count_exact
+        self.calibration_chars = calibration_chars
+        self.default_chars_per_token = default_chars_per_token
+        self._chars: Dict[str, int] = {}
+        self._tokens: Dict[str, int] = {}
+        self.estimates = 0
+        self.estimated_chars = 0
+        self.exact_counts = 0
+        self.exact_chars = 0
+        self.exact_seconds = 0.0
+        self.verified = 0
+        self._error_sum = 0.0
+        self._error_max = 0.0
+
+    def chars_per_token(self, language: str) -> float:
+        tokens = self._tokens.get(language)
+        if tokens:
+            return self._chars[language] / tokens
+        # Unseen language: the ratio over everything seen so far, else the prior
+        total_tokens = sum(self._tokens.values())
+        if total_tokens:
+            return sum(self._chars.values()) / total_tokens
+        return self.default_chars_per_token
+
+    def calibrated(self, language: str) -> bool:
+        return self._chars.get(language, 0) >= self.calibration_chars
+
+    def observe(self, language: str, text: str, tokens: int):
+        self._chars[language] = self._chars.get(language, 0) + len(text)
+        self._tokens[language] = self._tokens.get(language, 0) + tokens
+
+    def estimate(self, text: str, language: str) -> int:
+        if not text:
+            return 0
+        self.estimates += 1
+        self.estimated_chars += len(text)
+        return int(round(len(text) / self.chars_per_token(language)))
+
+    def count(self, text: str) -> int:
+        """Exact count, timed so that estimates can be priced."""
+        start = time.perf_counter()
+        tokens = self.count_exact(text)
+        self.exact_seconds += time.perf_counter() - start
+        self.exact_counts += 1
+        self.exact_chars += len(text)
+        return tokens
+
+    def count_batch(self, texts: Sequence[str], languages: Sequence[str]) -> List[int]:
+        """Counts for many texts: estimated where calibrated, otherwise exact and observed."""
+        counts = [0] * len(texts)
+        uncalibrated = []
+        for i, (text, language) in enumerate(zip(texts, languages)):
+            if not text:
+                continue
+            if self.calibrated(language):
+                counts[i] = self.estimate(text, language)
+            else:
+                uncalibrated.append(i)
+
+        if uncalibrated:
+            exact_texts = [texts[i] for i in uncalibrated]
+            start = time.perf_counter()
+            count_batch = getattr(self.count_exact, "count_batch", None)
+            if count_batch is not None:
+                exact = count_batch(exact_texts)
+            else:
+                exact = [self.count_exact(text) for text in exact_texts]
+            self.exact_seconds += time.perf_counter() - start
+            self.exact_counts += len(exact_texts)
+            self.exact_chars += sum(len(text) for text in exact_texts)
+            for i, tokens in zip(uncalibrated, exact):
+                self.observe(languages[i], texts[i], tokens)
+                counts[i] = tokens
+        return counts
+
+    def record_error(self, estimate: int, exact: int):
+        if exact:
+            error = abs(estimate - exact) / exact
+            self.verified += 1
+            self._error_sum += error
+            self._error_max = max(self._error_max, error)
+
+    def stats(self) -> EstimatorStats:
+        seconds_per_char = self.exact_seconds / self.exact_chars if self.exact_chars else 0.0
+        return EstimatorStats(
+            languages={language: self.chars_per_token(language) for language in self._tokens},
+            estimates=self.estimates,
+            estimated_chars=self.estimated_chars,
+            exact_counts=self.exact_counts,
+            exact_chars=self.exact_chars,
+            exact_seconds=self.exact_seconds,
+            verified=self.verified,
+            mean_error=self._error_sum / self.verified if self.verified else 0.0,
+            max_error=self._error_max,
+            seconds_saved=self.estimated_chars * seconds_per_char
+        )
@@ -4,9 +4,10 @@ Utility functions for RepoMap.
 
 import os
 import sys
+import mmap
 from pathlib import Path
-from typing import Optional, List
-from collections import namedtuple
+from typing import Optional, Union
+from collections import namedtuple, OrderedDict
 
 try:
     import tiktoken
@@ -14,22 +15,16 @@ except ImportError:
     print("Error: tiktoken is required. Install with: pip install tiktoken")
     sys.exit(1)
 
+from .tokens import get_token_counter
+from .discovery import find_src_files
+
 # Tag namedtuple for storing parsed code definitions and references
 Tag = namedtuple("Tag", "rel_fname fname line name kind".split())
 
 
 def count_tokens(text: str, model_name: str = "gpt-4") -> int:
-    """Count tokens in text using tiktoken."""
-    if not text:
-        return 0
-    
-    try:
-        encoding = tiktoken.encoding_for_model(model_name)
-    except KeyError:
-        # Fallback for unknown models
-        encoding = tiktoken.get_encoding("cl100k_base")
-    
-    return len(encoding.encode(text))
+    """Count tokens in text using tiktoken, with a cached encoder and memoized counts."""
+    return get_token_counter(model_name).count(text)
 
 
 def read_text(filename: str, encoding: str = "utf-8", silent: bool = False) -> Optional[str]:
@@ -58,22 +53,76 @@ def read_text(filename: str, encoding: str = "utf-8", silent: bool = False) -> O
         return None
 
 
-def find_src_files(directory: str) -> List[str]:
-    """Find source files in a directory."""
-    if not os.path.isdir(directory):
-        return [directory] if os.path.isfile(directory) else []
-    
-    src_files = []
-    for root, dirs, files in os.walk(directory):
-        # Skip hidden directories and common non-source directories
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in {'node_modules', '__pycache__', 'venv', 'env'}]
-        
-        for file in files:
-            if not file.startswith('.'):
-                full_path = os.path.join(root, file)
-                src_files.append(full_path)
-    
-    return src_files
+def read_bytes(
+    filename: str,
+    silent: bool = False,
+    mmap_threshold: Optional[int] = None
+) -> Optional[Union[bytes, mmap.mmap]]:
+    """Read a file's raw bytes with error handling.
+
+    Files of at least mmap_threshold bytes are memory-mapped instead of copied
+    onto the heap. The mapping is released when the last reference goes away.
+    """
+    try:
+        with open(filename, "rb") as f:
+            if mmap_threshold is not None:
+                size = os.fstat(f.fileno()).st_size
+                if size and size >= mmap_threshold:
+                    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return f.read()
+    except FileNotFoundError:
+        if not silent:
+            print(f"Error: {filename} not found.")
+        return None
+    except IsADirectoryError:
+        if not silent:
+            print(f"Error: {filename} is a directory.")
+        return None
+    except (OSError, ValueError) as e:
+        if not silent:
+            print(f"Error reading {filename}: {e}")
+        return None
+
+
+def decode_source(source: Union[bytes, mmap.mmap]) -> str:
+    """Decode raw source bytes the same way read_text does, newlines included."""
+    text = bytes(source).decode("utf-8", errors="ignore")
+    # Path.read_text translates \r\n and \r to \n (universal newlines)
+    return text.replace("\r\n", "\n").replace("\r", "\n")
+
+
+class SourceBuffers:
+    """Byte-bounded LRU of raw file contents read during a run."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._buffers: "OrderedDict[str, Union[bytes, mmap.mmap]]" = OrderedDict()
+
+    def get(self, fname: str) -> Optional[Union[bytes, mmap.mmap]]:
+        source = self._buffers.get(fname)
+        if source is not None:
+            self._buffers.move_to_end(fname)
+        return source
+
+    def put(self, fname: str, source: Union[bytes, mmap.mmap]):
+        self.discard(fname)
+        if len(source) > self.max_bytes:
+            return
+        self._buffers[fname] = source
+        self.total_bytes += len(source)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._buffers.popitem(last=False)
+            self.total_bytes -= len(evicted)
+
+    def discard(self, fname: str):
+        source = self._buffers.pop(fname, None)
+        if source is not None:
+            self.total_bytes -= len(source)
+
+    def clear(self):
+        self._buffers.clear()
+        self.total_bytes = 0
 
 
 def get_current_commit_sha(repo_path: str) -> Optional[str]:
@@ -13,12 +13,24 @@ import sys
 from pathlib import Path
 from typing import List
 
-from core import count_tokens, read_text, Tag, find_src_files, get_scm_fname, is_important, filter_important_files, RepoMap
+from core import get_token_counter, read_text, Tag, iter_src_files, DiscoveryStats, get_scm_fname, is_important, filter_important_files, RepoMap
+from core.guards import DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_LINE_LENGTH
 
 
 
 
 
+def parse_map_tokens(value: str) -> List[int]:
+    """Parse --map-tokens: one budget, or a comma-separated ladder of budgets."""
+    try:
+        budgets = [int(part) for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid token budget list: {value!r}")
+    if not budgets:
+        raise argparse.ArgumentTypeError("at least one token budget is required")
+    return budgets
+
+
 def tool_output(*messages):
     """Print informational messages."""
     print(*messages, file=sys.stdout)
@@ -43,6 +55,7 @@ def main():
 Examples:
   %(prog)s .                    # Map current directory
   %(prog)s src/ --map-tokens 2048  # Map src/ with 2048 token limit
+  %(prog)s --map-tokens 1024,4096,16384  # Maps at several budgets from one ranking
   %(prog)s file1.py file2.py    # Map specific files
   %(prog)s --chat-files main.py --other-files src/  # Specify chat vs other files
         """
@@ -62,9 +75,10 @@ Examples:
     
     parser.add_argument(
         "--map-tokens",
-        type=int,
-        default=8192,
-        help="Maximum tokens for the generated map (default: 8192)"
+        type=parse_map_tokens,
+        default=[8192],
+        help="Maximum tokens for the generated map, or a comma-separated list of budgets to generate "
+             "a map for each from one ranking pass (default: 8192)"
     )
     
     parser.add_argument(
@@ -120,12 +134,96 @@ Examples:
         action="store_true",
         help="Exclude files with Page Rank 0 from the map"
     )
+
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for parsing uncached files (0 = all cores, default: 1)"
+    )
+
+    parser.add_argument(
+        "--max-ident-defs",
+        type=int,
+        help="Ignore identifiers defined in more than this many files when linking files"
+    )
+
+    parser.add_argument(
+        "--max-ident-refs",
+        type=int,
+        help="Ignore identifiers referenced from more than this many files when linking files"
+    )
+
+    parser.add_argument(
+        "--common-ident-defs",
+        type=int,
+        help="Down-weight identifiers defined in more than this many files"
+    )
+
+    parser.add_argument(
+        "--common-ident-weight",
+        type=float,
+        default=0.1,
+        help="Edge weight multiplier for identifiers over --common-ident-defs (default: 0.1)"
+    )
+    
+    parser.add_argument(
+        "--ppr-basis",
+        action="store_true",
+        help="Rank chat files from a precomputed personalized PageRank basis when one matches the files"
+    )
+    
+    parser.add_argument(
+        "--build-ppr-basis",
+        action="store_true",
+        help="Precompute and save the personalized PageRank basis for the files first (implies --ppr-basis)"
+    )
+    
+    parser.add_argument(
+        "--token-estimator",
+        choices=["sample", "calibrated"],
+        default="sample",
+        help="How map sizes are counted: encode a line sample of every candidate (sample), or estimate from "
+             "per-language ratios learned from exact counts and encode only near the budget (calibrated)"
+    )
+    
+    parser.add_argument(
+        "--token-margin",
+        type=float,
+        default=0.1,
+        help="With --token-estimator calibrated, count maps exactly within this fraction of the budget (default: 0.1)"
+    )
+    
+    parser.add_argument(
+        "--max-file-bytes",
+        type=int,
+        default=DEFAULT_MAX_FILE_BYTES,
+        help=f"Skip files larger than this many bytes, 0 for no limit (default: {DEFAULT_MAX_FILE_BYTES})"
+    )
+    
+    parser.add_argument(
+        "--max-line-length",
+        type=int,
+        default=DEFAULT_MAX_LINE_LENGTH,
+        help=f"Skip files with a line longer than this many bytes, 0 for no limit (default: {DEFAULT_MAX_LINE_LENGTH})"
+    )
+    
+    parser.add_argument(
+        "--include-binary",
+        action="store_true",
+        help="Parse files that look binary instead of skipping them"
+    )
+    
+    parser.add_argument(
+        "--include-generated",
+        action="store_true",
+        help="Parse generated, minified and vendored files instead of skipping them"
+    )
     
     args = parser.parse_args()
     
     # Set up token counter with specified model
-    def token_counter(text: str) -> int:
-        return count_tokens(text, args.model)
+    token_counter = get_token_counter(args.model)
     
     # Set up output handlers
     output_handlers = {
@@ -138,7 +236,7 @@ Examples:
     chat_files_from_args = args.chat_files or [] # These are the paths as strings from the CLI
     
     # Determine the list of unresolved path specifications that will form the 'other_files'
-    # These can be files or directories. find_src_files will expand them.
+    # These can be files or directories. iter_src_files will expand them.
     unresolved_paths_for_other_files_specs = []
     if args.other_files:  # If --other-files is explicitly provided, it's the source
         unresolved_paths_for_other_files_specs.extend(args.other_files)
@@ -147,10 +245,13 @@ Examples:
     # If neither, unresolved_paths_for_other_files_specs remains empty.
 
     # Now, expand all directory paths in unresolved_paths_for_other_files_specs into actual file lists
-    # and collect all file paths. find_src_files handles both files and directories.
+    # and collect all file paths. iter_src_files handles both files and directories.
     effective_other_files_unresolved = []
     for path_spec_str in unresolved_paths_for_other_files_specs:
-        effective_other_files_unresolved.extend(find_src_files(path_spec_str))
+        discovery = DiscoveryStats()
+        effective_other_files_unresolved.extend(iter_src_files(path_spec_str, discovery))
+        if args.verbose:
+            tool_output(f"Discovered {path_spec_str}: {discovery.summary()}")
     
     # Convert to absolute paths
     root_path = Path(args.root).resolve()
@@ -167,19 +268,37 @@ Examples:
     
     # Create RepoMap instance
     repo_map = RepoMap(
-        map_tokens=args.map_tokens,
+        map_tokens=max(args.map_tokens),
         root=str(root_path),
         token_counter_func=token_counter,
         file_reader_func=read_text,
         output_handler_funcs=output_handlers,
         verbose=args.verbose,
         max_context_window=args.max_context_window,
-        exclude_unranked=args.exclude_unranked
+        exclude_unranked=args.exclude_unranked,
+        jobs=args.jobs,
+        max_ident_defs=args.max_ident_defs,
+        max_ident_refs=args.max_ident_refs,
+        common_ident_defs=args.common_ident_defs,
+        common_ident_weight=args.common_ident_weight,
+        ppr_basis=args.ppr_basis or args.build_ppr_basis,
+        token_estimator=args.token_estimator,
+        token_margin=args.token_margin,
+        max_file_bytes=args.max_file_bytes or None,
+        max_line_length=args.max_line_length or None,
+        skip_binary=not args.include_binary,
+        skip_generated=not args.include_generated
     )
     
     # Generate the map
     try:
-        map_content = repo_map.get_repo_map(
+        if args.build_ppr_basis:
+            basis = repo_map.build_ppr_basis(chat_files + other_files)
+            if basis is not None:
+                tool_output(f"PPR basis: {basis.num_nodes} files, {basis.vectors.nnz} entries")
+        
+        maps = repo_map.get_repo_maps(
+            args.map_tokens,
             chat_files=chat_files,
             other_files=other_files,
             mentioned_fnames=mentioned_fnames,
@@ -187,14 +306,18 @@ Examples:
             force_refresh=args.force_refresh
         )
         
-        if map_content:
-            if args.verbose:
-                tokens = repo_map.token_count(map_content)
-                tool_output(f"Generated map: {len(map_content)} chars, ~{tokens} tokens")
-            
-            print(map_content)
-        else:
-            tool_output("No repository map generated.")
+        for budget in args.map_tokens:
+            map_content, _ = maps[budget]
+            if len(args.map_tokens) > 1:
+                tool_output(f"=== Map for {budget} tokens ===")
+            if map_content:
+                if args.verbose:
+                    tokens = repo_map.token_count(map_content)
+                    tool_output(f"Generated map: {len(map_content)} chars, ~{tokens} tokens")
+                
+                print(map_content)
+            else:
+                tool_output("No repository map generated.")
             
     except KeyboardInterrupt:
         tool_error("Interrupted by user")
@@ -205,6 +328,8 @@ Examples:
             import traceback
             traceback.print_exc()
         sys.exit(1)
+    finally:
+        repo_map.close()
 
 
 if __name__ == "__main__":
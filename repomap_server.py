@@ -8,22 +8,12 @@ import dataclasses
 
 from fastmcp import FastMCP, settings
 from core.repomap_class import RepoMap
-from core.utils import count_tokens, read_text
+from core.tagstore import KIND_DEF, KIND_REF
+from core.tokens import get_token_counter
+from core.utils import read_text, find_src_files
 from core.scm import get_scm_fname
 from core.importance import filter_important_files
 
-# Helper function from your CLI, useful to have here
-def find_src_files(directory: str) -> List[str]:
-    if not os.path.isdir(directory):
-        return [directory] if os.path.isfile(directory) else []
-    src_files = []
-    for r, d, f_list in os.walk(directory):
-        d[:] = [d_name for d_name in d if not d_name.startswith('.') and d_name not in {'node_modules', '__pycache__', 'venv', 'env'}]
-        for f in f_list:
-            if not f.startswith('.'):
-                src_files.append(os.path.join(r, f))
-    return src_files
-
 # Configure logging - only show errors
 root_logger = logging.getLogger()
 root_logger.setLevel(logging.ERROR)
@@ -65,7 +55,8 @@ async def repo_map(
 ) -> Dict[str, Any]:
     """Generate a repository map for the specified files, providing a list of function prototypes and variables for files as well as relevant related
     files. Provide filenames relative to the project_root. In addition to the files provided, relevant related files will also be included with a
-    very small ranking boost.
+    very small ranking boost. When a personalized PageRank basis was built for the same files (repomap.py --build-ppr-basis),
+    ranks are assembled from it instead of being recomputed.
 
     :param project_root: Root directory of the project to search.  (must be an absolute path!)
     :param chat_files: A list of file paths that are currently in the chat context. These files will receive the highest ranking.
@@ -137,12 +128,13 @@ async def repo_map(
         repo_mapper = RepoMap(
             map_tokens=token_limit,
             root=str(root_path),
-            token_counter_func=lambda text: count_tokens(text, "gpt-4"),
+            token_counter_func=get_token_counter("gpt-4"),
             file_reader_func=read_text,
             output_handler_funcs={'info': log.info, 'warning': log.warning, 'error': log.error},
             verbose=verbose,
             exclude_unranked=exclude_unranked,
-            max_context_window=max_context_window
+            max_context_window=max_context_window,
+            ppr_basis=True
         )
     except Exception as e:
         log.exception(f"Failed to initialize RepoMap for project '{project_root}': {e}")
@@ -205,7 +197,7 @@ async def search_identifiers(
         # Initialize RepoMap with search-specific settings
         repo_map = RepoMap(
             root=project_root,
-            token_counter_func=lambda text: count_tokens(text, "gpt-4"),
+            token_counter_func=get_token_counter("gpt-4"),
             file_reader_func=read_text,
             output_handler_funcs={'info': log.info, 'warning': log.warning, 'error': log.error},
             verbose=False,
@@ -215,28 +207,26 @@ async def search_identifiers(
         # Find all source files in the project
         all_files = find_src_files(project_root)
         
-        # Get all tags (definitions and references) for all files
-        all_tags = []
-        for file_path in all_files:
-            rel_path = str(Path(file_path).relative_to(project_root))
-            tags = repo_map.get_tags(file_path, rel_path)
-            all_tags.extend(tags)
+        # Load all tags (definitions and references) into one table
+        table, file_ids, _, _ = repo_map.build_tag_table(all_files)
 
         # Filter tags based on search query and options
-        matching_tags = []
+        kinds = set()
+        if include_definitions:
+            kinds.add(KIND_DEF)
+        if include_references:
+            kinds.add(KIND_REF)
+        matching_rows = table.search(query, kinds, file_ids)
         query_lower = query.lower()
-        
-        for tag in all_tags:
-            if query_lower in tag.name.lower():
-                if (tag.kind == "def" and include_definitions) or \
-                   (tag.kind == "ref" and include_references):
-                    matching_tags.append(tag)
 
         # Sort by relevance (definitions first, then references)
-        matching_tags.sort(key=lambda x: (x.kind != "def", x.name.lower().find(query_lower)))
+        matching_rows.sort(key=lambda row: (
+            table.kinds[row] != KIND_DEF,
+            table.names[table.name_ids[row]].lower().find(query_lower)
+        ))
 
         # Limit results
-        matching_tags = matching_tags[:max_results]
+        matching_tags = table.tags(matching_rows[:max_results])
 
         # Format results with context
         results = []
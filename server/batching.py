@@ -0,0 +1,61 @@
+import asyncio
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+
+class RequestCoalescer:
+    """Groups concurrent requests that share a key into one batch call.
+
+    The first request for a key opens a batch and waits ``window`` seconds
+    (by default just one event-loop turn). Requests for the same key that
+    arrive meanwhile, or while an earlier batch for that key is still
+    running, join the open batch. ``batch_func`` runs in a worker thread
+    and must return one result per item. An item's result may be an
+    exception, which is raised for that request only.
+    """
+
+    def __init__(self, batch_func: Callable[[List[Any]], List[Any]], window: float = 0.0):
+        self.batch_func = batch_func
+        self.window = window
+        self._pending: Dict[Hashable, List[Tuple[Any, asyncio.Future]]] = {}
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._lock_users: Dict[Hashable, int] = {}  # Flushes holding or waiting for a key's lock
+        self._tasks = set()
+        self.batches = 0
+
+    async def submit(self, key: Hashable, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = self._pending[key] = []
+            task = asyncio.create_task(self._flush(key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        batch.append((item, future))
+        return await future
+
+    async def _flush(self, key: Hashable):
+        await asyncio.sleep(self.window)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                batch = self._pending.pop(key)
+                self.batches += 1
+                try:
+                    results = await asyncio.to_thread(self.batch_func, [item for item, _ in batch])
+                except Exception as e:
+                    results = [e] * len(batch)
+        finally:
+            # Drop the lock once its key goes idle, so keys seen once do not accumulate
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+        for (_, future), result in zip(batch, results):
+            if future.cancelled():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -9,6 +9,8 @@ from .models import (
     UnifiedSearchResponse
 )
 from .manager import RepositoryManager
+from .batching import RequestCoalescer
+import asyncio
 import os
 from openai import OpenAI
 from rag import RepoSummaryGenerator, Embedder, OpenAILLMClient
@@ -16,6 +18,13 @@ from qdrant_client.http import models
 
 app = FastAPI(title="RepoMapper API")
 manager = RepositoryManager()
+# Concurrent /repomap requests for the same root are ranked in one batch. Batches run
+# in worker threads and the manager locks its instances, so the other endpoints also
+# call it from a worker thread rather than wait for the lock on the event loop.
+repomap_coalescer = RequestCoalescer(
+    lambda requests: manager.extract_repo_maps(requests),
+    window=float(os.getenv("REPOMAP_BATCH_WINDOW", "0.0"))
+)
 
 # Configuration
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
@@ -50,9 +59,10 @@ async def startup_event():
 @app.post("/repomap", response_model=RepoMapResponse)
 async def get_repo_map(request: RepoRequest):
     try:
-        content, commit_sha = manager.extract_repo_map(request)
+        content, commit_sha, maps = await repomap_coalescer.submit(request.root_path, request)
         return RepoMapResponse(
             repo_map=content, 
+            repo_maps=maps,
             repo_id=request.repo_id,
             commit_sha=commit_sha
         )
@@ -62,7 +72,7 @@ async def get_repo_map(request: RepoRequest):
 @app.post("/semantic-blocks", response_model=SemanticBlocksResponse)
 async def get_semantic_blocks(request: RepoRequest):
     try:
-        blocks, commit_sha = manager.extract_semantic_blocks(request)
+        blocks, commit_sha = await asyncio.to_thread(manager.extract_semantic_blocks, request)
         # Assign repo_id to blocks if provided in request
         if request.repo_id:
             for block in blocks:
@@ -117,24 +127,8 @@ async def index_repository(request: RepoRequest):
             
         last_sha = indexer.get_last_commit_sha(request.repo_id)
         
-        # We need to get current SHA. We can get it by extracting the map (or just checking git)
-        # Since we need the map anyway if we proceed, let's extract it.
-        # But extracting map is expensive if we skip.
-        # Ideally manager should have a lightweight 'get_current_sha' method.
-        # For now, let's use extract_repo_map as it returns SHA.
-        # Optimization: We could add a 'check_sha_only' flag to manager?
-        # Or just use get_current_commit_sha directly here if we had access to the path.
-        # But manager handles the path logic.
-        
-        # Let's assume we extract map first. If SHA matches, we discard it.
-        # This is slightly inefficient but safe.
-        # Better: Use manager to get SHA first.
-        
-        # For this implementation, we follow the plan:
-        # 1. Get current SHA (via manager helper or full extraction)
-        # Let's do full extraction for simplicity as per current manager API.
-        
-        content, current_sha = manager.extract_repo_map(request)
+        # Check the commit before doing any work, so unchanged repos are skipped cheaply
+        current_sha = manager.get_commit_sha(request)
         
         if not current_sha:
              raise HTTPException(status_code=500, detail="Could not determine commit SHA")
@@ -144,13 +138,13 @@ async def index_repository(request: RepoRequest):
             
         # 2. Proceed with Indexing
         
+        # Rank once for both the map and the blocks
+        content, blocks, _ = await asyncio.to_thread(manager.extract_index_data, request)
+        
         # Generate Summary
         summary = generator.generate_summary(content)
         em_summary = embedder.embed_text(summary)
         
-        # Extract Blocks
-        blocks, _ = manager.extract_semantic_blocks(request)
-        
         # Embed Blocks
         block_contents = [b['content'] for b in blocks]
         em_blocks = embedder.embed_batch(block_contents)
@@ -1,13 +1,43 @@
-from typing import Dict, List, Set, Tuple, Optional
-from core import RepoMap, find_src_files, count_tokens, get_current_commit_sha
+import functools
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple, Optional, Union
+from core import RepoMap, find_src_files, get_token_counter, get_current_commit_sha
 from dataclasses import asdict
+from core.guards import FileGuards
 from .models import RepoRequest
 
+# Memory available to the render caches of all instances together
+RENDER_CACHE_BYTES = int(os.getenv("REPOMAP_RENDER_CACHE_MB", "512")) * 1024 * 1024
+MAX_REPOS = int(os.getenv("REPOMAP_MAX_REPOS", "8"))
+
+
+def _locked(method):
+    """Run a RepositoryManager method while holding the manager's lock."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
 class RepositoryManager:
-    def __init__(self):
-        self.repos: Dict[str, RepoMap] = {}
+    """Keeps a RepoMap instance per repository, least recently used evicted first.
+
+    RepoMap instances and their caches are not thread safe, and requests
+    reach the manager both from the event loop and from worker threads, so
+    every method that touches an instance holds ``lock`` for its whole run.
+    """
+
+    def __init__(self, max_repos: int = MAX_REPOS, render_cache_bytes: int = RENDER_CACHE_BYTES):
+        self.lock = threading.RLock()
+        self.repos: Dict[str, RepoMap] = {}  # Least recently used first
         self.repo_models: Dict[str, str] = {} # Track model used for each repo
+        self.max_repos = max(1, max_repos)
+        self.render_cache_bytes = render_cache_bytes
 
+    @_locked
     def get_repo_map_instance(self, request: RepoRequest) -> RepoMap:
         root_path = request.root_path
         model = request.model
@@ -17,30 +47,54 @@ class RepositoryManager:
         # If other params change, we can just update attributes.
         
         if root_path not in self.repos or self.repo_models.get(root_path) != model:
-            def token_counter(text: str) -> int:
-                return count_tokens(text, model)
+            self.evict(root_path)
+            while len(self.repos) >= self.max_repos:
+                self.evict(next(iter(self.repos)))
                 
             self.repos[root_path] = RepoMap(
                 root=root_path, 
                 map_tokens=request.token_limit,
-                token_counter_func=token_counter,
+                token_counter_func=get_token_counter(model),
                 verbose=request.verbose,
                 max_context_window=request.max_context_window,
-                exclude_unranked=request.exclude_unranked
+                exclude_unranked=request.exclude_unranked,
+                render_cache_bytes=self.render_cache_bytes // self.max_repos,
+                max_file_bytes=request.max_file_bytes,
+                max_line_length=request.max_line_length,
+                skip_binary=request.skip_binary,
+                skip_generated=request.skip_generated
             )
             self.repo_models[root_path] = model
         else:
-            # Update attributes of existing instance
-            repo = self.repos[root_path]
+            # Update attributes of existing instance, marking it most recently used
+            repo = self.repos[root_path] = self.repos.pop(root_path)
             repo.map_tokens = request.token_limit
             repo.max_map_tokens = request.token_limit
             repo.verbose = request.verbose
             repo.max_context_window = request.max_context_window
             repo.exclude_unranked = request.exclude_unranked
+            repo.file_guards = FileGuards(
+                request.max_file_bytes, request.max_line_length, request.skip_binary, request.skip_generated
+            )
             
         return self.repos[root_path]
 
-    def extract_repo_map(self, request: RepoRequest) -> Tuple[str, Optional[str]]:
+    @_locked
+    def evict(self, root_path: str):
+        """Drop a repository's instance, releasing its workers and caches."""
+        repo = self.repos.pop(root_path, None)
+        self.repo_models.pop(root_path, None)
+        if repo is not None:
+            repo.close()
+            repo.render_cache.clear()
+
+    @_locked
+    def extract_repo_map(self, request: RepoRequest) -> Tuple[str, Optional[str], Dict[int, str]]:
+        """Map for the request's token_limit, plus one per token_limits budget.
+        
+        Returns (content, commit_sha, maps by budget); the maps are empty
+        unless token_limits were requested.
+        """
         repo_map = self.get_repo_map_instance(request)
         
         # Resolve files
@@ -52,19 +106,96 @@ class RepositoryManager:
         mentioned_fnames = set(request.mentioned_files) if request.mentioned_files else None
         mentioned_idents = set(request.mentioned_idents) if request.mentioned_idents else None
         
-        content, _ = repo_map.get_repo_map(
-            chat_files=request.chat_files,
-            other_files=other_files,
-            mentioned_fnames=mentioned_fnames,
-            mentioned_idents=mentioned_idents,
-            force_refresh=request.force_refresh
-        )
+        maps: Dict[int, str] = {}
+        if request.token_limits:
+            # One ranking and one packing sweep for the whole budget ladder
+            ladder = repo_map.get_repo_maps(
+                sorted(set(request.token_limits) | {request.token_limit}),
+                chat_files=request.chat_files,
+                other_files=other_files,
+                mentioned_fnames=mentioned_fnames,
+                mentioned_idents=mentioned_idents,
+                force_refresh=request.force_refresh
+            )
+            content = ladder[request.token_limit][0]
+            maps = {budget: ladder[budget][0] or "" for budget in request.token_limits}
+        else:
+            content, _ = repo_map.get_repo_map(
+                chat_files=request.chat_files,
+                other_files=other_files,
+                mentioned_fnames=mentioned_fnames,
+                mentioned_idents=mentioned_idents,
+                force_refresh=request.force_refresh
+            )
         
         # Get commit SHA
         commit_sha = get_current_commit_sha(request.root_path)
         
-        return content or "", commit_sha
+        return content or "", commit_sha, maps
+
+    @_locked
+    def extract_repo_maps(
+        self, requests: List[RepoRequest]
+    ) -> List[Union[Tuple[str, Optional[str], Dict[int, str]], Exception]]:
+        """Extract maps for a batch of requests, ranking same-repo requests together.
+        
+        Requests for the same root and model share one RepoMap instance, and
+        their chat file sets are ranked in a single batched PageRank pass
+        before the maps are rendered. Each result is either the
+        ``extract_repo_map`` result or the exception raised for that request.
+        """
+        groups: Dict[Tuple[str, str, Tuple[str, ...]], List[RepoRequest]] = defaultdict(list)
+        resolved: Dict[str, List[str]] = {}
+        for request in requests:
+            if not request.other_files and request.root_path not in resolved:
+                resolved[request.root_path] = find_src_files(request.root_path)
+            other_files = request.other_files or resolved[request.root_path]
+            groups[(request.root_path, request.model, tuple(other_files))].append(request)
+        
+        for (_, _, other_files), group in groups.items():
+            if len(group) < 2:
+                continue
+            try:
+                repo_map = self.get_repo_map_instance(group[0])
+                repo_map.rank_many([r.chat_files or [] for r in group], list(other_files))
+            except Exception:
+                # Batched ranking only warms the rank memo; each request still runs below
+                pass
+        
+        results = []
+        for request in requests:
+            try:
+                if not request.other_files and request.root_path in resolved:
+                    request = request.model_copy(update={"other_files": resolved[request.root_path]})
+                results.append(self.extract_repo_map(request))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def get_commit_sha(self, request: RepoRequest) -> Optional[str]:
+        return get_current_commit_sha(request.root_path)
+
+    @_locked
+    def extract_index_data(self, request: RepoRequest) -> Tuple[str, List[dict], Optional[str]]:
+        """Repo map and semantic blocks for indexing, from a single ranking pass."""
+        repo_map = self.get_repo_map_instance(request)
+        
+        other_files = request.other_files
+        if not other_files:
+            other_files = find_src_files(request.root_path)
+        
+        mentioned_fnames = set(request.mentioned_files) if request.mentioned_files else None
+        mentioned_idents = set(request.mentioned_idents) if request.mentioned_idents else None
+        
+        ranking = repo_map.rank(request.chat_files or [], other_files, mentioned_fnames, mentioned_idents)
+        content, _ = repo_map.get_repo_map(ranking=ranking, force_refresh=request.force_refresh)
+        blocks = repo_map.get_semantic_blocks(token_limit=request.token_limit, ranking=ranking)
+        
+        commit_sha = get_current_commit_sha(request.root_path)
+        
+        return content or "", [asdict(b) for b in blocks], commit_sha
 
+    @_locked
     def extract_semantic_blocks(self, request: RepoRequest) -> Tuple[List[dict], Optional[str]]:
         repo_map = self.get_repo_map_instance(request)
         
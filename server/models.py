@@ -1,10 +1,12 @@
 from pydantic import BaseModel
-from typing import List, Optional, Any
+from typing import Dict, List, Optional, Any
+from core.guards import DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_LINE_LENGTH
 
 class RepoRequest(BaseModel):
     root_path: str
     repo_id: Optional[str] = None
     token_limit: int = 1024
+    token_limits: List[int] = []    # Extra budgets for /repomap, all cut from one ranking
     chat_files: List[str] = []
     other_files: List[str] = []
     mentioned_files: List[str] = []
@@ -14,9 +16,14 @@ class RepoRequest(BaseModel):
     max_context_window: Optional[int] = None
     force_refresh: bool = False
     exclude_unranked: bool = False
+    max_file_bytes: Optional[int] = DEFAULT_MAX_FILE_BYTES      # None for no limit
+    max_line_length: Optional[int] = DEFAULT_MAX_LINE_LENGTH    # None for no limit
+    skip_binary: bool = True
+    skip_generated: bool = True     # Generated, minified and vendored files
 
 class RepoMapResponse(BaseModel):
-    repo_map: str
+    repo_map: str                   # Map for token_limit
+    repo_maps: Dict[int, str] = {}  # Budget -> map, when token_limits were requested
     repo_id: Optional[str] = None
     commit_sha: Optional[str] = None
 
@@ -0,0 +1,85 @@
+import mmap
+import os
+import sys
+from collections import Counter
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.repomap_class as repomap_class
+from core.repomap_class import RepoMap
+from core.utils import SourceBuffers, decode_source, read_bytes, read_text
+
+SOURCES = {
+    "app.py": "from util import helper\n\n\ndef main():\n    return helper() + 1\n",
+    "util.py": "def helper():\n    return 41\n\n\nclass Unused:\n    pass\n",
+}
+
+
+def _write_repo(tmp_path):
+    for name, text in SOURCES.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+    return [str(tmp_path / name) for name in SOURCES]
+
+
+def test_read_bytes(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_bytes(b"x = 1\n")
+
+    assert read_bytes(str(path)) == b"x = 1\n"
+    mapped = read_bytes(str(path), mmap_threshold=1)
+    assert isinstance(mapped, mmap.mmap)
+    assert mapped[:] == b"x = 1\n"
+    assert read_bytes(str(tmp_path / "missing.py"), silent=True) is None
+
+
+def test_decode_source_matches_read_text(tmp_path):
+    path = tmp_path / "a.py"
+    path.write_bytes("x = 1\r\ny = 'é'\rz = 2\n".encode("utf-8"))
+
+    assert decode_source(read_bytes(str(path))) == read_text(str(path)) == "x = 1\ny = 'é'\nz = 2\n"
+
+
+def test_source_buffers_evict_by_size():
+    buffers = SourceBuffers(max_bytes=10)
+    buffers.put("a", b"12345")
+    buffers.put("b", b"12345")
+    buffers.put("c", b"123")
+
+    assert buffers.get("a") is None
+    assert buffers.get("b") == b"12345"
+    assert buffers.total_bytes == 8
+
+    buffers.put("huge", b"x" * 11)
+    assert buffers.get("huge") is None
+
+
+def test_mmap_path_matches_heap_path(tmp_path):
+    files = _write_repo(tmp_path)
+    heap = RepoMap(root=str(tmp_path))
+    heap.TAGS_CACHE = {}
+    mapped = RepoMap(root=str(tmp_path), mmap_threshold=1)
+    mapped.TAGS_CACHE = {}
+
+    for fname in files:
+        rel = os.path.basename(fname)
+        assert mapped.get_tags_raw(fname, rel) == heap.get_tags_raw(fname, rel)
+
+
+def test_each_file_read_once_per_run(tmp_path, monkeypatch):
+    files = _write_repo(tmp_path)
+    reads = Counter()
+    real_read_bytes = repomap_class.read_bytes
+
+    def counting_read_bytes(fname, **kwargs):
+        reads[fname] += 1
+        return real_read_bytes(fname, **kwargs)
+
+    monkeypatch.setattr(repomap_class, "read_bytes", counting_read_bytes)
+
+    repo_map = RepoMap(root=str(tmp_path), token_counter_func=lambda text: len(text) // 4)
+    repo_map.TAGS_CACHE = {}
+    content, _ = repo_map.get_repo_map(other_files=files)
+
+    assert "def main" in content
+    assert reads and all(count == 1 for count in reads.values())
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.discovery import DiscoveryStats, iter_src_files, parse_gitignore, _is_ignored
+
+
+def _write(root, rel_fname, text="x = 1\n"):
+    path = root / rel_fname
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding="utf-8")
+
+
+def _make_tree(root):
+    for rel_fname in [
+        "app/main.py", "app/util.js", "app/logo.png", "README.md", "package-lock.json",
+        "build/gen.py", "app/keep/gen.py", "logs/debug.py", ".hidden/secret.py",
+        "node_modules/lib/index.js", "app/__pycache__/main.py",
+    ]:
+        _write(root, rel_fname)
+    _write(root, ".gitignore", "build/\n*.png\nlogs/*\n!logs/keep.py\n")
+    _write(root, "logs/keep.py")
+    _write(root, "app/.gitignore", "/keep/\n")
+
+
+def _relative(root, fnames):
+    return sorted(os.path.relpath(f, root).replace(os.sep, "/") for f in fnames)
+
+
+def test_scandir_walk_honours_gitignore_and_languages(tmp_path):
+    _make_tree(tmp_path)
+    stats = DiscoveryStats()
+    files = _relative(tmp_path, iter_src_files(str(tmp_path), stats, use_git=False))
+
+    assert files == ["app/main.py", "app/util.js", "logs/keep.py"]
+    assert stats.source == "scandir" and stats.found == 3
+    # build/ and app/keep/ are pruned as directories; logo.png and logs/debug.py as files
+    assert stats.skipped["gitignored"] == 4
+    assert stats.skipped["no tags query for language"] == 2
+    assert stats.skipped["excluded directory"] == 2 and stats.skipped["hidden"] == 3
+
+
+def test_git_listing_skips_ignored_and_deleted_files(tmp_path):
+    _make_tree(tmp_path)
+    _write(tmp_path, "app/removed.py")
+    run = lambda *args: subprocess.run(["git", *args], cwd=tmp_path, check=True, capture_output=True)
+    run("init", "-q")
+    run("add", "-A")
+    os.remove(tmp_path / "app" / "removed.py")
+    _write(tmp_path, "app/untracked.py")
+
+    stats = DiscoveryStats()
+    files = _relative(tmp_path, iter_src_files(str(tmp_path), stats))
+
+    assert stats.source == "git"
+    assert files == ["app/main.py", "app/untracked.py", "app/util.js", "logs/keep.py"]
+    assert stats.skipped["deleted"] == 1
+
+
+def test_gitignore_patterns():
+    rules = parse_gitignore("# comment\n*.log\n/top.py\ndocs/**/draft.md\n!keep.log\nout/\n")
+    ignored = lambda path, is_dir=False: _is_ignored((("", rules),), path, is_dir)
+
+    assert ignored("a.log") and ignored("deep/b.log") and not ignored("keep.log")
+    assert ignored("top.py") and not ignored("sub/top.py")
+    assert ignored("docs/draft.md") and ignored("docs/a/b/draft.md")
+    assert ignored("out", is_dir=True) and not ignored("out")
+
+
+def test_a_file_path_is_yielded_as_is(tmp_path):
+    _write(tmp_path, "notes.txt")
+    assert list(iter_src_files(str(tmp_path / "notes.txt"))) == [str(tmp_path / "notes.txt")]
+    assert list(iter_src_files(str(tmp_path / "missing.py"))) == []
@@ -0,0 +1,59 @@
+import os
+import sys
+from pathlib import Path
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.file_table import FileTable
+from core.repomap_class import RepoMap
+
+
+def test_paths_resolve_like_pathlib_and_are_interned(tmp_path, monkeypatch):
+    root = tmp_path / "repo"
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "a.py").write_text("x = 1\n", encoding="utf-8")
+    (root / "link.py").symlink_to(root / "pkg" / "a.py")
+    (root / "linkdir").symlink_to(root / "pkg")
+    monkeypatch.chdir(root)
+
+    files = FileTable(str(root.resolve()))
+    paths = [
+        str(root / "pkg" / "a.py"), "pkg/a.py", "pkg/../pkg/a.py", "link.py",
+        "linkdir/a.py", "missing.py", str(tmp_path / "outside.py"), "."
+    ]
+    for path in paths:
+        assert files.resolve(path) == str(Path(path).resolve())
+        try:
+            expected_rel = str(Path(path).resolve().relative_to(root.resolve()))
+        except ValueError:
+            expected_rel = str(Path(path).resolve())
+        assert files.rel_fname(path) == expected_rel
+
+    a = files.get("pkg/a.py")
+    assert a.stat is not None and a.rel_fname == os.path.join("pkg", "a.py")
+    assert files.get("link.py") is a and files.get("linkdir/a.py") is a
+    assert files.get("missing.py").stat is None
+    assert [entry.file_id for entry in files.entries] == list(range(len(files)))
+
+
+def test_a_map_run_stats_each_file_once(tmp_path, monkeypatch):
+    fnames = []
+    for i in range(5):
+        (tmp_path / f"mod{i}.py").write_text(f"def func{i}():\n    return func{(i + 1) % 5}()\n", encoding="utf-8")
+        fnames.append(str(tmp_path / f"mod{i}.py"))
+    repo_map = RepoMap(root=str(tmp_path), token_counter_func=lambda text: len(text.split()))
+    repo_map.TAGS_CACHE = {}
+
+    tables = []
+    new_file_table = repo_map.new_file_table
+    repo_map.new_file_table = lambda: tables.append(new_file_table()) or tables[-1]
+    stats = []
+    real_stat = os.stat
+    monkeypatch.setattr(os, "stat", lambda path, *args, **kwargs: stats.append(path) or real_stat(path, *args, **kwargs))
+    content, report = repo_map.get_repo_map(fnames[:1], fnames[1:] + [str(tmp_path / "gone.py")])
+
+    assert "func0" in content and "gone.py" in str(report.excluded)
+    # The cache key, tag loading, ranking and rendering share one table
+    assert len(tables) == 1 and tables[0].stat_calls == 6
+    assert not [path for path in stats if str(path).endswith(".py")]
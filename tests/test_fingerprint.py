@@ -0,0 +1,84 @@
+import os
+import shutil
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.fingerprint import Fingerprinter, hash_file
+from core.repomap_class import RepoMap
+
+SOURCE = "def alpha():\n    return beta()\n\ndef beta():\n    return 1\n"
+
+
+def test_hash_skipped_when_stat_matches(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text(SOURCE, encoding="utf-8")
+    store = {}
+
+    first = Fingerprinter(store).fingerprint(str(src), "a.py")
+    # A fresh fingerprinter over the same store should trust size and mtime
+    second_fp = Fingerprinter(store)
+    second = second_fp.fingerprint(str(src), "a.py")
+
+    assert first == second
+    assert second_fp.hashed == 0
+    assert second_fp.stat_hits == 1
+    assert first.digest == hash_file(str(src))
+
+
+def test_touch_without_change_keeps_digest(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text(SOURCE, encoding="utf-8")
+    fingerprinter = Fingerprinter({})
+
+    before = fingerprinter.fingerprint(str(src), "a.py")
+    os.utime(src, ns=(before.mtime_ns + 10**9, before.mtime_ns + 10**9))
+    after = fingerprinter.fingerprint(str(src), "a.py")
+
+    assert after.digest == before.digest
+    assert after.mtime_ns != before.mtime_ns
+    assert fingerprinter.hashed == 2
+
+
+def test_missing_file_has_no_fingerprint(tmp_path):
+    assert Fingerprinter({}).fingerprint(str(tmp_path / "gone.py"), "gone.py") is None
+
+
+def test_tags_survive_checkout_move(tmp_path):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "a.py").write_text(SOURCE, encoding="utf-8")
+
+    repo_map = RepoMap(root=str(repo))
+    repo_map.TAGS_CACHE = {}
+    tags = repo_map.get_tags(str(repo / "a.py"), "a.py")
+    shared_cache = repo_map.TAGS_CACHE
+
+    moved = tmp_path / "moved"
+    shutil.copytree(repo, moved)
+    moved_map = RepoMap(root=str(moved))
+    moved_map.TAGS_CACHE = shared_cache
+
+    with patch.object(RepoMap, "get_tags_raw", side_effect=AssertionError("re-parsed")):
+        moved_tags = moved_map.get_tags(str(moved / "a.py"), "a.py")
+
+    assert [(t.name, t.kind, t.line) for t in moved_tags] == [(t.name, t.kind, t.line) for t in tags]
+    assert all(t.fname == str(moved / "a.py") for t in moved_tags)
+    assert all(t.rel_fname == "a.py" for t in moved_tags)
+
+
+def test_rewrite_with_same_content_is_a_hit(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text(SOURCE, encoding="utf-8")
+
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    repo_map.get_tags(str(src), "a.py")
+
+    src.write_text(SOURCE, encoding="utf-8")
+    os.utime(src, ns=(1, 1))
+
+    with patch.object(RepoMap, "get_tags_raw", side_effect=AssertionError("re-parsed")):
+        assert repo_map.get_tags(str(src), "a.py")
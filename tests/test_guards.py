@@ -0,0 +1,107 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import core.fingerprint as fingerprint
+from core.fingerprint import Fingerprinter, SCAN_VERSION, STAT_KEY_PREFIX, has_generated_marker, hash_file, scan_file
+from core.guards import FileGuards
+from core.repomap_class import RepoMap
+
+SOURCE = "def helper():\n    return 1\n"
+
+
+def test_scan_notes_content_facts_across_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(fingerprint, "HASH_CHUNK_SIZE", 7)
+    src = tmp_path / "a.py"
+    src.write_bytes(b"# Code generated by protoc. DO NOT EDIT.\nshort\n" + b"x" * 30 + b"\nend")
+
+    digest, binary, generated, max_line_length = scan_file(str(src))
+    assert digest == hash_file(str(src))
+    assert not binary and generated and max_line_length == 40
+
+    src.write_bytes(b"abc\0def")
+    assert scan_file(str(src))[1:] == (True, False, 7)
+
+
+def test_generated_markers_only_count_in_the_leading_comment():
+    assert has_generated_marker(b"#!/usr/bin/env python\n\n# Code generated by protoc. DO NOT EDIT.\n")
+    assert has_generated_marker(b"/*\n * Autogenerated by Thrift\n */\n")
+    assert not has_generated_marker(b'"""Helpers for autogenerated IDs."""\n')
+    assert not has_generated_marker(b"import os\n# DO NOT EDIT the table below by hand\n")
+    assert not has_generated_marker(b"MARKER = '@generated'\n")
+
+
+def test_records_from_older_scanners_are_rehashed(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text(SOURCE, encoding="utf-8")
+    st = os.stat(src)
+    digest = hash_file(str(src))
+    for stored in [(st.st_size, st.st_mtime_ns, "old-digest"), (st.st_size, st.st_mtime_ns, digest, False, True, 20)]:
+        store = {STAT_KEY_PREFIX + "a.py": stored}
+        fingerprinter = Fingerprinter(store)
+        result = fingerprinter.fingerprint(str(src), "a.py")
+        assert fingerprinter.hashed == 1 and result.digest == digest and not result.generated
+        assert store[STAT_KEY_PREFIX + "a.py"][0] == SCAN_VERSION
+
+
+def test_vendored_directories_are_only_checked_under_the_root():
+    guards = FileGuards()
+    assert "vendor/" in guards.check_path(os.path.join("vendor", "lib.py"), 10)
+    assert "dist/" in guards.check_path(os.path.join("dist", "lib.py"), 10)
+    assert guards.check_path(os.path.join("src", "dist", "lib.py"), 10) is None
+    # Outside the root the path is absolute, and its directories are not the repository's
+    assert guards.check_path(os.path.join(os.sep, "opt", "vendor", "lib.py"), 10) is None
+    assert "minified" in guards.check_path(os.path.join(os.sep, "opt", "vendor", "app.min.js"), 10)
+
+
+def test_guarded_files_are_reported_and_not_parsed(tmp_path, monkeypatch):
+    files = {
+        "main.py": SOURCE,
+        "app.min.js": "function a(){return 1}\n",
+        "vendor/lib.py": SOURCE,
+        "big.py": SOURCE + "# padding\n" * 200,
+        "long.py": SOURCE + "x = '" + "y" * 300 + "'\n",
+        "blob.py": "def f():\0\n",
+        "gen.py": "# @generated by tool\n" + SOURCE,
+    }
+    for rel_fname, text in files.items():
+        (tmp_path / rel_fname).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / rel_fname).write_text(text, encoding="utf-8")
+    fnames = [str(tmp_path / rel_fname) for rel_fname in files]
+
+    repo_map = RepoMap(
+        root=str(tmp_path), token_counter_func=lambda text: len(text.split()),
+        max_file_bytes=1000, max_line_length=200
+    )
+    repo_map.TAGS_CACHE = {}
+    parsed = []
+    get_tags_raw = repo_map.get_tags_raw
+    repo_map.get_tags_raw = lambda fname, rel_fname: parsed.append(rel_fname) or get_tags_raw(fname, rel_fname)
+
+    _, report = repo_map.get_repo_map([], fnames)
+    reasons = {os.path.relpath(fname, tmp_path): reason for fname, reason in report.excluded.items()}
+    assert parsed == ["main.py"]
+    assert "minified" in reasons["app.min.js"]
+    assert "vendor/" in reasons[os.path.join("vendor", "lib.py")]
+    assert "too large" in reasons["big.py"] and "Line too long" in reasons["long.py"]
+    assert "Binary" in reasons["blob.py"] and "Generated" in reasons["gen.py"]
+
+    # Files skipped by path are never read, not even for the map cache key
+    scanned = []
+    monkeypatch.setattr(fingerprint, "scan_file", lambda fname: scanned.append(fname) or scan_file(fname))
+    fresh = RepoMap(
+        root=str(tmp_path), token_counter_func=lambda text: len(text.split()),
+        max_file_bytes=1000, max_line_length=200
+    )
+    fresh.TAGS_CACHE = {}
+    fresh.get_repo_map([], fnames)
+    assert sorted(os.path.relpath(fname, tmp_path) for fname in scanned) == [
+        "blob.py", "gen.py", "long.py", "main.py"
+    ]
+
+    # Loosened guards take effect on the next map without a refresh
+    repo_map.file_guards = FileGuards(max_bytes=None, max_line_length=None, skip_binary=True, skip_generated=False)
+    _, report = repo_map.get_repo_map([], fnames)
+    assert sorted(os.path.relpath(fname, tmp_path) for fname in report.excluded) == ["blob.py"]
@@ -0,0 +1,100 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.incremental import TreeCache, compute_edit
+from core.repomap_class import RepoMap
+from core.tags import parse_file_tags
+
+SOURCE = '''import os
+
+
+def first(path):
+    return os.path.join(path, "a")
+
+
+class Second:
+    def method(self):
+        return first("b")
+
+
+def third():
+    return Second().method()
+'''
+
+
+def test_compute_edit_single_replacement():
+    old = b"abc\ndef\nghi\n"
+    new = b"abc\ndXYf\nghi\n"
+    edit = compute_edit(old, new)
+
+    assert (edit.start_byte, edit.old_end_byte, edit.new_end_byte) == (5, 6, 7)
+    assert edit.start_point == (1, 1)
+    assert edit.old_end_point == (1, 2)
+    assert edit.new_end_point == (1, 3)
+    assert compute_edit(old, old) is None
+
+
+def test_compute_edit_insert_lines():
+    old = b"a\nb\n"
+    new = b"a\nx\ny\nb\n"
+    edit = compute_edit(old, new)
+
+    assert edit.start_byte == edit.old_end_byte == 2
+    assert edit.new_end_point[0] - edit.old_end_point[0] == 2
+
+
+def test_tree_cache_is_bounded():
+    cache = TreeCache(2)
+    for name in ("a", "b", "c"):
+        cache.put(name, object())
+    assert len(cache) == 2
+    assert cache.get("a") is None
+    assert cache.get("c") is not None
+
+
+def _tags(text, tree_cache=None):
+    return parse_file_tags("m.py", "m.py", lambda _: text, print, tree_cache=tree_cache)
+
+
+def test_incremental_matches_full_parse():
+    cache = TreeCache(4)
+    _tags(SOURCE, cache)
+
+    edits = [
+        SOURCE.replace('"b"', '"bb"'),
+        SOURCE.replace("class Second:", "\n\nclass Second:"),
+        SOURCE.replace("def third():", "def fourth():\n    return 4\n\n\ndef third():"),
+        SOURCE.replace("    def method(self):\n        return first(\"b\")\n", ""),
+    ]
+    for text in edits:
+        assert _tags(text, cache) == _tags(text)
+
+    assert cache.incremental_parses == len(edits)
+
+
+def test_syntax_error_falls_back_to_full_parse():
+    cache = TreeCache(4)
+    _tags(SOURCE, cache)
+    broken = SOURCE.replace("def third():", "def third(:")
+    assert _tags(broken, cache) == _tags(broken)
+
+
+def test_repomap_reuses_trees_across_edits(tmp_path):
+    src = tmp_path / "m.py"
+    src.write_text(SOURCE, encoding="utf-8")
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+
+    repo_map.get_tags(str(src), "m.py")
+    edited = SOURCE.replace("def third():", "def third_renamed():")
+    src.write_text(edited, encoding="utf-8")
+    os.utime(src, ns=(1, 1))
+
+    tags = repo_map.get_tags(str(src), "m.py")
+
+    assert repo_map.tree_cache.incremental_parses == 1
+    assert any(t.name == "third_renamed" for t in tags)
+    assert not any(t.name == "third" for t in tags)
@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from core.languages import LanguageRegistry, get_language_registry
+from core.repomap_class import RepoMap
+
+
+def test_bundle_is_loaded_once():
+    registry = LanguageRegistry()
+
+    first = registry.get("python")
+    second = registry.get("python")
+
+    assert first is second
+    stats = registry.stats()
+    assert stats.languages_loaded == 1
+    assert stats.hits == 1
+    assert stats.saved_seconds == pytest.approx(first.setup_seconds)
+
+
+def test_parser_reused_per_thread():
+    registry = LanguageRegistry()
+    bundle = registry.get("python")
+    main_parser = registry.get_parser(bundle)
+    assert registry.get_parser(bundle) is main_parser
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(registry.get_parser(bundle)))
+    thread.start()
+    thread.join()
+
+    assert other[0] is not main_parser
+
+
+def test_load_errors_are_cached():
+    registry = LanguageRegistry()
+
+    with pytest.raises(Exception):
+        registry.get("no-such-language")
+    with pytest.raises(Exception):
+        registry.get("no-such-language")
+
+    assert registry.stats().languages_loaded == 0
+    assert registry.stats().hits == 1
+
+
+def test_repomap_instances_share_registry(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text("def foo():\n    return 1\n", encoding="utf-8")
+
+    registry = get_language_registry()
+    registry.get("python")
+    before = registry.stats().hits
+
+    for _ in range(2):
+        repo_map = RepoMap(root=str(tmp_path))
+        tags = repo_map.get_tags_raw(str(src), "a.py")
+        assert any(t.name == "foo" for t in tags)
+
+    assert registry.stats().hits == before + 2
@@ -0,0 +1,79 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.map_cache import FileSetDigest, map_cache_key
+from core.repomap_class import RepoMap
+
+
+class WordCounter:
+    model_name = "words"
+
+    def __call__(self, text):
+        return len(text.split())
+
+
+def _write_repo(root):
+    (root / "a.py").write_text("def helper():\n    return 1\n", encoding="utf-8")
+    (root / "b.py").write_text("from a import helper\n\ndef main():\n    return helper()\n", encoding="utf-8")
+    return [str(root / "a.py"), str(root / "b.py")]
+
+
+def test_file_set_digest_ignores_order_but_not_roles_or_content():
+    def digest(entries):
+        files = FileSetDigest()
+        for entry in entries:
+            files.add(*entry)
+        return map_cache_key(files, ("gpt-4", 1024))
+
+    entries = [("other", "a.py", "d1"), ("other", "b.py", "d2"), ("chat", "c.py", "d3")]
+    assert digest(entries) == digest(list(reversed(entries)))
+    assert digest(entries) != digest([("chat", "a.py", "d1")] + entries[1:])
+    assert digest(entries) != digest([("other", "a.py", "d9")] + entries[1:])
+
+
+def test_maps_are_shared_across_instances_and_invalidated_by_edits(tmp_path):
+    files = _write_repo(tmp_path)
+    first = RepoMap(root=str(tmp_path), map_tokens=1024, token_counter_func=WordCounter())
+    content, _ = first.get_repo_map([], files)
+    assert "helper" in content
+
+    # A new instance (another CLI run or server) reuses the map without ranking
+    second = RepoMap(root=str(tmp_path), map_tokens=1024, token_counter_func=WordCounter())
+    second.rank = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("ranked again"))
+    assert second.get_repo_map([], files)[0] == content
+    assert second.map_cache.hits == 1
+
+    # Editing a file changes the key, so the map is rebuilt without force_refresh
+    (tmp_path / "a.py").write_text("def helper_renamed():\n    return 1\n", encoding="utf-8")
+    third = RepoMap(root=str(tmp_path), map_tokens=1024, token_counter_func=WordCounter())
+    updated, _ = third.get_repo_map([], files)
+    assert "helper_renamed" in updated
+    assert third.map_cache.misses == 1
+
+
+def test_unnamed_counters_only_cache_in_memory(tmp_path):
+    files = _write_repo(tmp_path)
+    repo_map = RepoMap(root=str(tmp_path), map_tokens=1024, token_counter_func=lambda text: len(text.split()))
+    repo_map.get_repo_map([], files)
+    assert repo_map.get_repo_map([], files)[0] is not None
+    assert repo_map.map_cache.hits == 1
+    assert not [key for key in repo_map.TAGS_CACHE.iterkeys() if key.startswith("map:")]
+
+
+def test_budget_ladder_matches_single_maps_and_is_cached(tmp_path):
+    files = _write_repo(tmp_path)
+    budgets = [8, 16, 1024]
+    ladder = RepoMap(root=str(tmp_path), token_counter_func=WordCounter())
+    maps = ladder.get_repo_maps(budgets, [], files)
+
+    for budget in budgets:
+        single = RepoMap(root=str(tmp_path), map_tokens=budget, token_counter_func=lambda text: len(text.split()))
+        assert maps[budget][0] == single.get_repo_map([], files)[0]
+
+    # Every budget of the ladder is now a lookup, in this instance and others
+    other = RepoMap(root=str(tmp_path), map_tokens=16, token_counter_func=WordCounter())
+    other.rank = lambda *args, **kwargs: (_ for _ in ()).throw(AssertionError("ranked again"))
+    assert other.get_repo_map([], files)[0] == maps[16][0]
@@ -0,0 +1,100 @@
+import os
+import random
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from core.packing import MapPacker, SECTION_SEPARATOR
+from core.tags import ParsedTag
+
+
+def _ranked_tags(num_files, seed):
+    rng = random.Random(seed)
+    tags = []
+    for f in range(num_files):
+        rank = rng.random()
+        for line in rng.sample(range(1, 200), rng.randrange(1, 6)):
+            tags.append((rank, ParsedTag(f"f{f}.py", f"/abs/f{f}.py", line, f"n{line}", "def", line)))
+    tags.sort(key=lambda x: x[0], reverse=True)
+    return tags
+
+
+def _render_section(rel_fname, lois, max_rank):
+    if rel_fname == "f3.py":
+        return ""  # An unreadable file is left out of the map
+    return f"{rel_fname}:\n(Rank value: {max_rank:.4f})\n\n" + "\n".join(f"line {l}" for l in lois)
+
+
+def _render_map(tags):
+    """Reference rendering, grouped and ordered like RepoMap.to_tree."""
+    by_file = {}
+    for rank, tag in tags:
+        by_file.setdefault(tag.rel_fname, []).append((rank, tag))
+    ordered = sorted(by_file.items(), key=lambda x: max(rank for rank, _ in x[1]), reverse=True)
+    sections = [_render_section(f, [t.line for _, t in group], max(r for r, _ in group)) for f, group in ordered]
+    return SECTION_SEPARATOR.join(s for s in sections if s)
+
+
+@pytest.mark.parametrize("budget", [0, 5, 40, 200, 1000, 100000])
+def test_packer_finds_largest_fitting_prefix(budget):
+    tags = _ranked_tags(30, 1)
+    # Counting whole words makes the separator merge with neighbours, so
+    # the per-section estimate is not exact
+    count = lambda text: len(text.split())
+    packer = MapPacker(tags, _render_section, count)
+
+    num_tags, tree = packer.pack(budget)
+
+    expected = max(k for k in range(len(tags) + 1) if k == 0 or count(_render_map(tags[:k])) <= budget)
+    assert num_tags == expected
+    assert tree == (_render_map(tags[:num_tags]) if num_tags else None)
+
+
+def test_packer_renders_each_section_once():
+    tags = _ranked_tags(200, 2)
+    rendered = []
+
+    def render(rel_fname, lois, max_rank):
+        rendered.append((rel_fname, tuple(lois)))
+        return _render_section(rel_fname, lois, max_rank)
+
+    packer = MapPacker(tags, render, len)
+    packer.pack(2000)
+
+    assert len(rendered) == len(set(rendered))
+    assert packer.maps_counted <= 6
+
+
+def test_packer_counts_exactly_only_within_margin():
+    tags = _ranked_tags(200, 4)
+    count = lambda text: len(text.split())
+    # Estimates 20% high: outside the margin they decide alone, inside it the exact count does
+    estimate = lambda rel_fnames, texts: [int(count(text) * 1.2) for text in texts]
+    packer = MapPacker(tags, _render_section, count, count_sections=estimate, margin=0.3)
+
+    num_tags, tree = packer.pack(2000)
+
+    assert count(tree) <= 2000
+    assert packer.verified and packer.maps_counted == len(packer.verified)
+    assert all(abs(est - 2000) <= 0.3 * 2000 for est, _ in packer.verified)
+    # The exact count at the boundary recovers the budget the 20% overestimate would waste
+    assert count(_render_map(tags[:num_tags])) > 2000 / 1.2
+
+
+def test_pack_many_matches_separate_packs_and_shares_sections():
+    tags = _ranked_tags(200, 5)
+    count = lambda text: len(text.split())
+    budgets = [4000, 250, 1000, 16000]
+
+    ladder = MapPacker(tags, _render_section, count)
+    results = ladder.pack_many(budgets)
+
+    rendered = 0
+    for budget in budgets:
+        single = MapPacker(tags, _render_section, count)
+        assert results[budget] == single.pack(budget)
+        rendered += single.sections_rendered
+    assert ladder.sections_rendered < rendered
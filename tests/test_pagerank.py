@@ -0,0 +1,243 @@
+import os
+import random
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from core.pagerank import EdgeLimits, PageRankConvergenceError, build_reference_graph, pagerank
+from core.tagstore import TagTable
+
+
+def _random_table(num_files, num_names, seed):
+    rng = random.Random(seed)
+    table = TagTable()
+    for f in range(num_files):
+        packed = []
+        for _ in range(rng.randrange(0, 8)):
+            kind = "def" if rng.random() < 0.3 else "ref"
+            packed.append((1, f"name{rng.randrange(num_names)}", kind, 1, 0, 1))
+        table.add_packed(f"f{f}.py", f"/abs/f{f}.py", packed)
+    return table
+
+
+def _networkx_graph(table):
+    G = nx.MultiDiGraph()
+    G.add_nodes_from(table.files.strings)
+    defines = table.defines()
+    for name_id, ref_files in table.references().items():
+        for ref in ref_files:
+            for d in defines.get(name_id, ()):
+                if ref != d:
+                    G.add_edge(table.files[ref], table.files[d], name=table.names[name_id])
+    return G
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_networkx(seed):
+    table = _random_table(60, 40, seed)
+    G = _networkx_graph(table)
+    adjacency, _ = build_reference_graph(table)
+
+    expected = nx.pagerank(G, alpha=0.85)
+    actual = pagerank(adjacency).ranks
+    assert np.allclose(actual, [expected[n] for n in table.files.strings], atol=1e-6)
+
+    chat = {table.files[0]: 100.0, table.files[3]: 100.0}
+    expected = nx.pagerank(G, personalization=chat, alpha=0.85)
+    personalization = np.zeros(table.num_files)
+    personalization[[0, 3]] = 100.0
+    actual = pagerank(adjacency, personalization).ranks
+    assert np.allclose(actual, [expected[n] for n in table.files.strings], atol=1e-6)
+
+
+def test_edge_weights_count_distinct_names():
+    table = TagTable()
+    table.add_packed("a.py", "/a.py", [(1, "x", "ref", 1, 0, 1), (2, "x", "ref", 2, 0, 1), (3, "y", "ref", 3, 0, 1)])
+    table.add_packed("b.py", "/b.py", [(1, "x", "def", 1, 0, 1), (2, "y", "def", 2, 0, 1), (3, "x", "ref", 3, 0, 1)])
+
+    adjacency, stats = build_reference_graph(table, num_nodes=3)
+
+    assert adjacency.shape == (3, 3)
+    assert adjacency.toarray().tolist() == [[0, 2, 0], [0, 0, 0], [0, 0, 0]]
+    assert (stats.name_edges, stats.edges, stats.collapsed_edges) == (2, 1, 1)
+
+
+def _hub_table():
+    # "get" is defined in every file and referenced from every file
+    table = TagTable()
+    for f in range(6):
+        packed = [(1, "get", "def", 1, 0, 1), (2, "get", "ref", 2, 0, 1)]
+        if f == 0:
+            packed.append((3, "special", "def", 3, 0, 1))
+        else:
+            packed.append((3, "special", "ref", 3, 0, 1))
+        table.add_packed(f"f{f}.py", f"/f{f}.py", packed)
+    return table
+
+
+def test_common_identifiers_pruned_or_downweighted():
+    table = _hub_table()
+
+    full, stats = build_reference_graph(table)
+    assert stats.name_edges == 6 * 5 + 5
+    assert stats.pruned_names == 0
+
+    pruned, stats = build_reference_graph(table, limits=EdgeLimits(max_defs=3))
+    assert stats.pruned_names == 1 and stats.pruned_edges == 30
+    assert pruned.nnz == 5 and set(pruned.tocoo().col) == {0}
+
+    weighted, stats = build_reference_graph(table, limits=EdgeLimits(common_defs=3, common_weight=0.5))
+    assert stats.downweighted_names == 1
+    assert weighted[1, 0] == 1.5 and weighted[1, 2] == 0.5
+    assert full[1, 0] == 2.0
+
+
+def test_repomap_reports_graph_stats(tmp_path):
+    from core.repomap_class import RepoMap
+
+    files = []
+    for f in range(4):
+        path = tmp_path / f"m{f}.py"
+        path.write_text("def run():\n    return run()\n", encoding="utf-8")
+        files.append(str(path))
+
+    repo_map = RepoMap(root=str(tmp_path), max_ident_refs=2)
+    repo_map.TAGS_CACHE = {}
+    _, report, _ = repo_map._calculate_file_ranks([], files)
+
+    assert report.graph_stats.pruned_names == 1
+    assert report.graph_stats.edges == 0
+
+
+def test_warm_start_converges_faster_to_same_ranks():
+    table = _random_table(400, 150, 7)
+    adjacency, _ = build_reference_graph(table)
+    cold = pagerank(adjacency)
+
+    # Perturb the graph slightly, as a one-file edit would
+    table.replace_packed("f0.py", "/abs/f0.py", [(1, "name1", "ref", 1, 0, 1), (2, "name2", "ref", 2, 0, 1)])
+    edited, _ = build_reference_graph(table)
+    fresh = pagerank(edited)
+    warm = pagerank(edited, nstart=cold.ranks)
+
+    assert warm.iterations < fresh.iterations
+    assert np.allclose(warm.ranks, fresh.ranks, atol=1e-5)
+
+
+@pytest.mark.parametrize("n", range(2, 11))
+def test_personalized_cycles_converge(n):
+    from scipy import sparse
+    adjacency = sparse.csr_array((np.ones(n), (np.arange(n), (np.arange(n) + 1) % n)), shape=(n, n))
+    personalization = np.zeros(n)
+    personalization[0] = 100.0
+
+    result = pagerank(adjacency, personalization)
+    expected = nx.pagerank(nx.DiGraph(list(zip(range(n), [(i + 1) % n for i in range(n)]))), personalization={0: 1})
+    assert np.allclose(result.ranks, [expected[i] for i in range(n)], atol=1e-5)
+
+    # At the iteration limit the error carries the last iterate
+    with pytest.raises(PageRankConvergenceError) as raised:
+        pagerank(adjacency, personalization, max_iter=3)
+    assert raised.value.results[0].iterations == 3
+    assert np.isclose(raised.value.results[0].ranks.sum(), 1.0)
+
+
+def test_repomap_ranks_a_cyclic_graph_around_the_chat_file(tmp_path):
+    from core.repomap_class import RepoMap
+
+    (tmp_path / "a.py").write_text("from b import fb\ndef fa():\n    return fb()\n", encoding="utf-8")
+    (tmp_path / "b.py").write_text("from a import fa\ndef fb():\n    return fa()\n", encoding="utf-8")
+    (tmp_path / "c.py").write_text("from a import fa\ndef fc():\n    return fa()\n", encoding="utf-8")
+    warnings = []
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    repo_map.output_handlers['warning'] = warnings.append
+
+    ranks, report, _ = repo_map._calculate_file_ranks([str(tmp_path / "a.py")], [str(tmp_path / f) for f in ("b.py", "c.py")])
+    assert not warnings and report.pagerank_iterations > 0
+    assert ranks["a.py"] > ranks["b.py"] > ranks["c.py"]
+
+
+def test_repomap_reuses_previous_ranks(tmp_path):
+    from core.repomap_class import RepoMap
+
+    files = []
+    for f in range(8):
+        path = tmp_path / f"m{f}.py"
+        path.write_text(f"def f{f}():\n    return f{(f + 1) % 8}() + f{(f * 3) % 8}()\n", encoding="utf-8")
+        files.append(str(path))
+
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    _, first, _ = repo_map._calculate_file_ranks([], files)
+    ranks, second, _ = repo_map._calculate_file_ranks([], files)
+
+    # The same graph and chat set reuses the memoized ranks without iterating
+    assert not first.pagerank_warm_start and not first.pagerank_memo_hit
+    assert second.pagerank_memo_hit and not second.pagerank_warm_start
+    assert second.pagerank_iterations == 0
+
+    # A new chat set warm-starts from the latest vector and still matches a cold run
+    warm, report, _ = repo_map._calculate_file_ranks([files[0]], files)
+    fresh = RepoMap(root=str(tmp_path))
+    fresh.TAGS_CACHE = {}
+    cold, cold_report, _ = fresh._calculate_file_ranks([files[0]], files)
+    assert report.pagerank_warm_start and not report.pagerank_memo_hit
+    assert not cold_report.pagerank_warm_start
+    assert all(abs(warm[k] - cold[k]) < 1e-5 for k in cold)
+
+
+def test_rank_many_matches_single_rankings(tmp_path):
+    from core.repomap_class import RepoMap
+
+    files = []
+    for f in range(6):
+        path = tmp_path / f"m{f}.py"
+        path.write_text(f"def f{f}():\n    return f{(f + 1) % 6}() + f{(f * 5) % 6}()\n", encoding="utf-8")
+        files.append(str(path))
+    chat_sets = [[], [files[0]], [files[1], files[2]], [files[0]]]
+
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    batched = repo_map.rank_many(chat_sets, files)
+
+    for chat, ranks in zip(chat_sets, batched):
+        single = RepoMap(root=str(tmp_path))
+        single.TAGS_CACHE = {}
+        expected, _, _ = single._calculate_file_ranks(chat, [f for f in files if f not in chat])
+        assert ranks.keys() == expected.keys()
+        assert all(abs(ranks[k] - expected[k]) < 1e-9 for k in expected)
+
+    # Later calls with a batched chat set reuse its ranks
+    _, report, _ = repo_map._calculate_file_ranks([files[1], files[2]], files)
+    assert report.pagerank_memo_hit and report.pagerank_iterations == 0
+
+
+def test_ranking_result_is_shared_by_map_and_blocks(tmp_path):
+    from core.repomap_class import RepoMap
+
+    files = []
+    for f in range(5):
+        path = tmp_path / f"m{f}.py"
+        path.write_text(f"def f{f}():\n    return f{(f + 1) % 5}()\n", encoding="utf-8")
+        files.append(str(path))
+
+    repo_map = RepoMap(root=str(tmp_path), map_tokens=4096, token_counter_func=lambda text: len(text.split()))
+    repo_map.TAGS_CACHE = {}
+    ranking = repo_map.rank([], files)
+    assert sorted(tag.kind for tag in ranking.search("f3")) == ["def", "ref"]
+
+    ranked = []
+    repo_map._rank_files = lambda *args: ranked.append(args)
+    content, report = repo_map.get_repo_map(ranking=ranking)
+    blocks = repo_map.get_semantic_blocks(token_limit=4096, ranking=ranking)
+
+    assert not ranked
+    assert report is ranking.report
+    assert "def f0" in content
+    assert sorted(block.name for block in blocks) == [f"f{f}" for f in range(5)]
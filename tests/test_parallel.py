@@ -0,0 +1,69 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from core.parallel import MIN_PARALLEL_FILES, resolve_jobs
+from core.repomap_class import RepoMap
+
+
+@pytest.fixture
+def repo(tmp_path):
+    files = []
+    for i in range(MIN_PARALLEL_FILES + 4):
+        p = tmp_path / f"mod{i}.py"
+        p.write_text(
+            f"from mod{(i + 1) % 5} import helper{(i + 1) % 5}\n\n"
+            f"def helper{i}():\n    return helper{(i + 1) % 5}()\n\n"
+            f"class Thing{i}:\n    def run(self):\n        return helper{i}()\n",
+            encoding="utf-8"
+        )
+        files.append(str(p))
+    return tmp_path, files
+
+
+def test_resolve_jobs():
+    assert resolve_jobs(3) == 3
+    assert resolve_jobs(0) == (os.cpu_count() or 1)
+    assert resolve_jobs(None) == (os.cpu_count() or 1)
+
+
+def test_parallel_tags_match_serial(repo):
+    root, files = repo
+
+    serial = RepoMap(root=str(root))
+    serial.TAGS_CACHE = {}
+    expected = [serial.get_tags(f, serial.get_rel_fname(f)) for f in files]
+
+    parallel = RepoMap(root=str(root), jobs=2)
+    parallel.TAGS_CACHE = {}
+    try:
+        parallel.prefetch_tags(files)
+        # Every file should now be served from the cache
+        assert sum(1 for key in parallel.TAGS_CACHE if key.startswith("tags:")) == len(files)
+        actual = [parallel.get_tags(f, parallel.get_rel_fname(f)) for f in files]
+    finally:
+        parallel.close()
+
+    assert actual == expected
+
+
+def test_parallel_map_matches_serial(repo):
+    root, files = repo
+    counter = lambda text: len(text) // 4
+
+    serial = RepoMap(root=str(root), token_counter_func=counter)
+    serial.TAGS_CACHE = {}
+    expected, _ = serial.get_repo_map(other_files=files)
+
+    parallel = RepoMap(root=str(root), token_counter_func=counter, jobs=2)
+    parallel.TAGS_CACHE = {}
+    try:
+        actual, _ = parallel.get_repo_map(other_files=files)
+    finally:
+        parallel.close()
+
+    assert actual == expected
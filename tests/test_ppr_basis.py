@@ -0,0 +1,82 @@
+import os
+import random
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from core.pagerank import build_reference_graph, pagerank
+from core.ppr_basis import PPRBasis
+from core.tagstore import TagTable
+
+
+def _random_graph(num_files, num_names, seed):
+    rng = random.Random(seed)
+    table = TagTable()
+    for f in range(num_files):
+        packed = [(1, f"name{rng.randrange(num_names)}", "def" if rng.random() < 0.3 else "ref", 1, 0, 1)
+                  for _ in range(rng.randrange(0, 8))]
+        table.add_packed(f"f{f}.py", f"/abs/f{f}.py", packed)
+    adjacency, _ = build_reference_graph(table)
+    return adjacency, table.files.strings
+
+
+def test_untruncated_basis_matches_pagerank():
+    adjacency, nodes = _random_graph(120, 40, 3)
+    basis = PPRBasis.build(adjacency, nodes, top_k=len(nodes), epsilon=1e-9)
+
+    for sources in ([0], [5, 17], [1, 2, 3, 90]):
+        personalization = np.zeros(len(nodes))
+        personalization[sources] = 1.0
+        expected = pagerank(adjacency, personalization, tol=1e-12, max_iter=1000).ranks
+        assert np.allclose(basis.rank(sources), expected, atol=1e-6)
+
+
+def test_truncated_basis_keeps_top_ranks():
+    adjacency, nodes = _random_graph(400, 150, 5)
+    basis = PPRBasis.build(adjacency, nodes, top_k=16)
+    assert max(np.diff(basis.vectors.indptr)) <= 16
+
+    personalization = np.zeros(len(nodes))
+    personalization[[7, 8]] = 1.0
+    expected = pagerank(adjacency, personalization).ranks
+    approx = basis.rank([7, 8])
+    assert set(np.argsort(-expected)[:5]) == set(np.argsort(-approx)[:5])
+
+
+def test_basis_round_trips_through_disk(tmp_path):
+    adjacency, nodes = _random_graph(50, 20, 1)
+    basis = PPRBasis.build(adjacency, nodes)
+    basis.save(tmp_path)
+
+    loaded = PPRBasis.load(tmp_path, basis.digest)
+    assert np.array_equal(loaded.rank([3, 4]), basis.rank([3, 4]))
+    assert PPRBasis.load(tmp_path, "0" * 40) is None
+
+
+def test_repomap_ranks_from_persisted_basis(tmp_path):
+    from core.repomap_class import RepoMap
+
+    files = []
+    for f in range(8):
+        path = tmp_path / f"m{f}.py"
+        path.write_text(f"def f{f}():\n    return f{(f + 1) % 8}() + f{(f * 3) % 8}()\n", encoding="utf-8")
+        files.append(str(path))
+
+    builder = RepoMap(root=str(tmp_path), ppr_basis=True)
+    builder.TAGS_CACHE = {}
+    assert builder.build_ppr_basis(files).num_nodes == 8
+
+    # A fresh instance finds the saved basis; one without the option recomputes
+    fast = RepoMap(root=str(tmp_path), ppr_basis=True)
+    fast.TAGS_CACHE = {}
+    ranks, report, _ = fast._calculate_file_ranks([files[2]], files)
+    slow = RepoMap(root=str(tmp_path))
+    slow.TAGS_CACHE = {}
+    expected, slow_report, _ = slow._calculate_file_ranks([files[2]], files)
+
+    assert report.pagerank_basis and not slow_report.pagerank_basis
+    assert max(ranks, key=ranks.get) == max(expected, key=expected.get)
+    assert all(abs(ranks[k] - expected[k]) < 0.05 for k in expected)
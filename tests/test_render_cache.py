@@ -0,0 +1,53 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.render_cache import CONTEXT_BYTES_PER_CHAR, RenderCache
+from core.repomap_class import RepoMap
+
+
+def test_cache_invalidates_changed_files_and_evicts_by_size():
+    cache = RenderCache(max_bytes=100 * CONTEXT_BYTES_PER_CHAR)
+    cache.put("a.py", "d1", None, "x" * 40)
+    cache.put("b.py", "d1", None, "y" * 40)
+
+    assert cache.get("a.py", "d1").lines == ["x" * 40]
+    assert cache.get("a.py", "d2") is None
+    assert cache.invalidations == 1 and "a.py" not in cache._entries
+
+    # b.py is now least recently used and makes room for c.py
+    cache.put("a.py", "d2", None, "z" * 40)
+    cache.put("c.py", "d1", None, "w" * 40)
+    assert cache.get("b.py", "d1") is None
+    stats = cache.stats()
+    assert stats.evictions == 1 and stats.entries == 2
+    assert stats.total_bytes == 80 * CONTEXT_BYTES_PER_CHAR
+
+    # Entries larger than the cap are returned but not kept
+    assert cache.put("big.py", "d1", None, "v" * 200).lines == ["v" * 200]
+    assert len(cache) == 2
+
+
+def test_render_tree_skips_reads_on_hits_and_sees_edits(tmp_path):
+    path = tmp_path / "mod.py"
+    path.write_text("def a():\n    return 1\n", encoding="utf-8")
+    reads = []
+
+    def reader(fname):
+        reads.append(fname)
+        return path.read_text(encoding="utf-8")
+
+    repo_map = RepoMap(root=str(tmp_path), file_reader_func=reader)
+    repo_map.TAGS_CACHE = {}
+    first = repo_map.render_tree(str(path), "mod.py", [1])
+    repo_map.source_buffers.clear()
+    assert repo_map.render_tree(str(path), "mod.py", [1]) == first
+    assert len(reads) == 1 and repo_map.render_cache.hits == 1
+
+    path.write_text("def b():\n    return 2\n", encoding="utf-8")
+    os.utime(path, ns=(1, 1))
+    repo_map.source_buffers.clear()
+    assert "def b" in repo_map.render_tree(str(path), "mod.py", [1])
+    assert len(reads) == 2 and repo_map.render_cache.invalidations == 1
@@ -13,6 +13,7 @@ sys.modules["sentence_transformers"] = mock_st
 from fastapi.testclient import TestClient
 from server.main import app
 from server.models import RepoRequest, RepoMapResponse, SemanticBlocksResponse
+from core.guards import DEFAULT_MAX_FILE_BYTES, DEFAULT_MAX_LINE_LENGTH
 
 class TestServer(unittest.TestCase):
     def setUp(self):
@@ -76,13 +77,19 @@ class TestServer(unittest.TestCase):
         self.assertEqual(response.json()["commit_sha"], "abc1234")
         
         # Verify RepoMap init args
+        from server.main import manager
         mock_repomap_cls.assert_called_with(
             root="/tmp/test_repo",
             map_tokens=2048,
             token_counter_func=unittest.mock.ANY,
             verbose=True,
             max_context_window=None,
-            exclude_unranked=True
+            exclude_unranked=True,
+            render_cache_bytes=manager.render_cache_bytes // manager.max_repos,
+            max_file_bytes=DEFAULT_MAX_FILE_BYTES,
+            max_line_length=DEFAULT_MAX_LINE_LENGTH,
+            skip_binary=True,
+            skip_generated=True
         )
         
         # Verify get_repo_map args
@@ -94,6 +101,32 @@ class TestServer(unittest.TestCase):
             force_refresh=False
         )
 
+    @patch('server.manager.get_current_commit_sha')
+    @patch('server.manager.find_src_files')
+    @patch('server.manager.RepoMap')
+    def test_extract_repomap_budget_ladder(self, mock_repomap_cls, mock_find_files, mock_get_sha):
+        mock_find_files.return_value = ["other.py"]
+        mock_get_sha.return_value = "abc1234"
+        mock_instance = MagicMock()
+        mock_instance.get_repo_maps.return_value = {
+            1024: ("map 1k", None), 2048: ("map 2k", None), 4096: ("map 4k", None)
+        }
+        mock_repomap_cls.return_value = mock_instance
+
+        response = self.client.post("/repomap", json={
+            "root_path": "/tmp/test_repo",
+            "token_limit": 2048,
+            "token_limits": [1024, 4096]
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["repo_map"], "map 2k")
+        self.assertEqual(response.json()["repo_maps"], {"1024": "map 1k", "4096": "map 4k"})
+        # All budgets, token_limit included, come from one call
+        mock_instance.get_repo_maps.assert_called_once()
+        self.assertEqual(mock_instance.get_repo_maps.call_args.args[0], [1024, 2048, 4096])
+        mock_instance.get_repo_map.assert_not_called()
+
     @patch('server.manager.get_current_commit_sha')
     @patch('server.manager.find_src_files')
     @patch('server.manager.RepoMap')
@@ -185,5 +218,42 @@ class TestServer(unittest.TestCase):
         self.assertEqual(response.json()["blocks"][0]["em_content"], [0.1, 0.2])
         self.assertEqual(response.json()["blocks"][0]["repo_id"], "test/repo")
 
+    @patch('server.manager.RepoMap')
+    def test_least_recently_used_instances_are_evicted(self, mock_repomap_cls):
+        from server.manager import RepositoryManager
+        mock_repomap_cls.side_effect = lambda **kwargs: MagicMock()
+        manager = RepositoryManager(max_repos=2)
+
+        first = manager.get_repo_map_instance(RepoRequest(root_path="/tmp/a"))
+        manager.get_repo_map_instance(RepoRequest(root_path="/tmp/b"))
+        manager.get_repo_map_instance(RepoRequest(root_path="/tmp/a"))
+        manager.get_repo_map_instance(RepoRequest(root_path="/tmp/c"))
+
+        self.assertEqual(list(manager.repos), ["/tmp/a", "/tmp/c"])
+        self.assertIs(manager.repos["/tmp/a"], first)
+
+        # Changing the model replaces the instance and releases the old one
+        manager.get_repo_map_instance(RepoRequest(root_path="/tmp/a", model="gpt-3.5-turbo"))
+        first.close.assert_called_once()
+        first.render_cache.clear.assert_called_once()
+
+    @patch('server.manager.RepoMap')
+    def test_instance_access_waits_for_the_manager_lock(self, mock_repomap_cls):
+        import threading
+        from server.manager import RepositoryManager
+        manager = RepositoryManager()
+        done = threading.Event()
+
+        def use():
+            manager.get_repo_map_instance(RepoRequest(root_path="/tmp/a"))
+            done.set()
+
+        with manager.lock:
+            worker = threading.Thread(target=use)
+            worker.start()
+            self.assertFalse(done.wait(0.05))
+        worker.join(5)
+        self.assertTrue(done.is_set())
+
 if __name__ == '__main__':
     unittest.main()
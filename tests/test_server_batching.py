@@ -0,0 +1,73 @@
+import asyncio
+import threading
+
+from server.batching import RequestCoalescer
+
+
+def test_concurrent_requests_share_one_batch():
+    calls = []
+
+    def batch(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        coalescer = RequestCoalescer(batch)
+        return await asyncio.gather(*(coalescer.submit("/repo", i) for i in range(3)))
+
+    assert asyncio.run(run()) == [0, 2, 4]
+    assert calls == [[0, 1, 2]]
+
+
+def test_keys_are_batched_separately_and_errors_stay_per_request():
+    def batch(items):
+        return [ValueError(item) if item == "bad" else item for item in items]
+
+    async def run():
+        coalescer = RequestCoalescer(batch)
+        results = await asyncio.gather(
+            coalescer.submit("/a", "ok"),
+            coalescer.submit("/a", "bad"),
+            coalescer.submit("/b", "other"),
+            return_exceptions=True
+        )
+        return results, coalescer.batches
+
+    (ok, bad, other), batches = asyncio.run(run())
+    assert ok == "ok" and other == "other"
+    assert isinstance(bad, ValueError)
+    assert batches == 2
+
+
+def test_requests_during_a_running_batch_join_the_next_one():
+    release = threading.Event()
+    calls = []
+
+    def batch(items):
+        calls.append(list(items))
+        if len(calls) == 1:
+            release.wait(5)
+        return items
+
+    async def run():
+        coalescer = RequestCoalescer(batch)
+        first = asyncio.ensure_future(coalescer.submit("/repo", 0))
+        while not calls:
+            await asyncio.sleep(0.01)
+        later = [asyncio.ensure_future(coalescer.submit("/repo", i)) for i in (1, 2)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(first, *later)
+
+    assert asyncio.run(run()) == [0, 1, 2]
+    assert calls == [[0], [1, 2]]
+
+
+def test_idle_keys_release_their_locks():
+    async def run():
+        coalescer = RequestCoalescer(lambda items: items)
+        await asyncio.gather(*(coalescer.submit(f"/repo{i % 3}", i) for i in range(6)))
+        return coalescer
+
+    coalescer = asyncio.run(run())
+    assert coalescer._locks == {} and coalescer._lock_users == {}
@@ -24,8 +24,8 @@ class TestServerIndexing(unittest.TestCase):
     @patch('server.main.manager')
     def test_index_repository(self, mock_manager, mock_indexer):
         # Mock manager responses
-        mock_manager.extract_repo_map.return_value = ("repo_map_content", "new_sha")
-        mock_manager.extract_semantic_blocks.return_value = ([{
+        mock_manager.get_commit_sha.return_value = "new_sha"
+        mock_manager.extract_index_data.return_value = ("repo_map_content", [{
             "name": "block1", 
             "content": "def block1(): pass",
             "file_path": "test.py",
@@ -62,12 +62,16 @@ class TestServerIndexing(unittest.TestCase):
             self.assertEqual(call_args.kwargs['commit_sha'], "new_sha")
             self.assertEqual(call_args.kwargs['summary'], "summary text")
             self.assertEqual(len(call_args.kwargs['blocks']), 1)
+            
+            # Map and blocks come from one ranking pass
+            mock_manager.extract_index_data.assert_called_once()
+            mock_gen.generate_summary.assert_called_once_with("repo_map_content")
 
     @patch('server.main.indexer')
     @patch('server.main.manager')
     def test_index_repository_skip(self, mock_manager, mock_indexer):
         # Mock manager responses
-        mock_manager.extract_repo_map.return_value = ("repo_map_content", "same_sha")
+        mock_manager.get_commit_sha.return_value = "same_sha"
         
         # Mock indexer responses
         mock_indexer.get_last_commit_sha.return_value = "same_sha"
@@ -81,7 +85,8 @@ class TestServerIndexing(unittest.TestCase):
         self.assertEqual(response.json()["status"], "skipped")
         self.assertEqual(response.json()["commit_sha"], "same_sha")
         
-        # Verify indexer NOT called
+        # Verify nothing was ranked or indexed
+        mock_manager.extract_index_data.assert_not_called()
         mock_indexer.index_repository_data.assert_not_called()
 
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.repomap_class import RepoMap
+from core.tagstore import KIND_DEF, TagTable
+
+
+def _write_repo(tmp_path, count=6):
+    files = []
+    for i in range(count):
+        path = tmp_path / f"mod{i}.py"
+        path.write_text(
+            f"from mod{(i + 1) % count} import f{(i + 1) % count}\n\n"
+            f"def f{i}():\n    return f{(i + 1) % count}()\n",
+            encoding="utf-8"
+        )
+        files.append(str(path))
+    return files
+
+
+def _fresh_ranks(root, files):
+    repo_map = RepoMap(root=str(root))
+    repo_map.TAGS_CACHE = {}
+    ranks, report, _ = repo_map._calculate_file_ranks([], files)
+    return ranks, report
+
+
+def test_one_file_edit_reloads_one_file(tmp_path):
+    files = _write_repo(tmp_path)
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    repo_map._calculate_file_ranks([], files)
+    index = repo_map.symbol_index
+    assert index.files_loaded == len(files)
+
+    # mod2 now also calls f0, adding an edge and changing the ranks
+    (tmp_path / "mod2.py").write_text("def f2():\n    return f3() + f0()\n\ndef extra():\n    pass\n", encoding="utf-8")
+    ranks, report, _ = repo_map._calculate_file_ranks([], files)
+
+    assert index.files_loaded == len(files) + 1
+    assert index.files_reused == len(files) - 1
+    expected_ranks, expected_report = _fresh_ranks(tmp_path, files)
+    assert ranks == expected_ranks
+    assert (report.definition_matches, report.reference_matches) == (
+        expected_report.definition_matches, expected_report.reference_matches
+    )
+
+
+def test_deleted_file_leaves_index(tmp_path):
+    files = _write_repo(tmp_path)
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    repo_map._calculate_file_ranks([], files)
+
+    os.remove(files[0])
+    ranks, report, included = repo_map._calculate_file_ranks([], files)
+
+    assert files[0] not in included
+    assert repo_map.symbol_index.digest("mod0.py") is None
+    assert ranks == _fresh_ranks(tmp_path, files)[0]
+
+
+def test_replace_keeps_views_consistent():
+    table = TagTable()
+    table.COMPACT_MIN_DEAD_ROWS = 2
+    table.add_packed("a.py", "/a.py", [(1, "x", "def", 1, 0, 1), (2, "y", "ref", 2, 0, 1)])
+    table.add_packed("b.py", "/b.py", [(1, "y", "def", 1, 0, 1), (2, "x", "ref", 2, 0, 1)])
+    table.defines()
+
+    table.replace_packed("a.py", "/a.py", [(5, "z", "def", 5, 0, 1)])
+    table.replace_packed("a.py", "/a.py", [(6, "z", "def", 6, 0, 1)])
+    table.replace_packed("a.py", "/a.py", [(6, "z", "def", 6, 0, 1), (7, "y", "ref", 7, 0, 1)])
+
+    names = table.names.lookup
+    assert table.defines() == {names("y"): {1}, names("z"): {0}}
+    assert table.references() == {names("x"): {1}, names("y"): {0}}
+    assert [t.line for t in table.tags(table.rows(KIND_DEF, [0]))] == [6]
+    # Compaction keeps tombstoned rows from outnumbering live ones
+    assert len(list(table.rows())) == 4
+    assert table.dead_rows * 2 < len(table)
+
+    rebuilt = TagTable()
+    rebuilt.add_packed("a.py", "/a.py", [(6, "z", "def", 6, 0, 1), (7, "y", "ref", 7, 0, 1)])
+    rebuilt.add_packed("b.py", "/b.py", [(1, "y", "def", 1, 0, 1), (2, "x", "ref", 2, 0, 1)])
+    assert table.tags(table.rows(file_ids=[0, 1])) == rebuilt.tags(rebuilt.rows())
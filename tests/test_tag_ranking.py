@@ -0,0 +1,88 @@
+import os
+import sys
+
+import numpy as np
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.repomap_class import RepoMap
+from core.tag_ranking import RankedTags, TagRanker
+from core.tagstore import KIND_DEF
+
+
+def _write_repo(root, num_files=12):
+    files = []
+    for i in range(num_files):
+        path = root / f"mod{i}.py"
+        path.write_text(
+            "".join(
+                f"def func_{i}_{j}(arg):\n    return func_{(i + 1) % num_files}_{j}(arg)\n"
+                for j in range(4)
+            ),
+            encoding="utf-8"
+        )
+        files.append(str(path))
+    return files
+
+
+def _sorted_by_loop(table, file_ids, ranks, chat_rel_fnames, mentioned_fnames, mentioned_idents):
+    """The per-tag boost loop the vectorized ranker replaces."""
+    ranked = []
+    for file_id in file_ids:
+        rel_fname = table.files[file_id]
+        file_boost = 1.0
+        if rel_fname in mentioned_fnames:
+            file_boost *= 5.0
+        if rel_fname in chat_rel_fnames:
+            file_boost *= 20.0
+        for row in table.rows(KIND_DEF, [file_id]):
+            boost = file_boost
+            if table.names[table.name_ids[row]] in mentioned_idents:
+                boost *= 10.0
+            ranked.append((ranks.get(rel_fname, 0.0) * boost, table.tag(row)))
+    ranked.sort(key=lambda x: x[0], reverse=True)
+    return ranked
+
+
+def test_vectorized_boosts_match_the_per_tag_loop(tmp_path):
+    files = _write_repo(tmp_path)
+    repo_map = RepoMap(root=str(tmp_path), token_counter_func=lambda text: len(text) // 4)
+    repo_map.TAGS_CACHE = {}
+    ranking = repo_map.rank(files[:1], files[1:])
+
+    chat = {"mod0.py"}
+    ranker = TagRanker(ranking.table, ranking.file_ids, ranking.ranks, chat)
+    for fnames, idents in [(set(), set()), ({"mod3.py"}, {"func_5_1", "missing"}), ({"mod0.py"}, {"func_0_0"})]:
+        expected = _sorted_by_loop(ranking.table, ranking.file_ids, ranking.ranks, chat, fnames, idents)
+        ranked = ranker.ranked_tags(fnames, idents)
+        assert list(ranked) == expected
+        assert ranked[:3] == expected[:3] and ranked[-1] == expected[-1]
+
+
+def test_rerank_gives_the_map_of_a_full_ranking(tmp_path):
+    files = _write_repo(tmp_path)
+    repo_map = RepoMap(root=str(tmp_path), map_tokens=120, token_counter_func=lambda text: len(text) // 4)
+    repo_map.TAGS_CACHE = {}
+    ranking = repo_map.rank([], files)
+    repo_map.get_repo_map(ranking=ranking)
+
+    for fnames, idents in [({"mod7.py"}, {"func_2_3"}), (set(), {"func_9_0", "func_4_2"})]:
+        reranked = repo_map.rerank(ranking, fnames, idents)
+        content, _ = repo_map.get_repo_map(ranking=reranked, force_refresh=True)
+        assert content == repo_map.get_repo_map([], files, fnames, idents, force_refresh=True)[0]
+        assert reranked.file_ids == ranking.file_ids and reranked.mentioned_idents == idents
+
+
+def test_top_k_prefix_matches_the_full_stable_sort():
+    rng = np.random.default_rng(0)
+    # Few distinct scores, so ties straddle every top-k boundary
+    scores = rng.integers(0, 50, size=10000).astype(np.float64)
+    expected = np.argsort(-scores, kind="stable")
+    ranked = RankedTags(scores, lambda row: row)
+
+    assert ranked[:10] == [(scores[row], row) for row in expected[:10]]
+    assert ranked.selections == 1
+    assert ranked[3000] == (scores[expected[3000]], expected[3000])
+    assert ranked[-1] == (scores[expected[-1]], expected[-1])
+    assert [row for _, row in ranked] == expected.tolist()
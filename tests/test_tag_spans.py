@@ -0,0 +1,77 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.incremental import TreeCache
+from core.repomap_class import RepoMap
+from core.tags import pack_tags, parse_file_tags, unpack_tags
+
+SOURCE = (
+    "class Outer:\n"
+    "    def method(self):\n"
+    "        return helper()\n"
+    "\n"
+    "\n"
+    "def helper():\n"
+    "    return 1\n"
+)
+
+
+def test_tags_store_spans_not_text(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text(SOURCE, encoding="utf-8")
+
+    tags = parse_file_tags(str(src), "a.py", lambda f: src.read_bytes(), lambda _: None)
+    defs = {t.name: t for t in tags if t.kind == "def"}
+
+    assert all(t.content is None for t in tags)
+    assert SOURCE.encode()[defs["helper"].start_byte:defs["helper"].end_byte] == b"def helper():\n    return 1"
+    # Packed tags carry no source text at all
+    assert [row[1:3] + row[4:] for row in pack_tags(tags)] == [(t.name, t.kind, t.start_byte, t.end_byte) for t in tags]
+    assert unpack_tags(pack_tags(tags), str(src), "a.py") == tags
+
+
+def test_content_materialized_on_demand(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_text(SOURCE, encoding="utf-8")
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+
+    tags = repo_map.get_tags(str(src), "a.py")
+    contents = {t.name: repo_map.get_tag_content(t) for t in tags}
+
+    assert contents["Outer"].startswith("class Outer:") and "def method" in contents["Outer"]
+    assert contents["method"] == "def method(self):\n        return helper()"
+    assert all(repo_map.get_tag_content(t) == "" for t in tags if t.kind == "ref")
+
+    blocks = {b.name: b for b in repo_map.get_semantic_blocks(other_fnames=[str(src)])}
+    assert blocks["Outer"].type == "class_definition"
+    assert blocks["helper"].content == "def helper():\n    return 1"
+
+
+def test_content_of_crlf_files_has_plain_newlines(tmp_path):
+    src = tmp_path / "a.py"
+    src.write_bytes(SOURCE.replace("\n", "\r\n").encode("utf-8"))
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+
+    blocks = {b.name: b for b in repo_map.get_semantic_blocks(other_fnames=[str(src)])}
+    assert blocks["helper"].content == "def helper():\n    return 1"
+    assert "\r" not in blocks["Outer"].content and "def method" in blocks["Outer"].content
+
+
+def test_incremental_reparse_shifts_spans():
+    current = {"text": SOURCE}
+    read = lambda _: current["text"]
+    cache = TreeCache(1)
+    parse_file_tags("a.py", "a.py", read, lambda _: None, tree_cache=cache)
+
+    current["text"] = "import os\n" + SOURCE
+    incremental = parse_file_tags("a.py", "a.py", read, lambda _: None, tree_cache=cache)
+    full = parse_file_tags("a.py", "a.py", read, lambda _: None)
+
+    assert incremental == full
+    helper = next(t for t in incremental if t.name == "helper" and t.kind == "def")
+    assert current["text"].encode()[helper.start_byte:helper.end_byte].startswith(b"def helper")
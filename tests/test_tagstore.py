@@ -0,0 +1,60 @@
+import os
+import sys
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.repomap_class import RepoMap
+from core.tags import ParsedTag
+from core.tagstore import KIND_DEF, KIND_REF, TagTable
+
+SOURCES = {
+    "app.py": "from util import helper\n\n\ndef main():\n    return helper() + helper_two()\n",
+    "util.py": "def helper():\n    return 41\n\n\ndef helper_two():\n    return helper()\n",
+}
+
+
+def _tag(rel_fname, name, kind, line):
+    return ParsedTag(rel_fname, "/abs/" + rel_fname, line, name, kind, line, None, line * 10, line * 10 + 5)
+
+
+def test_rows_round_trip_and_intern():
+    table = TagTable()
+    a = [_tag("a.py", "foo", "def", 1), _tag("a.py", "bar", "ref", 2)]
+    b = [_tag("b.py", "foo", "ref", 3)]
+    table.add_tags("a.py", "/abs/a.py", a)
+    table.add_tags("b.py", "/abs/b.py", b)
+
+    assert len(table) == 3 and table.num_files == 2 and len(table.names) == 2
+    assert table.tags(range(len(table))) == a + b
+    assert table.tag(0).rel_fname is table.tag(1).rel_fname
+    assert list(table.file_rows(1)) == [2]
+    assert table.count(KIND_DEF) == 1
+
+
+def test_group_views():
+    table = TagTable()
+    table.add_tags("a.py", "/abs/a.py", [_tag("a.py", "foo", "def", 1), _tag("a.py", "foo", "ref", 4)])
+    table.add_tags("b.py", "/abs/b.py", [_tag("b.py", "foo", "ref", 3)])
+    foo = table.names.lookup("foo")
+
+    assert list(table.by_name()[foo]) == [0, 1, 2]
+    assert table.defines() == {foo: {0}}
+    assert table.references() == {foo: {0, 1}}
+    assert list(table.rows(KIND_REF, [1, 0])) == [2, 1]
+
+
+def test_search_matches_tag_scan(tmp_path):
+    files = []
+    for name, text in SOURCES.items():
+        (tmp_path / name).write_text(text, encoding="utf-8")
+        files.append(str(tmp_path / name))
+
+    repo_map = RepoMap(root=str(tmp_path))
+    repo_map.TAGS_CACHE = {}
+    table, file_ids, included, excluded = repo_map.build_tag_table(files + [str(tmp_path / "gone.py")])
+
+    assert included == files and list(excluded) == [str(tmp_path / "gone.py")]
+    all_tags = [t for f in files for t in repo_map.get_tags(f, os.path.basename(f))]
+    expected = [t for t in all_tags if "help" in t.name.lower() and t.kind == "ref"]
+    assert table.tags(table.search("HELP", {KIND_REF}, file_ids)) == expected
@@ -0,0 +1,88 @@
+import os
+import sys
+
+import tiktoken
+
+# Add parent directory to path to import modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.repomap_class import RepoMap
+from core.tokens import TokenCounter, TokenEstimator
+
+
+def byte_encoding():
+    """A tiny real encoding (one token per byte plus a few merges) that needs no download."""
+    ranks = {bytes([i]): i for i in range(256)}
+    for token in (b"de", b"def", b" r", b" re", b" ret"):
+        ranks[token] = len(ranks)
+    return tiktoken.Encoding("test_bytes", pat_str=r"\s?\S+|\s+", mergeable_ranks=ranks, special_tokens={})
+
+
+def test_counts_are_memoized_and_batches_match_single_counts():
+    encoding = byte_encoding()
+    counter = TokenCounter("test", encoding=encoding)
+    texts = ["def f():\n    return 1\n", "x" * 1000, "", "def f():\n    return 1\n"] + [f"def g{i}(): pass" for i in range(10)]
+
+    expected = [len(encoding.encode_ordinary(text)) for text in texts]
+    assert counter.count_batch(texts, num_threads=2) == expected
+    # The repeated text is encoded once
+    assert counter.misses == len(set(t for t in texts if t))
+
+    fresh = TokenCounter("test", encoding=encoding)
+    assert [fresh(text) for text in texts] == expected
+    hits = fresh.hits
+    assert fresh.count("x" * 1000) == 1000 and fresh.hits == hits + 1
+
+    # Special-token markup in source is counted as text, not rejected
+    assert counter.count("<|endoftext|>") == len("<|endoftext|>")
+
+
+def test_repomap_batch_counts_match_token_count(tmp_path):
+    counter = TokenCounter("test", encoding=byte_encoding())
+    repo_map = RepoMap(root=str(tmp_path), token_counter_func=counter)
+    texts = ["", "short", "def f():\n    return 1\n" * 300, "one long line " * 50]
+
+    assert repo_map.token_count_batch(texts) == [repo_map.token_count(text) for text in texts]
+
+    # Plain callables without count_batch still work
+    words = RepoMap(root=str(tmp_path), token_counter_func=lambda text: len(text.split()))
+    assert words.token_count_batch(texts) == [words.token_count(text) for text in texts]
+
+
+def test_estimator_calibrates_per_language_then_estimates():
+    exact = lambda text: len(text) // 3
+    estimator = TokenEstimator(exact, calibration_chars=1000)
+
+    # Until a language has enough exact counts behind it, its texts are counted exactly
+    assert estimator.count_batch(["x" * 600, "y" * 600], ["python", "python"]) == [200, 200]
+    assert estimator.calibrated("python") and not estimator.calibrated("go")
+    assert estimator.count_batch(["z" * 900, "w" * 90], ["python", "go"]) == [300, 30]
+    assert estimator.estimates == 1 and estimator.exact_counts == 3
+    assert estimator.chars_per_token("python") == 3.0
+
+    estimator.record_error(110, 100)
+    estimator.record_error(95, 100)
+    stats = estimator.stats()
+    assert stats.verified == 2
+    assert abs(stats.mean_error - 0.075) < 1e-9 and abs(stats.max_error - 0.1) < 1e-9
+    assert stats.estimated_chars == 900 and stats.seconds_saved >= 0
+
+
+def test_calibrated_maps_fit_the_budget(tmp_path):
+    for i in range(20):
+        (tmp_path / f"mod{i}.py").write_text(
+            "".join(f"def func_{i}_{j}(arg):\n    return mod{(i + 1) % 20}.func_{(i + 1) % 20}_{j}(arg)\n" for j in range(10)),
+            encoding="utf-8"
+        )
+    counter = TokenCounter("test", encoding=byte_encoding())
+    repo_map = RepoMap(
+        root=str(tmp_path), map_tokens=800, token_counter_func=counter,
+        token_estimator="calibrated", token_margin=0.2
+    )
+    repo_map.TAGS_CACHE = {}
+    files = [str(tmp_path / f"mod{i}.py") for i in range(20)]
+
+    content, _ = repo_map.get_repo_map([], files)
+
+    assert content and counter.count(content) <= 800
+    assert repo_map.token_estimator.stats().verified > 0